@@ -0,0 +1,73 @@
+# Efficiency of the matmul algorithms under one shared memory profile (see simple_cache_sim.adaptivity)
+from matmul import matmul_naive, load_matrix_to_cs, matmul_cache_aware, matmul_cache_oblivious, matmul_cache_adaptive
+import numpy as np
+import argparse
+
+from simple_cache_sim.SimulatorAdaptive import SimulatorAdaptive
+from simple_cache_sim.memory_profiles import RandomWalkProfile, SquareProfile
+from simple_cache_sim.adaptivity import compare
+
+
+def run(option, A, B, profile, args):
+    n = A.shape[0]
+    cs = SimulatorAdaptive(
+        memory_size=2**26,
+        cache_size=args.cache_size,
+        block_size=args.block_size,
+        mapping_pol=None,
+        write_pol="WT",
+        replace_pol="lru",
+        resize_keep="ways",  # Fully associative: shrink the ways
+        profile=profile,
+        record_misses=True,
+        work=("A", "B")  # Temporaries (e.g. C_tmp of oblivious) and C are not progress
+    )
+
+    A_addr = load_matrix_to_cs(cs, A, name="A")
+    B_addr = load_matrix_to_cs(cs, B, name="B")
+    C_addr = cs.allocate(n, n, default_val=0, name="C", through_cache=False)
+
+    if option == "naive":
+        matmul_naive(cs, A_addr, B_addr, C_addr)
+    elif option == 'aware':
+        matmul_cache_aware(cs, A_addr, B_addr, C_addr, cache_sz=args.cache_size)
+    elif option == "oblivious":
+        matmul_cache_oblivious(cs, A_addr, B_addr, C_addr)
+    elif option == "adaptive":
+        matmul_cache_adaptive(cs, A_addr, B_addr, C_addr)
+    else:
+        raise ValueError('Invalid option')
+    return cs.cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cache-adaptivity efficiency of the matmul algorithms.')
+    parser.add_argument('-N', dest='n', type=int, default=32, help='Matrix size')
+    parser.add_argument('-B', dest='block_size', type=int, default=4, help='Block size')
+    parser.add_argument('-M', dest='cache_size', type=int, default=256, help='Largest cache size')
+    parser.add_argument('--profile', choices=['walk', 'square'], default='walk', help='Memory profile')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    A = rng.integers(-20, 20, size=(args.n, args.n))
+    B = rng.integers(-20, 20, size=(args.n, args.n))
+
+    low = args.block_size**2  # Tall cache
+    if args.profile == 'walk':
+        profile = RandomWalkProfile(args.cache_size, low, args.cache_size, step=4 * args.cache_size, seed=args.seed)
+    else:
+        sizes = [args.cache_size >> k for k in range(args.cache_size.bit_length()) if args.cache_size >> k >= low]
+        profile = SquareProfile(sizes, args.block_size, scale=16, repeat=True)
+
+    cpus = {option: run(option, A, B, profile, args) for option in ["naive", "aware", "oblivious", "adaptive"]}
+    # A multiply-add reads one element of A and one of B
+    report = compare(cpus, a=8, b=4, accesses_per_unit=2)
+    print(f'{"algorithm":<10} {"misses":>10} {"accesses":>10} {"squares":>8} {"efficiency":>10}')
+    for option, row in report.items():
+        print(f'{option:<10} {row["cache_misses"]:>10} {row["total_access"]:>10} {row["squares"]:>8} '
+              f'{row["efficiency"]:>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# Throughput benchmarks of the simulator: accesses per second and peak memory of fixed workloads,
+# compared against a saved baseline
+from matmul import matmul_naive, load_matrix_to_cs, matmul_cache_aware, matmul_cache_oblivious
+import numpy as np
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.SimulatorAdaptive import SimulatorAdaptive
+from simple_cache_sim.memory_profiles import RandomWalkProfile
+
+CACHE_SIZE = 1024
+BLOCK_SIZE = 16
+ARRAY_SIZE = 16 * CACHE_SIZE  # Words touched by the synthetic streams
+
+# name -> function(scale) doing the untimed setup and returning run, the timed part, which returns
+# the number of accesses (or elements) it did
+CASES = dict()
+
+
+def case(name):
+    def register(make):
+        CASES[name] = make
+        return make
+    return register
+
+
+def stream(pattern: str, length: int, seed: int = 0):
+    """Indexes into an ARRAY_SIZE array and ops (1 for a write, about one access in four)."""
+    rng = np.random.default_rng(seed)
+    if pattern == "seq":
+        idx = np.arange(length) % ARRAY_SIZE
+    elif pattern == "stride":
+        idx = (np.arange(length) * BLOCK_SIZE) % ARRAY_SIZE  # One access per block
+    elif pattern == "loop":
+        idx = np.arange(length) % (CACHE_SIZE + CACHE_SIZE // 4)  # Slightly larger than the cache
+    elif pattern == "random":
+        idx = rng.integers(0, ARRAY_SIZE, size=length)
+    else:
+        raise ValueError(f'Invalid pattern: {pattern}')
+    ops = rng.random(length) < 0.25
+    return idx.tolist(), ops.tolist()
+
+
+def stream_run(cs, pattern: str, length: int):
+    x = cs.allocate(ARRAY_SIZE, default_val=0, through_cache=False)
+    idx, ops = stream(pattern, length)
+    read = cs.read
+    write = cs.write
+
+    def run():
+        for i, op in zip(idx, ops):
+            if op:
+                write(x, i, value=1)
+            else:
+                read(x, i)
+        return length
+    return run
+
+
+def simulator(**kwargs):
+    return Simulator(memory_size=2**20, cache_size=CACHE_SIZE, block_size=BLOCK_SIZE, **kwargs)
+
+
+def register_cases():
+    accesses = 100000
+
+    for pattern in ["seq", "stride", "loop", "random"]:
+        case(f'stream/{pattern}/lru-8way')(
+            lambda scale, p=pattern: stream_run(simulator(mapping_pol=8), p, int(accesses * scale)))
+
+    for policy in ["LRU", "LFU", "FIFO", "RAND", "CLOCK", "2Q", "ARC", "LIRS"]:
+        case(f'policy/{policy.lower()}/8way')(
+            lambda scale, p=policy: stream_run(simulator(mapping_pol=8, replace_pol=p), "random",
+                                               int(accesses * scale)))
+
+    for engine in ["dict", "array"]:
+        for ways, label in [(1, "direct"), (4, "4way"), (8, "8way"), (None, "full")]:
+            case(f'assoc/{label}/lru-{engine}')(
+                lambda scale, w=ways, e=engine: stream_run(simulator(mapping_pol=w, cache_engine=e), "random",
+                                                           int(accesses * scale)))
+
+    for keep in ["random", "lru", "ways"]:
+        def adaptive(scale, keep=keep):
+            profile = RandomWalkProfile(CACHE_SIZE, CACHE_SIZE // 8, CACHE_SIZE, step=2000, seed=0)
+            cs = SimulatorAdaptive(memory_size=2**20, cache_size=CACHE_SIZE, block_size=BLOCK_SIZE,
+                                   mapping_pol=8, resize_keep=keep, profile=profile)
+            return stream_run(cs, "random", int(accesses * scale))
+        case(f'adaptive/{keep}')(adaptive)
+
+    for engine in ["dict", "array"]:
+        for name, algorithm in [("naive", matmul_naive), ("aware", matmul_cache_aware),
+                                ("oblivious", matmul_cache_oblivious)]:
+            def matmul(scale, name=name, algorithm=algorithm, engine=engine):
+                n = max(4, 1 << round(np.log2(32 * scale ** (1 / 3))))
+                rng = np.random.default_rng(0)
+                cs = Simulator(memory_size=2**20, cache_size=256, block_size=8, cache_engine=engine)
+                A = load_matrix_to_cs(cs, rng.integers(-20, 20, size=(n, n)))
+                B = load_matrix_to_cs(cs, rng.integers(-20, 20, size=(n, n)))
+                C = cs.allocate(n, n, default_val=0, through_cache=False)
+                kwargs = dict(cache_sz=256) if name == "aware" else dict()
+
+                def run():
+                    algorithm(cs, A, B, C, **kwargs)
+                    return cs.cpu.total_access
+                return run
+            case(f'matmul/{name}-{engine}')(matmul)
+
+    def setup(scale, step):
+        n = max(8, int(256 * scale ** 0.5))
+        cs = Simulator(memory_size=2**22, cache_size=CACHE_SIZE, block_size=BLOCK_SIZE)
+        matrix = np.random.default_rng(0).integers(-20, 20, size=(n, n))
+
+        def run():
+            step(cs, matrix)
+            return n * n
+        return run
+
+    def allocate_cached(scale):
+        return setup(scale, lambda cs, m: cs.allocate(*m.shape, default_val=0))
+
+    def allocate_uncached(scale):
+        return setup(scale, lambda cs, m: cs.allocate(*m.shape, default_val=0, through_cache=False))
+
+    def load_matrix(scale):
+        return setup(scale, load_matrix_to_cs)
+
+    case('setup/allocate')(allocate_cached)
+    case('setup/allocate-uncached')(allocate_uncached)
+    case('setup/load_matrix_to_cs')(load_matrix)
+
+
+def measure(make, scale: float, repeat: int, memory: bool) -> dict:
+    """Best throughput over repeat runs, and the peak memory allocated by the timed part of one more run."""
+    best = float('inf')
+    work = 0
+    for _ in range(repeat):
+        run = make(scale)
+        begin = time.perf_counter()
+        work = run()
+        best = min(best, time.perf_counter() - begin)
+    result = {'work': work, 'seconds': best, 'rate': work / best}
+    if memory:
+        # Trace from after the setup, so the memory buffer and the workload don't hide what run allocates
+        run = make(scale)
+        tracemalloc.start()
+        run()
+        result['peak'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases slower (or using more memory) than the baseline by more than threshold."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('cases', {}).get(name)
+        if base is None:
+            continue
+        if result['rate'] < base['rate'] * (1 - threshold):
+            regressions.append((name, 'rate', base['rate'], result['rate']))
+        if 'peak' in result and 'peak' in base and result['peak'] > base['peak'] * (1 + threshold):
+            regressions.append((name, 'peak', base['peak'], result['peak']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulator throughput benchmarks.')
+    parser.add_argument('-k', dest='filter', default='', help='Only cases whose name contains this')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply the size of every workload')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (the best is kept)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='Skip the peak memory runs')
+    parser.add_argument('--save', help='Save the results as a baseline (json)')
+    parser.add_argument('--compare', help='Baseline (json) to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative slowdown flagged as a regression')
+    parser.add_argument('--list', action='store_true', help='List the cases and exit')
+    args = parser.parse_args()
+
+    register_cases()
+    names = [name for name in CASES if args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        return
+
+    baseline = dict()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != args.scale:
+            print(f'Warning: baseline scale {baseline.get("scale")} differs from --scale {args.scale}')
+
+    results = dict()
+    print(f'{"case":<28} {"work":>9} {"per sec":>11} {"peak MiB":>9} {"vs base":>8}')
+    for name in names:
+        result = measure(CASES[name], args.scale, args.repeat, args.memory)
+        results[name] = result
+        base = baseline.get('cases', {}).get(name)
+        change = f'{result["rate"] / base["rate"] - 1:>+8.1%}' if base else f'{"":>8}'
+        peak = f'{result["peak"] / 2**20:>9.2f}' if 'peak' in result else f'{"":>9}'
+        print(f'{name:<28} {result["work"]:>9} {result["rate"]:>11.0f} {peak} {change}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'scale': args.scale, 'python': platform.python_version(), 'numpy': np.__version__,
+                       'machine': platform.machine(), 'cases': results}, f, indent=1)
+
+    if args.compare:
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f'REGRESSION {name}: {metric} {before:.0f} -> {after:.0f}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+# Lets pytest import the package from src and the top-level scripts (benchmark, matmul)
+# without installing them, e.g. python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
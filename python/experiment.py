@@ -7,6 +7,9 @@ import argparse
 import matplotlib.pyplot as plt
 
 from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.SimulatorFanout import SimulatorFanout
+from simple_cache_sim.replay import replay
+from simple_cache_sim.stack_distance import lru_miss_curve
 
 def test(option, n, block_sz, cache_sz, mapping_pol, replace_pol):
 
@@ -24,9 +27,9 @@ def test(option, n, block_sz, cache_sz, mapping_pol, replace_pol):
         replace_pol=replace_pol
     )
 
-    A_addr = load_matrix_to_cs(cs, A)
-    B_addr = load_matrix_to_cs(cs, B)
-    C_addr = cs.allocate(n, n, default_val=0)
+    A_addr = load_matrix_to_cs(cs, A, name="A")
+    B_addr = load_matrix_to_cs(cs, B, name="B")
+    C_addr = cs.allocate(n, n, default_val=0, name="C", through_cache=False)
 
     end = time.time()
     print(f"Initialization time (sec): {end-begin:.6f}")
@@ -44,7 +47,7 @@ def test(option, n, block_sz, cache_sz, mapping_pol, replace_pol):
         raise ValueError('Invalid option')
     end = time.time()
 
-    C = np.array([[cs.read(C_addr, i, j) for j in range(n)] for i in range(n)])
+    C = cs.dump_array(C_addr)
 
     stats = cs.get_access_summary()
     print(f'N: {n} Block size: {block_sz} Cache size: {cache_sz}\n'
@@ -56,6 +59,91 @@ def test(option, n, block_sz, cache_sz, mapping_pol, replace_pol):
 
     return stats["cache_misses"], stats["total_access"], end-begin
 
+def test_fanout(option, n, block_sz, cache_sz, mapping_pol, replace_pol):
+    """Run option once against every (block_sz[i], cache_sz[i]) cache at the same time (see SimulatorFanout).
+
+    Not for 'aware', which is tuned to one cache size.
+    """
+    A = np.random.randint(-20, 20, size=(n, n))
+    B = np.random.randint(-20, 20, size=(n, n))
+
+    cs = SimulatorFanout(
+        memory_size=2**26,
+        configs=[dict(cache_size=c, block_size=b, mapping_pol=mapping_pol, replace_pol=replace_pol)
+                 for b, c in zip(block_sz, cache_sz)],
+        write_pol="WT"
+    )
+
+    A_addr = load_matrix_to_cs(cs, A, name="A")
+    B_addr = load_matrix_to_cs(cs, B, name="B")
+    C_addr = cs.allocate(n, n, default_val=0, name="C", through_cache=False)
+
+    begin = time.time()
+    if option == "naive":
+        matmul_naive(cs, A_addr, B_addr, C_addr)
+    elif option == "oblivious":
+        matmul_cache_oblivious(cs, A_addr, B_addr, C_addr)
+    elif option == "adaptive":
+        matmul_cache_adaptive(cs, A_addr, B_addr, C_addr)
+    else:
+        raise ValueError('Invalid option')
+    end = time.time()
+
+    C = cs.dump_array(C_addr)
+
+    summaries = cs.get_summaries()
+    print(f'N: {n} Is multiplication correct: {(np.matmul(A, B) == C).all()} '
+          f'Runtime for {len(summaries)} caches (sec): {end - begin:.6f}')
+    for b, c, stats in zip(block_sz, cache_sz, summaries):
+        print(f'Block size: {b} Cache size: {c} Cache misses: {stats["cache_misses"]} '
+              f'Total access: {stats["total_access"]} Hit rate: {stats["hit_rate"]:.8f}')
+
+    return [s["cache_misses"] for s in summaries], [s["total_access"] for s in summaries], end - begin
+
+def record(option, n, block_sz, cache_sz):
+    """Run option once on a recording Simulator and return its address trace.
+
+    The trace does not depend on the cache configuration (except for 'aware', which is
+    tuned to cache_sz), so it can be replayed against any cache with replay().
+    """
+    A = np.random.randint(-20, 20, size=(n, n))
+    B = np.random.randint(-20, 20, size=(n, n))
+
+    begin = time.time()
+
+    cs = Simulator(
+        memory_size=2**26,
+        cache_size=cache_sz,
+        block_size=block_sz,
+        mapping_pol=None,
+        write_pol="WT",
+        replace_pol="lru",
+        record_trace=True
+    )
+
+    A_addr = load_matrix_to_cs(cs, A, name="A")
+    B_addr = load_matrix_to_cs(cs, B, name="B")
+    C_addr = cs.allocate(n, n, default_val=0, name="C", through_cache=False)
+
+    if option == "naive":
+        matmul_naive(cs, A_addr, B_addr, C_addr)
+    elif option == 'aware':
+        matmul_cache_aware(cs, A_addr, B_addr, C_addr, cache_sz=cache_sz)
+    elif option == "oblivious":
+        matmul_cache_oblivious(cs, A_addr, B_addr, C_addr)
+    elif option == "adaptive":
+        matmul_cache_adaptive(cs, A_addr, B_addr, C_addr)
+    else:
+        raise ValueError('Invalid option')
+
+    C = cs.dump_array(C_addr)
+
+    end = time.time()
+    print(f'Recorded {option} N: {n} Accesses: {len(cs.trace)} '
+          f'Is multiplication correct: {(np.matmul(A, B) == C).all()} Time (sec): {end - begin:.6f}')
+
+    return cs.trace
+
 def draw_superimposed_bar_graph(hits, access, title, x_ticks_labels):
     ind = np.arange(len(hits))
 
@@ -117,18 +205,11 @@ def set_1_testing_separately_naive():
     cache_size = [4, 16, 64, 256, 1024]#[64, 1024, 4096, 16384, 65536] # Tall-cache size
     replace_policy = "lru"
 
-    cache_misses = []
-    cache_access = []
-    total_time = []
-    label = []
     option = "naive"
-    for i in range(len(block_size)):
-        miss, access, run_time = test(option, n = n, block_sz=block_size[i], cache_sz=cache_size[i],
-                mapping_pol = mapping_policy, replace_pol = replace_policy)
-        cache_misses.append(miss)
-        cache_access.append(access)
-        total_time.append(run_time)
-        label.append(f"cs:{cache_size[i]}\nbs:{block_size[i]}")
+    # One run for all the cache configurations
+    cache_misses, cache_access, total_time = test_fanout(option, n=n, block_sz=block_size, cache_sz=cache_size,
+                                                         mapping_pol=mapping_policy, replace_pol=replace_policy)
+    label = [f"cs:{cache_size[i]}\nbs:{block_size[i]}" for i in range(len(block_size))]
 
 
     draw_superimposed_bar_graph(cache_misses, cache_access,
@@ -169,18 +250,11 @@ def set_1_testing_separately_oblivious():
     cache_size = [4, 16, 64, 256, 1024]#[64, 1024, 4096, 16384, 65536] # Tall-cache size
     replace_policy = "lru"
 
-    cache_misses = []
-    cache_access = []
-    total_time = []
-    label = []
     option = "oblivious"
-    for i in range(len(block_size)):
-        miss, access, run_time = test(option, n = n, block_sz=block_size[i], cache_sz=cache_size[i],
-                mapping_pol = mapping_policy, replace_pol = replace_policy)
-        cache_misses.append(miss)
-        cache_access.append(access)
-        total_time.append(run_time)
-        label.append(f"cs:{cache_size[i]}\nbs:{block_size[i]}")
+    # One run for all the cache configurations
+    cache_misses, cache_access, total_time = test_fanout(option, n=n, block_sz=block_size, cache_sz=cache_size,
+                                                         mapping_pol=mapping_policy, replace_pol=replace_policy)
+    label = [f"cs:{cache_size[i]}\nbs:{block_size[i]}" for i in range(len(block_size))]
 
 
     draw_superimposed_bar_graph(cache_misses, cache_access,
@@ -195,18 +269,11 @@ def set_1_testing_separately_adaptive():
     cache_size = [4, 16, 64, 256, 1024]#[64, 1024, 4096, 16384, 65536] # Tall-cache size
     replace_policy = "lru"
 
-    cache_misses = []
-    cache_access = []
-    total_time = []
-    label = []
     option = "adaptive"
-    for i in range(len(block_size)):
-        miss, access, run_time = test(option, n = n, block_sz=block_size[i], cache_sz=cache_size[i],
-                mapping_pol = mapping_policy, replace_pol = replace_policy)
-        cache_misses.append(miss)
-        cache_access.append(access)
-        total_time.append(run_time)
-        label.append(f"cs:{cache_size[i]}\nbs:{block_size[i]}")
+    # One run for all the cache configurations
+    cache_misses, cache_access, total_time = test_fanout(option, n=n, block_sz=block_size, cache_sz=cache_size,
+                                                         mapping_pol=mapping_policy, replace_pol=replace_policy)
+    label = [f"cs:{cache_size[i]}\nbs:{block_size[i]}" for i in range(len(block_size))]
 
 
     draw_superimposed_bar_graph(cache_misses, cache_access,
@@ -227,12 +294,18 @@ def set_2_testing_together():
     cache_access = np.zeros(shape=(len(cache_size), len(option)))
     label = []
 
+    # Each algorithm is run once and its trace replayed for every cache size
+    # ('aware' depends on the cache size so it is recorded per cache size)
+    for i in range(len(option)):
+        trace = None
+        for j in range(len(cache_size)):
+            if trace is None or option[i] == "aware":
+                trace = record(option[i], n=n, block_sz=block_size[j], cache_sz=cache_size[j])
+            stats = replay(trace, cache_size=cache_size[j], block_size=block_size[j],
+                           mapping_pol=mapping_policy, replace_pol=replace_policy)
+            cache_misses[j][i] = stats["cache_misses"]
+            cache_access[j][i] = stats["total_access"]
     for j in range(len(cache_size)):
-        for i in range(len(option)):
-            miss, access, run_time = test(option[i], n=n, block_sz=block_size[j], cache_sz=cache_size[j],
-                                         mapping_pol=mapping_policy, replace_pol=replace_policy)
-            cache_misses[j][i] = miss
-            cache_access[j][i] = access
         label.append(f"bs:{block_size[j]}, cs:{cache_size[j]}")
         
     print(cache_misses)
@@ -247,9 +320,31 @@ def set_2_testing_together():
                                 f"Cache misses of different algorithms when n={n}",
                                 label, option)
 
+def set_3_miss_ratio_curve():
+    # Fully associative LRU has the inclusion property, so one pass over each trace
+    # gives exact misses for the whole cache size axis
+    n = 64
+    block_size = 8
+    cache_size = [block_size * 2**k for k in range(1, 12)]
+    option = ["naive", "oblivious", "adaptive"]
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    for opt in option:
+        trace = record(opt, n=n, block_sz=block_size, cache_sz=cache_size[0])
+        misses = lru_miss_curve(trace, block_size, cache_size)
+        ax.plot(cache_size, [misses[c] / len(trace) for c in cache_size], marker="o", label=opt)
+    ax.set_xscale("log", base=2)
+    ax.set_xlabel("Cache size")
+    ax.set_ylabel("Miss ratio")
+    ax.legend()
+    plt.title(f"LRU miss ratio curve when n={n}, bs={block_size}")
+    plt.show()
+
 # Stress-test with
 #set_1_testing_separately_aware()
 #set_1_testing_separately_naive()
 #set_1_testing_separately_oblivious()
 #set_1_testing_separately_adaptive()
+#set_3_miss_ratio_curve()
 set_2_testing_together()
\ No newline at end of file
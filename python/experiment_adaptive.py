@@ -16,7 +16,7 @@ def test(option, n, block_sz, cache_sz, mapping_pol, replace_pol, c1):
     begin = time.time()
 
     cs = SimulatorAdaptive(
-        memory_size=2**24,
+        memory_size=2**26,
         cache_size=cache_sz,
         block_size=block_sz,
         mapping_pol=mapping_pol,
@@ -25,9 +25,9 @@ def test(option, n, block_sz, cache_sz, mapping_pol, replace_pol, c1):
         c1=c1
     )
 
-    A_addr = load_matrix_to_cs(cs, A)
-    B_addr = load_matrix_to_cs(cs, B)
-    C_addr = cs.allocate(n, n, default_val=0)
+    A_addr = load_matrix_to_cs(cs, A, name="A")
+    B_addr = load_matrix_to_cs(cs, B, name="B")
+    C_addr = cs.allocate(n, n, default_val=0, name="C", through_cache=False)
 
     end = time.time()
     print(f"Initialization time (sec): {end-begin:.6f}")
@@ -45,7 +45,7 @@ def test(option, n, block_sz, cache_sz, mapping_pol, replace_pol, c1):
         raise ValueError('Invalid option')
     end = time.time()
 
-    C = np.array([[cs.read(C_addr, i, j) for j in range(n)] for i in range(n)])
+    C = cs.dump_array(C_addr)
 
     stats = cs.get_access_summary()
     print(f'N: {n} Block size: {block_sz} Cache size: {cache_sz}\n'
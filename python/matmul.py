@@ -36,29 +36,24 @@ def matmul_cache_aware(cs, A, B, C, cache_sz=1):
     for blk_i in range(C_r_blocks):
         for blk_j in range(C_c_blocks):
             for blk_k in range(k_blocks):
-                for i in range(blk_i * size_each_block, min(A_r, (blk_i + 1) * size_each_block)):
-                    for j in range(blk_j * size_each_block, min(B_c, (blk_j + 1) * size_each_block)):
-                        c = 0
-                        for k in range(blk_k * size_each_block, min(A_c, (blk_k + 1) * size_each_block)):
-                            c += cs.read(A, i, k) * cs.read(B, k, j)
-                        cs.increment(C, i, j, value=c)
+                i0, i1 = blk_i * size_each_block, min(A_r, (blk_i + 1) * size_each_block)
+                j0, j1 = blk_j * size_each_block, min(B_c, (blk_j + 1) * size_each_block)
+                k0, k1 = blk_k * size_each_block, min(A_c, (blk_k + 1) * size_each_block)
+                # C[i0:i1][j0:j1] += A[i0:i1][k0:k1] * B[k0:k1][j0:j1]
+                cs.matmul_tile(A, i0, k0, B, k0, j0, C, i0, j0,
+                               i1 - i0, k1 - k0, j1 - j0, accumulate=True)
 
 def matmul_cache_oblivious(cs, A, B, C):
     
     def matmul_recursive_helper(cs, n, a_r, a_c, b_r, b_c, base_arr=None):
     
         if base_arr is None:
-            C_arr = cs.allocate(n, n, default_val=0)
+            C_arr = cs.allocate(n, n, default_val=0, name="C_tmp")
         else:
             C_arr = base_arr
 
         if n <= 2:
-            for i in range(n):
-                for j in range(n):
-                    c = 0
-                    for k in range(n):
-                        c += cs.read(A, a_r + i, a_c + k) * cs.read(B, b_r + k, b_c + j)
-                    cs.write(C_arr, i, j, value=c)
+            cs.matmul_tile(A, a_r, a_c, B, b_r, b_c, C_arr, 0, 0, n, n, n)
 
         else:
             sub_n = n // 2
@@ -88,12 +83,7 @@ def matmul_cache_adaptive(cs, A, B, C):
     def matmul_recursive_helper_cache_adaptive(cs, n, a_r, a_c, b_r, b_c, c_r, c_c):
     
         if n <= 2:
-            for i in range(n):
-                for j in range(n):
-                    c = 0
-                    for k in range(n):
-                        c += cs.read(A, a_r + i, a_c + k) * cs.read(B, b_r + k, b_c + j)
-                    cs.increment(C, i + c_r, j + c_c, value=c)
+            cs.matmul_tile(A, a_r, a_c, B, b_r, b_c, C, c_r, c_c, n, n, n, accumulate=True)
 
         else:
             sub_n = n // 2
@@ -119,14 +109,9 @@ def matmul_cache_adaptive(cs, A, B, C):
     matmul_recursive_helper_cache_adaptive(cs, n, 0, 0, 0, 0, 0, 0)
 
 
-def load_matrix_to_cs(cs, matrix):
-    row_num = len(matrix)
-    col_num = len(matrix[0])
-    addr = cs.allocate(row_num, col_num)
-    for i in range(row_num):
-        for j in range(col_num):
-            cs.write(addr, i, j, value=matrix[i][j])
-    return addr
+def load_matrix_to_cs(cs, matrix, name=None):
+    # Straight into memory, loading isn't part of the measured accesses
+    return cs.load_array(np.asarray(matrix), name=name)
 
 
 def test(option, args):
@@ -153,9 +138,9 @@ def test(option, args):
         replace_pol="LRU"
     )
 
-    A_addr = load_matrix_to_cs(cs, A)
-    B_addr = load_matrix_to_cs(cs, B)
-    C_addr = cs.allocate(n, n, default_val=0)
+    A_addr = load_matrix_to_cs(cs, A, name="A")
+    B_addr = load_matrix_to_cs(cs, B, name="B")
+    C_addr = cs.allocate(n, n, default_val=0, name="C", through_cache=False)
 
     end = time.time()
     print(f"Initialization time (sec): {end-begin:.6f}")
@@ -175,7 +160,7 @@ def test(option, args):
         raise ValueError('Invalid option')
     end = time.time()
 
-    C = np.array([[cs.read(C_addr, i, j) for j in range(n)] for i in range(n)])
+    C = cs.dump_array(C_addr)
 
     stats = cs.get_access_summary()
     print(f'Option: {option}\n'
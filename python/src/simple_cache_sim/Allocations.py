@@ -0,0 +1,98 @@
+from bisect import bisect_right
+from typing import Dict
+
+
+class Allocations():
+    """
+    Hit, miss and eviction counters per allocation (see Simulator.allocate)
+
+    Misses and evictions are attributed on the CPU miss path only, by bisecting the start
+    addresses of the allocations, so a hit costs nothing extra. Accesses (so hits) are only
+    counted with count_accesses, by the Simulator entry points (one list increment per access,
+    one add per call for the bulk operations). Allocations made with the same name share their
+    counters, and an evicted block is charged to the allocation holding its first word.
+    """
+
+    def __init__(self, count_accesses: bool = False):
+        self.count_accesses = count_accesses
+        self.names = []  # counter -> name
+        self._counter_of = dict()  # name -> counter
+        self.starts = []  # start address of every allocation (increasing)
+        self.owners = []  # allocation -> counter
+        self.accesses = []
+        self.misses = []
+        self.evictions = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name: str, start: int) -> int:
+        """Register an allocation.
+
+        :param name: label of the allocation (allocations with the same name share counters)
+        :param start: start address, not lower than the previous allocation
+        :return: counter of the allocation
+        """
+        assert not self.starts or start >= self.starts[-1], "Allocations must be made in address order"
+        counter = self._counter_of.get(name)
+        if counter is None:
+            counter = len(self.names)
+            self._counter_of[name] = counter
+            self.names.append(name)
+            self.accesses.append(0)
+            self.misses.append(0)
+            self.evictions.append(0)
+        self.starts.append(start)
+        self.owners.append(counter)
+        return counter
+
+    def accessed(self, names) -> int:
+        """Accesses so far of the allocations with these names (counted with count_accesses)."""
+        counters = [self._counter_of.get(name) for name in names]
+        return sum(self.accesses[counter] for counter in counters if counter is not None)
+
+    def owner(self, address: int) -> int:
+        """Counter of the allocation holding an address."""
+        return self.owners[bisect_right(self.starts, address) - 1]
+
+    def miss(self, address: int):
+        """Called by the CPU on every miss."""
+        if self.starts:
+            self.misses[self.owner(address)] += 1
+
+    def evicted(self, address: int):
+        """Called by the CPU when a block starting at address is evicted."""
+        if self.starts:
+            self.evictions[self.owner(address)] += 1
+
+    def reset(self):
+        # In place, the Simulator keeps a reference to accesses
+        n = len(self.names)
+        self.accesses[:] = [0] * n
+        self.misses[:] = [0] * n
+        self.evictions[:] = [0] * n
+
+    def summary(self) -> Dict[str, dict]:
+        """Counters of every allocation name.
+
+        :return: dict name -> dict with the same keys as get_access_summary (cache_hits,
+                 cache_misses, total_access, hit_rate) plus evictions. cache_hits, total_access
+                 and hit_rate are None if accesses are not counted.
+        """
+        summary = dict()
+        for counter, name in enumerate(self.names):
+            misses = self.misses[counter]
+            if self.count_accesses:
+                accesses = self.accesses[counter]
+                hits = accesses - misses
+                hit_rate = hits / accesses if accesses else 0.0
+            else:
+                accesses = hits = hit_rate = None
+            summary[name] = {
+                'cache_hits': hits,
+                'cache_misses': misses,
+                'total_access': accesses,
+                'hit_rate': hit_rate,
+                'evictions': self.evictions[counter],
+            }
+        return summary
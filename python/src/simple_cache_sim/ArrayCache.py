@@ -0,0 +1,336 @@
+import random
+from array import array
+
+
+from simple_cache_sim.Cache import Cache
+from simple_cache_sim.Block import Block
+
+
+class ArrayCache(Cache):
+    """
+    Set-associative cache stored in flat preallocated buffers
+
+    Same interface as Cache, but instead of a dict and a policy object per set, block numbers,
+    valid and dirty bits and replacement metadata live in flat buffers indexed by
+    slot = set * ways + way, and one dict maps every cached block number to its slot. A lookup
+    is one dict access whatever the associativity, a hit then stores the new rank of the slot:
+    the last access time for LRU, the fill time for FIFO and count << STAMP_BITS | last access
+    time for LFU (ties broken by LRU). For LRU and FIFO the slots of each set are also kept in
+    eviction order in a doubly linked list (prev/next buffers, with one sentinel per set), so the
+    victim is the head of its set in O(1) at any associativity. LFU finds the slot of lowest rank
+    with one scan of the set.
+
+    Policies other than LRU, LFU, FIFO and RAND are not supported, the only policy_args is
+    LFU's aging_period. There are no per-set policy objects (eviction_handler), blocks is built
+    on demand and dirty is a flat buffer, so every Cache method using them is overridden.
+
+    The buffers are indexed by set and way, but a lookup goes through slots rather than comparing
+    the tags of the set: in Python a scan of the ways costs one interpreted step per way, a dict
+    probe the same at any associativity. Compare the engines with the assoc cases of benchmark.py.
+    """
+    # Bits of the access time in an LFU rank
+    STAMP_BITS = 40
+
+    def __init__(self, cache_size: int, block_size: int, memory_size: int,
+                 mapping_pol: int = None, replace_pol: str = "LRU", write_pol: str = "WT",
+                 policy_args: dict = None):
+        '''
+
+        :param cache_size: cache size in number of integers
+        :param block_size: number of integers per block
+        :param memory_size: memory size in number of integers
+        :param mapping_pol: number of ways (None: fully associative)
+        :param replace_pol: "LRU", "LFU", "FIFO" or "RAND"
+        :param write_pol: "WT" or "WB"
+        :param policy_args: {'aging_period': n} for LFU (see update_policies.LFUPolicy)
+        '''
+        policy = replace_pol.lower()
+        if policy.startswith("rand"):
+            policy = "rand"
+        if policy not in ("lru", "lfu", "fifo", "rand"):
+            raise ValueError(f'Invalid eviction policy for ArrayCache: {replace_pol}')
+        self._policy = policy
+        self._ordered = policy in ("lru", "fifo")  # Victims come from the linked lists
+        unknown = set(policy_args or {}) - ({'aging_period'} if policy == "lfu" else set())
+        if unknown:
+            raise ValueError(f'Invalid policy_args for ArrayCache {replace_pol}: {sorted(unknown)}')
+        self._configure(cache_size, block_size, memory_size, mapping_pol, replace_pol, write_pol, policy_args)
+        self._aging_period = self.policy_args.get('aging_period')
+        self._init_slots()
+
+        self._clock = 0
+        self._stamp_mask = (1 << self.STAMP_BITS) - 1
+        self._lru = policy == "lru"  # Hits update the rank with LRU and LFU only
+        self._lfu = policy == "lfu"
+
+    def _set_geometry(self, num_sets: int, ways: int):
+        super()._set_geometry(num_sets, ways)
+        self._ways = ways
+        self._set_bits = self._tag_shift - self._set_shift
+        self._set_mask = num_sets - 1
+
+    def _init_slots(self):
+        # Empty buffers for the current geometry
+        slots = self._total_slots = self.num_sets * self._ways
+        self.numbers = array('q', [-1]) * slots  # Block number held by each slot, -1 if empty
+        self.valid = bytearray(slots)  # 1 if the slot holds a block
+        self.dirty = bytearray(slots)  # 1 if the block was written under write-back
+        self.rank = [0] * slots  # Eviction order in the set, lowest first (see the class docstring)
+        self.ticks = array('q', [0]) * self.num_sets  # Accesses since the last aging of each set (LFU)
+        self.data = [None] * slots  # Block held by each slot
+        self.slots = dict()  # Block number -> slot of every cached block
+        # Eviction order of each set for LRU and FIFO: slots + cache_set is the sentinel of the set,
+        # next[sentinel] the victim and prev[sentinel] the most recent slot
+        sentinels = range(slots, slots + self.num_sets)
+        self.next = [0] * slots + list(sentinels)
+        self.prev = [0] * slots + list(sentinels)
+
+    @property
+    def blocks(self):
+        """Per-set dicts {tag: Block} like Cache.blocks (built on demand, O(cache size))."""
+        blocks = [dict() for _ in range(self.num_sets)]
+        for number, slot in self.slots.items():
+            blocks[slot // self._ways][number >> self._set_bits] = self.data[slot]
+        return blocks
+
+    def contains(self, address: int) -> bool:
+        """Whether the block holding address is cached (doesn't count as an access)."""
+        return (address >> self._set_shift) in self.slots
+
+    def occupancy(self) -> int:
+        """Number of blocks cached."""
+        return len(self.slots)
+
+    def remove(self, address: int):
+        """Invalidate the block holding address.
+
+        :return: tuple (block, dirty), None if the block is not cached
+        """
+        slot = self.slots.pop(address >> self._set_shift, None)
+        if slot is None:
+            return None
+        block = self.data[slot]
+        dirty = self.dirty[slot] == 1
+        self.numbers[slot] = -1
+        self.valid[slot] = 0
+        self.dirty[slot] = 0
+        self.data[slot] = None
+        if self._ordered:
+            self._unlink(slot)
+        return block, dirty
+
+    def mark_dirty(self, address: int) -> bool:
+        """Mark the block holding address dirty (a write-back from the level above).
+
+        :return: False if the block is not cached
+        """
+        slot = self.slots.get(address >> self._set_shift)
+        if slot is None:
+            return False
+        self.dirty[slot] = 1
+        return True
+
+    def dirty_blocks(self):
+        """Addresses of the dirty blocks."""
+        return [self.numbers[slot] << self._set_shift
+                for slot, is_dirty in enumerate(self.dirty) if is_dirty]
+
+    def is_dirty(self, cache_set: int, cache_tag: int) -> bool:
+        """Whether the block with this tag in this set is dirty."""
+        return self.dirty[self.slots[(cache_tag << self._set_bits) | cache_set]] == 1
+
+    def flush(self) -> int:
+        """Clean every dirty block (as if written back to memory).
+
+        :return: number of blocks that were dirty
+        """
+        count = self.dirty.count(1)
+        self.dirty = bytearray(len(self.dirty))
+        return count
+
+    def _contents(self):
+        """Blocks of every set in eviction order, as (recency, block number, block, dirty, access count).
+
+        Recency is the last access time (fill time for FIFO), the rank from the newest block for RAND.
+        """
+        ways = self._ways
+        rank = self.rank
+        lines = []
+        for base in range(0, self.num_sets * ways, ways):
+            slots = [s for s in range(base, base + ways) if self.valid[s]]
+            if self._policy == "rand":
+                random.shuffle(slots)
+                n = len(slots)
+                lines.append([(i - n, self.numbers[s], self.data[s], self.dirty[s] == 1, 0)
+                              for i, s in enumerate(slots)])
+                continue
+            slots.sort(key=rank.__getitem__)
+            lines.append([(rank[s] & self._stamp_mask, self.numbers[s], self.data[s], self.dirty[s] == 1,
+                           rank[s] >> self.STAMP_BITS) for s in slots])
+        return lines
+
+    def _rebuild(self, num_sets: int, ways: int, lines):
+        # Start over with the new geometry and place each set's blocks from way 0, keeping
+        # their access times and counts
+        self._set_geometry(num_sets, ways)
+        self._init_slots()
+        lfu = self._policy == "lfu"
+        for base, line in zip(range(0, num_sets * ways, ways), lines):
+            for slot, (recency, number, block, is_dirty, count) in enumerate(line, base):
+                self.numbers[slot] = number
+                self.valid[slot] = 1
+                self.dirty[slot] = is_dirty
+                self.data[slot] = block
+                self.rank[slot] = (count << self.STAMP_BITS | recency) if lfu else max(recency, 0)
+                self.slots[number] = slot
+                if self._ordered:
+                    self._link(slot, self._total_slots + base // ways)
+
+    def _resize_ways(self, new_ways: int):
+        lines = self._contents()
+        dropped = []
+        for cache_set, line in enumerate(lines):
+            if len(line) > new_ways:
+                dropped.extend((number << self._set_shift, block, dirty)
+                               for _, number, block, dirty, _ in line[:len(line) - new_ways])
+                lines[cache_set] = line[len(line) - new_ways:]
+        ticks = self.ticks
+        self._rebuild(self.num_sets, new_ways, lines)
+        self.ticks = ticks
+        return dropped
+
+    def _unlink(self, slot: int):
+        prev, nxt = self.prev, self.next
+        p, n = prev[slot], nxt[slot]
+        nxt[p] = n
+        prev[n] = p
+
+    def _link(self, slot: int, sentinel: int):
+        # Append slot to its set's list, as the most recent slot
+        prev, nxt = self.prev, self.next
+        last = prev[sentinel]
+        nxt[last] = slot
+        prev[slot] = last
+        nxt[slot] = sentinel
+        prev[sentinel] = slot
+
+    def _hit_lru(self, slot: int):
+        # Move slot to the end of its set's list (inlined _unlink and _link, hits are the hot path)
+        self._clock += 1
+        self.rank[slot] = self._clock
+        nxt = self.next
+        n = nxt[slot]
+        if n < self._total_slots:  # Not already the most recent slot
+            prev = self.prev
+            p = prev[slot]
+            nxt[p] = n
+            prev[n] = p
+            sentinel = self._total_slots + slot // self._ways
+            last = prev[sentinel]
+            nxt[last] = slot
+            prev[slot] = last
+            nxt[slot] = sentinel
+            prev[sentinel] = slot
+
+    def _hit_lfu(self, slot: int):
+        # One more access of an LFU block, with aging every aging_period accesses of its set
+        self._clock += 1
+        self.rank[slot] = ((self.rank[slot] >> self.STAMP_BITS) + 1) << self.STAMP_BITS | self._clock
+        if self._aging_period is not None:
+            self._tick(slot // self._ways)
+
+    def _tick(self, cache_set: int):
+        self.ticks[cache_set] += 1
+        if self.ticks[cache_set] >= self._aging_period:
+            self.ticks[cache_set] = 0
+            self._age(cache_set * self._ways)
+
+    def _age(self, base: int):
+        # Halve the counts of a set. Like LFUPolicy.age, blocks whose counts merge keep the
+        # lower-count ones first, so the set's access times are reassigned in rank order.
+        rank = self.rank
+        slots = sorted((s for s in range(base, base + self._ways) if self.valid[s]), key=rank.__getitem__)
+        stamps = sorted(rank[s] & self._stamp_mask for s in slots)
+        for s, stamp in zip(slots, stamps):
+            rank[s] = (rank[s] >> (self.STAMP_BITS + 1)) << self.STAMP_BITS | stamp
+
+    def read_from_cache(self, address):
+        """Read a block of memory from the cache.
+
+        :param int address: memory address for data to read from cache
+        :return: block of memory read from the cache (None if cache miss)
+        """
+        slot = self.slots.get(address >> self._set_shift)
+        if slot is None:
+            return None
+        if self._lru:
+            self._hit_lru(slot)
+        elif self._lfu:
+            self._hit_lfu(slot)
+        return self.data[slot].data
+
+    def load_from_memory(self, address: int, data: Block, dirty: bool = False):
+        """Load a block of memory into the cache.
+
+        :param int address: memory address for data to load to cache
+        :param data: block from memory to be loaded into cache
+        :param dirty: whether the loaded block is dirty (written under write-back)
+        :return: tuple containing victim address, data and whether it was dirty (None if no victim)
+        """
+        number = address >> self._set_shift
+        ways = self._ways
+        base = (number & self._set_mask) * ways
+        victim = None
+
+        # Fill an invalid way first, otherwise evict the head of the set's list (LRU, FIFO)
+        # or the slot of lowest rank (LFU)
+        slot = self.valid.find(0, base, base + ways)
+        if slot < 0:
+            if ways == 1:
+                slot = base
+            elif self._ordered:
+                slot = self.next[self._total_slots + base // ways]
+            elif self._policy == "rand":
+                slot = base + random.randrange(ways)
+            elif self.num_sets == 1:
+                slot = self.rank.index(min(self.rank))
+            else:
+                ranks = self.rank[base:base + ways]
+                slot = base + ranks.index(min(ranks))
+            old = self.numbers[slot]
+            del self.slots[old]
+            victim = (old << self._set_shift, self.data[slot], self.dirty[slot] == 1)
+            if self._ordered:
+                self._unlink(slot)
+
+        self.numbers[slot] = number
+        self.slots[number] = slot
+        self.valid[slot] = 1
+        self.dirty[slot] = dirty
+        self.data[slot] = data
+        self._clock += 1
+        self.rank[slot] = self._clock  # Count 0 for LFU
+        if self._ordered:
+            self._link(slot, self._total_slots + base // ways)
+        if self._aging_period is not None:
+            self._tick(base // ways)
+        return victim
+
+    def overwrite_cache(self, address: int, byte: int):
+        """Write a byte to cache. (the address must be a valid one which means it was loaded from the memory to cache)
+
+        :param int address: memory address for data to write to cache
+        :param int byte: byte of data to write to cache
+        :return: boolean indicating whether data was written to cache
+        """
+        slot = self.slots.get(address >> self._set_shift)
+        if slot is None:
+            return False
+        self.data[slot].data[address & (self.block_size - 1)] = byte
+        if self._write_back:
+            self.dirty[slot] = 1
+        if self._lru:
+            self._hit_lru(slot)
+        elif self._lfu:
+            self._hit_lfu(slot)
+        return True
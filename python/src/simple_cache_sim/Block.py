@@ -6,10 +6,11 @@ class Block():
     Block in cache
 
     """
-    def __init__(self, block_size: int):
+    def __init__(self, block_size: int, data: np.ndarray = None):
         """
 
         :param block_size: number of values (integers) we want to store per block
+        :param data: view of the block inside Memory (a new zeroed array if None)
         """
         # self.tag = 0 # Tag is changed according to the address of memory
         # self.valid = 0 # If this is valid address
@@ -17,5 +18,20 @@ class Block():
         # self.modified = 0
 
         self.block_size = block_size
-        # self.data = [0] * block_size # A list of values (integers)
-        self.data = np.full(shape=block_size, fill_value=np.nan, dtype=np.int64)
+        # Zero-copy view into the contiguous memory buffer, so writes through the block land in memory
+        self.data = np.zeros(block_size, dtype=np.int64) if data is None else data
+
+    def __reduce__(self):
+        # A view into Memory is pickled as (memory buffer, offset), so that after unpickling it is
+        # still a view of the (unpickled) memory buffer rather than a copy
+        base = self.data
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if base is self.data:
+            return Block, (self.block_size, self.data)
+        offset = (self.data.__array_interface__['data'][0] - base.__array_interface__['data'][0]) // self.data.itemsize
+        return _block_view, (self.block_size, base, offset)
+
+
+def _block_view(block_size: int, base: np.ndarray, offset: int) -> Block:
+    return Block(block_size, base[offset:offset + block_size])
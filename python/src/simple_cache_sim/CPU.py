@@ -1,58 +1,246 @@
 from simple_cache_sim.Cache import Cache
 from simple_cache_sim.Memory import Memory
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.CacheHierarchy import CacheHierarchy
 
 import random
+import sys
+
+# Access count of work that is not scheduled (an int: comparing ints is cheaper than with math.inf)
+NEVER = sys.maxsize
+
 
 class CPU():
-    def __init__(self, cache: Cache, memory: Memory, write_pol: str = "WT"):
+    """
+    Issues reads and writes to a cache backed by memory and counts the memory traffic
+
+    Blocks in the cache are views of memory, so values are always consistent and the write
+    policies only change the accounting:
+    - WT (write-through): every write also writes its word to memory (words_written)
+    - WB (write-back): writes mark the block dirty, a dirty block is written back to memory
+      when it is evicted (blocks_written_back) or flushed (blocks_flushed)
+    - write_allocate: a write miss loads the block into the cache (blocks_read), otherwise
+      the word is written straight to memory (words_written) and the cache is left untouched
+    """
+    def __init__(self, cache: Cache, memory: Memory, write_pol: str = "WT", trace: Trace = None,
+                 write_allocate: bool = True, allocations=None, prefetcher=None, telemetry=None,
+                 hooks=None):
+        """
+
+        :param prefetcher: optional Prefetcher (see prefetchers) issuing extra fills after every miss
+        :param telemetry: optional Telemetry (see telemetry) sampling the counters every N accesses
+                          (scheduled like checkpoints, see next_event)
+        :param hooks: optional Hooks (see Hooks) called on hits, misses, fills, evictions, write-backs
+                      and resizes, bound here so that events without subscribers cost nothing
+        """
         self.cache = cache
         self.memory = memory
         self.write_pol = write_pol
+        if write_pol not in (Cache.WRITE_BACK, Cache.WRITE_THROUGH):
+            raise ValueError(f'Invalid write policy: {write_pol}')
+        self.write_allocate = write_allocate
+        self.trace = trace  # If set, every access is recorded into it
+        self.allocations = allocations  # If set, misses and evictions are attributed to allocations
 
         self.hits = 0
         self.miss = 0
         self.total_access = 0
+        self.blocks_read = 0  # Blocks loaded from memory into the cache
+        self.blocks_written_back = 0  # Dirty blocks written back to memory when evicted (WB)
+        self.blocks_flushed = 0  # Dirty blocks written back to memory by flush (WB)
+        self.words_written = 0  # Words written directly to memory (WT, or no-write-allocate misses)
+        self.evictions = 0  # Blocks replaced by a fill or dropped by a resize (CPUAdaptive)
+        self.last_victim = None  # (address, block, dirty) of the last eviction
+        # Work scheduled at an access count: telemetry.sample() at next_sample, checkpoint() at
+        # next_checkpoint (see Simulator checkpoint_every) and follow_profile() at next_resize
+        # (CPUAdaptive). Every access compares total_access with next_event, the earliest of them,
+        # which the setters keep up to date, so an access pays one comparison for all of them.
+        self.next_event = NEVER
+        self._next_sample = NEVER
+        self._next_checkpoint = NEVER
+        self._next_resize = NEVER
+        self.checkpoint = None
+        self.prefetcher = prefetcher
+        if prefetcher is not None:
+            prefetcher.attach(self)
+        self.telemetry = telemetry
+        if telemetry is not None:
+            telemetry.attach(self)
+        self.hooks = hooks
+        if hooks is not None:
+            hooks.bind(self)
+        if isinstance(cache, CacheHierarchy):
+            # Blocks leave a hierarchy from its last level, also while promoting a hit
+            cache.on_evict = self._evict
+
+    @property
+    def next_sample(self):
+        return self._next_sample
+
+    @next_sample.setter
+    def next_sample(self, access):
+        self._next_sample = access
+        self.next_event = min(access, self._next_checkpoint, self._next_resize)
+
+    @property
+    def next_checkpoint(self):
+        return self._next_checkpoint
+
+    @next_checkpoint.setter
+    def next_checkpoint(self, access):
+        self._next_checkpoint = access
+        self.next_event = min(self._next_sample, access, self._next_resize)
+
+    @property
+    def next_resize(self):
+        return self._next_resize
+
+    @next_resize.setter
+    def next_resize(self, access):
+        self._next_resize = access
+        self.next_event = min(self._next_sample, self._next_checkpoint, access)
+
+    def _scheduled(self):
+        # Run the work due at this access count (see next_event), the resize first so that
+        # samples and checkpoints see the new size
+        access = self.total_access
+        if access >= self._next_resize:
+            self.follow_profile()
+        if access >= self._next_sample:
+            self.telemetry.sample()
+        if access >= self._next_checkpoint:
+            self.checkpoint()
+
+    def _fill(self, address, block, dirty=False):
+        # Load a block read from memory into the cache
+        self.blocks_read += 1
+        victim = self.cache.load_from_memory(address, block, dirty)
+        if victim is not None:
+            self._evict(victim)
+
+    def _evict(self, victim):
+        # A block left the cache, dirty blocks are written back to memory
+        self.evictions += 1
+        self.last_victim = victim
+        if victim[2]:
+            self.blocks_written_back += 1
+        if self.allocations is not None:
+            self.allocations.evicted(victim[0])
+        if self.prefetcher is not None:
+            self.prefetcher.evicted(victim[0])
 
     def read(self, address):
         # Read a value from cache #
         cache_block = self.cache.read_from_cache(address)
         self.total_access += 1
+        if self.trace is not None:
+            self.trace.append(address, Trace.READ)
 
         if cache_block is not None:
             self.hits += 1
+            if self.prefetcher is not None:
+                self.prefetcher.hit(address)
             value = cache_block.data[self.cache.get_offset(address)]
         else:
             self.miss += 1
-            cache_block = self.memory.read_block_from_memory(address)
-            victim_info = self.cache.load_from_memory(address, cache_block)
+            cache_block = self.memory.read_block_from_memory(address, self.cache.block_size)
+            self._fill(address, cache_block)
+            if self.allocations is not None:
+                self.allocations.miss(address)
             value = cache_block.data[self.cache.get_offset(address)]
+            if self.prefetcher is not None:
+                self.prefetcher.miss(address)
             self.change_cache_size()
 
+        if self.total_access >= self.next_event:
+            self._scheduled()
         return value
 
     def write(self, address, byte):
         """Write a byte to cache."""
         written = self.cache.overwrite_cache(address, byte)
         self.total_access += 1
+        if self.trace is not None:
+            self.trace.append(address, Trace.WRITE)
 
+        write_back = self.write_pol == Cache.WRITE_BACK
         if written:
             self.hits += 1
+            if self.prefetcher is not None:
+                self.prefetcher.hit(address)
+            if not write_back:
+                self.words_written += 1
         else:
             self.miss += 1
-            block = self.memory.read_block_from_memory(address)
+            block = self.memory.read_block_from_memory(address, self.cache.block_size)
             block.data[self.cache.get_offset(address)] = byte
-            self.cache.load_from_memory(address, block)
+            if self.write_allocate:
+                self._fill(address, block, dirty=write_back)
+                if not write_back:
+                    self.words_written += 1
+            else:
+                self.words_written += 1
+            if self.allocations is not None:
+                self.allocations.miss(address)
+            if self.prefetcher is not None:
+                self.prefetcher.miss(address)
             self.change_cache_size()
 
+        if self.total_access >= self.next_event:
+            self._scheduled()
+
+    def flush(self):
+        """Write every dirty block back to memory (e.g. at the end of a program), counted in
+        blocks_flushed."""
+        self.blocks_flushed += self.cache.flush()
+
     def reset_stats(self):
+        if isinstance(self.cache, CacheHierarchy):
+            self.cache.reset_stats()
         self.total_access = 0
         self.hits = 0
         self.miss = 0
+        self.blocks_read = 0
+        self.blocks_written_back = 0
+        self.blocks_flushed = 0
+        self.words_written = 0
+        self.evictions = 0
+        if self.allocations is not None:
+            self.allocations.reset()
+        if self.prefetcher is not None:
+            self.prefetcher.reset_stats()
+        if self.telemetry is not None:
+            self.telemetry.reset()
+
+    def get_counters(self):
+        """Raw counters (get_access_summary without hit_rate, defined even before any access),
+        plus the prefetcher counters if there is one."""
+        counters = {
+            'cache_hits': self.hits,
+            'cache_misses': self.miss,
+            'total_access': self.total_access,
+            'blocks_read': self.blocks_read,
+            'blocks_written_back': self.blocks_written_back,
+            'blocks_flushed': self.blocks_flushed,
+            'words_written': self.words_written,
+            'evictions': self.evictions,
+        }
+        if self.prefetcher is not None:
+            counters.update(self.prefetcher.get_counters())
+        return counters
+
+    def get_access_summary(self):
+        summary = self.get_counters()
+        summary['hit_rate'] = self.hits / self.total_access
+        return summary
 
     # Do nothing as we do not change anything
     def change_cache_size(self):
         return
 
+    def follow_profile(self):
+        return
+
 
 if __name__ == "__main__":
 
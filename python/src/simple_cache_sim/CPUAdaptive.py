@@ -1,58 +1,107 @@
 from simple_cache_sim.Cache import Cache
 from simple_cache_sim.Memory import Memory
-from simple_cache_sim.CPU import CPU
+from simple_cache_sim.CPU import CPU, NEVER
+from simple_cache_sim.memory_profiles import Profile
 
+from array import array
 import random
 import math
 class CPUAdaptive(CPU):
-    def __init__(self, cache: Cache, memory: Memory, write_pol: str = "WT", c1=4):
-        super().__init__(cache, memory, write_pol)
+    def __init__(self, cache: Cache, memory: Memory, write_pol: str = "WT", c1=4, trace=None,
+                 write_allocate: bool = True, resize_keep: str = "random", resize_every: int = 1,
+                 allocations=None, profile: Profile = None, seed: int = None, prefetcher=None,
+                 telemetry=None, hooks=None, record_misses: bool = False, work=None):
+        """
+
+        :param resize_keep: which blocks survive a shrink, "random", "lru" or "ways" (see Cache.resize),
+                            "ways" only for 2Q, ARC and LIRS
+        :param resize_every: ask a profile that isn't a memory_profiles.Profile (MemoryProfile2)
+                             for a new cache size every resize_every misses
+        :param profile: memory profile giving the cache size at each access count (see
+                        memory_profiles), followed at the exact access counts where it changes.
+                        MemoryProfile2 if None, asked on misses.
+        :param seed: seed of the default MemoryProfile2 coin
+        :param record_misses: keep the access count at every miss in miss_accesses (8 bytes per
+                              miss), needed by the adaptivity report (see adaptivity)
+        :param work: names of the allocations whose accesses are the progress of the run, e.g.
+                     ("A", "B") for a matrix multiplication. With record_misses their access count
+                     (see Allocations.accessed) is also kept at every miss, in miss_work.
+        """
+        super().__init__(cache, memory, write_pol, trace, write_allocate, allocations, prefetcher, telemetry,
+                         hooks)
+        cache.check_resize(resize_keep)
         self.c1 = c1
-        #self.memory_profile = MemoryProfile(cache=cache, c1=c1)
-        self.memory_profile = MemoryProfile2(cache=cache)
+        self.resize_keep = resize_keep
+        self.resize_every = resize_every
+        if profile is None:
+            profile = MemoryProfile2(cache=cache, resize_keep=resize_keep, seed=seed)
+        self.memory_profile = profile
+        # Profiles keyed to the access count are followed at next_resize (see follow_profile),
+        # the others are asked on misses (see change_cache_size)
+        self.keyed_profile = isinstance(profile, Profile)
+        # For the adaptivity report: (misses, accesses, cache size) at the start and after every
+        # resize, and with record_misses the access count at every miss
+        self.size_history = []
+        self.miss_accesses = array('q') if record_misses else None
+        self.work = work
+        self.miss_work = array('q') if record_misses and work is not None else None
+        if self.keyed_profile:
+            self.follow_profile()  # Start from the size at access 0
+        self.size_history = [(0, 0, cache.cache_size)]
+
+    def valid_cache_size(self, size: int) -> int:
+        """Largest cache size not above size that the cache can be resized to with resize_keep
+        (a power of two number of sets, or a whole number of ways), at least min_cache_size."""
+        lower = self.cache.min_cache_size(self.resize_keep)
+        if size <= lower:
+            return lower
+        if self.resize_keep == "ways":
+            return size - size % lower
+        return lower << ((size // lower).bit_length() - 1)
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.size_history = [(0, 0, self.cache.cache_size)]
+        if self.miss_accesses is not None:
+            self.miss_accesses = array('q')
+        if self.miss_work is not None:
+            self.miss_work = array('q')
+        if self.keyed_profile:
+            # The access count starts again, so does the profile (blocks dropped by this resize
+            # are evictions of the new run)
+            self.follow_profile()
+            self.size_history = [(0, 0, self.cache.cache_size)]
 
     def change_cache_size(self):
-        cache_lower_limit = self.cache.map_pol * self.cache.block_size
-        new_cache_size = int(self.memory_profile.get_cache_size_at_t(self.cache.cache_size))
-        new_cache_size = max(new_cache_size, cache_lower_limit)
-        if self.total_access % 100000 == 0:
-            print(f'Iter {self.total_access} and miss {self.miss} Current cache size {new_cache_size}')
-        # Step 1. Choose increase or decrease cache size
-        if new_cache_size < self.cache.cache_size: # Decreasing cache size
-
-            # Step 2.b creating new cache
-            new_cache = Cache(cache_size=new_cache_size, block_size=self.cache.block_size,
-                              memory_size=self.cache.memory_size, mapping_pol=self.cache.map_pol,
-                              write_pol=self.cache.wri_pol, replace_pol=self.cache.rep_pol)
-            # Step 2.b. Choose block index that go to new cache and block index that to be discarded
-            old_block_size = len(self.cache.blocks)
-            new_block_size = len(new_cache.blocks)
-            accepted_block_index = random.sample(range(old_block_size), k=new_block_size)
-
-            # Step 2.c. For accepted block, copy to new block, if overwritten a valid line, copy back to memory
-            # For rejected block, copy back to memory
-            for cache_set, line in enumerate(self.cache.blocks):
-                if cache_set in accepted_block_index:
-                    for cache_tag, block in line.items():
-                        phyiscal_address = self.cache.get_physical_address(cache_tag, cache_set)
-                        new_cache.load_from_memory(phyiscal_address, block)
-
-            # Step 2.d. Update cache
-            self.cache = new_cache
-        elif new_cache_size > self.cache.cache_size:
-
-            # Step 3.a Creating a new cache
-            new_cache = Cache(cache_size=new_cache_size, block_size=self.cache.block_size,
-                              memory_size=self.cache.memory_size, mapping_pol=self.cache.map_pol,
-                              write_pol=self.cache.wri_pol, replace_pol=self.cache.rep_pol)
-            # Step 3.b Copy from old cache to new cache
-            for cache_set, line in enumerate(self.cache.blocks):
-                for cache_tag, block in line.items():
-                    phyiscal_address = self.cache.get_physical_address(cache_tag, cache_set)
-                    new_cache.load_from_memory(phyiscal_address, block)
-
-            # Step 3.c. Update cache
-            self.cache = new_cache
+        if self.miss_accesses is not None:
+            self.miss_accesses.append(self.total_access)
+            if self.miss_work is not None:
+                self.miss_work.append(self.allocations.accessed(self.work))
+        if self.keyed_profile or self.miss % self.resize_every:
+            return
+        new_cache_size = self.valid_cache_size(int(self.memory_profile.size_at(self.total_access)))
+        self._resize(new_cache_size)
+
+    def follow_profile(self):
+        """Resize the cache to the size of the profile at the current access count and schedule
+        the next resize where the profile changes (called by the CPU at next_resize)."""
+        access = self.total_access
+        self._resize(self.valid_cache_size(int(self.memory_profile.size_at(access))))
+        next_change = self.memory_profile.next_change(access)
+        self.next_resize = NEVER if next_change is None else next_change
+
+    def _resize(self, new_cache_size: int):
+        old_cache_size = self.cache.cache_size
+        if new_cache_size != old_cache_size:
+            # Blocks dropped by a shrink are evictions (written back if dirty, counted per
+            # allocation, evict and writeback hooks)
+            dropped = self.cache.resize(new_cache_size, self.resize_keep)
+            for victim in dropped:
+                self._evict(victim)
+            self.size_history.append((self.miss, self.total_access, self.cache.cache_size))
+            if self.hooks is not None:
+                self.hooks.resized(old_cache_size, self.cache.cache_size,
+                                   [(address, dirty) for address, _, dirty in dropped])
 
 class MemoryProfile():
     def __init__(self, cache: Cache, c1):
@@ -72,18 +121,28 @@ class MemoryProfile():
 
         return new_cache_size
 
+    def size_at(self, access: int) -> int:
+        return self.get_cache_size_at_t(access)
+
 class MemoryProfile2():
-    def __init__(self,  cache: Cache):
+    """Halves the current cache size with probability 0.7, doubles it otherwise, on every lookup.
+
+    Depends on the number of lookups (misses), not on the access count, so two algorithms don't see
+    the same sizes; use memory_profiles.RandomWalkProfile to compare algorithms.
+    """
+    def __init__(self,  cache: Cache, resize_keep: str = "random", seed: int = None):
         self.cache = cache
+        self.random = None if seed is None else random.Random(seed)  # None: the global generator
         self.cache_size = cache.cache_size  # Ensure cache_size = c1 * block_size^2
         self.block_size = cache.block_size
 
-        self.cache_lower_limit = self.cache.map_pol * self.cache.block_size
+        self.cache_lower_limit = self.cache.min_cache_size(resize_keep)
         self.cache_upper_limit = self.cache_size
 
     def get_cache_size_at_t(self, current_cache_size):
         cache_decreasing_prob = 0.7
-        if random.random() < cache_decreasing_prob:
+        coin = random.random() if self.random is None else self.random.random()
+        if coin < cache_decreasing_prob:
             new_cache_size = current_cache_size // 2
             if new_cache_size < self.cache_lower_limit:
                 return self.cache_lower_limit
@@ -94,6 +153,9 @@ class MemoryProfile2():
                 return self.cache_upper_limit
             return new_cache_size
 
+    def size_at(self, access: int) -> int:
+        return self.get_cache_size_at_t(self.cache.cache_size)
+
 
 import matplotlib.pyplot as plt
 
@@ -0,0 +1,91 @@
+from typing import List
+
+from simple_cache_sim.CPU import CPU, NEVER
+from simple_cache_sim.Trace import Trace
+
+
+class CPUFanout():
+    """
+    Sends one access stream to several independent CPUs in a single pass (see SimulatorFanout)
+
+    Every CPU has its own cache, write policy and counters on the shared memory. The Simulator
+    decodes each access once (array index to address, allocation counters, trace) and the fan-out
+    only forwards the address to every CPU, so a sweep over cache configurations runs the
+    algorithm once instead of once per configuration.
+
+    Used as the CPU of a Simulator, it reports the counters of the first CPU (access summary,
+    phases, checkpoints); SimulatorFanout.get_summaries gives those of every CPU. Checkpoints are
+    scheduled here rather than in the first CPU, so they are only taken once every CPU has seen
+    the access.
+    """
+
+    def __init__(self, cpus: List[CPU], trace: Trace = None):
+        """
+
+        :param cpus: CPUs sharing the same memory
+        :param trace: if set, every access is recorded into it once
+        """
+        assert cpus, "A fan-out needs at least one CPU"
+        assert all(cpu.memory is cpus[0].memory for cpu in cpus), "CPUs must share the memory"
+        self.cpus = cpus
+        self.trace = trace
+        self.cache = cpus[0].cache
+        self.memory = cpus[0].memory
+        self._first = cpus[0]
+        self._reads = [cpu.read for cpu in cpus]
+        self._writes = [cpu.write for cpu in cpus]
+        # checkpoint() is called once the first CPU's total_access reaches next_checkpoint
+        self.next_checkpoint = NEVER
+        self.checkpoint = None
+
+    # Counters of the first CPU
+    @property
+    def total_access(self):
+        return self.cpus[0].total_access
+
+    @property
+    def hits(self):
+        return self.cpus[0].hits
+
+    @property
+    def miss(self):
+        return self.cpus[0].miss
+
+    @property
+    def allocations(self):
+        return self.cpus[0].allocations
+
+    def read(self, address):
+        if self.trace is not None:
+            self.trace.append(address, Trace.READ)
+        for read in self._reads:
+            value = read(address)
+        if self._first.total_access >= self.next_checkpoint:
+            self.checkpoint()
+        return value
+
+    def write(self, address, byte):
+        if self.trace is not None:
+            self.trace.append(address, Trace.WRITE)
+        for write in self._writes:
+            write(address, byte)
+        if self._first.total_access >= self.next_checkpoint:
+            self.checkpoint()
+
+    def flush(self):
+        for cpu in self.cpus:
+            cpu.flush()
+
+    def reset_stats(self):
+        for cpu in self.cpus:
+            cpu.reset_stats()
+
+    def get_counters(self):
+        return self.cpus[0].get_counters()
+
+    def get_access_summary(self):
+        return self.cpus[0].get_access_summary()
+
+    def get_summaries(self):
+        """Access summary of every CPU, in order."""
+        return [cpu.get_access_summary() for cpu in self.cpus]
@@ -1,53 +1,75 @@
 import random
 from math import log
+from operator import itemgetter
 from typing import List
 from collections import OrderedDict
 
 from simple_cache_sim import util
 from simple_cache_sim.Memory import Memory
 from simple_cache_sim.Block import Block
-from simple_cache_sim.update_policies import LRUPolicy, LFUPolicy, FIFOPolicy, RandomPolicy
+from simple_cache_sim.update_policies import get_policy
 
 
 class Cache():
+    """
+    Set-associative cache
+
+    Blocks are views of Memory, so values read through the cache are always up to date.
+    The write policy decides which blocks are dirty: with WRITE_BACK a written block is
+    marked dirty and reported as such when it is evicted, so the CPU can count the traffic.
+    """
     # Replacement policies
     LRU = "LRU"
     LFU = "LFU"
     FIFO = "FIFO"
     RAND = "RAND"
+    CLOCK = "CLOCK"
+    TWO_Q = "2Q"
+    ARC = "ARC"
+    LIRS = "LIRS"
 
     # Mapping policies
     WRITE_BACK = "WB"
     WRITE_THROUGH = "WT"
 
+    # Which blocks survive a resize (see resize)
+    RESIZE_SURVIVORS = ("random", "lru", "ways")
+
     def __init__(self, cache_size: int, block_size: int, memory_size: int, 
-                 mapping_pol: int = None, replace_pol: str = "LRU", write_pol: str = "WT"):
+                 mapping_pol: int = None, replace_pol: str = "LRU", write_pol: str = "WT",
+                 policy_args: dict = None):
         '''
 
         :param size: cache size: number of integers to store in cache (must divide by 4 before fetching in) because each address is 4 bytes)
+        :param policy_args: extra keyword arguments for the replacement policy, e.g. {'aging_period': 1024} for LFU
         '''
         # self.blocks = [Block(block_size) for _ in range(cache_size//block_size)]
+        self._configure(cache_size, block_size, memory_size, mapping_pol, replace_pol, write_pol, policy_args)
 
+        self.blocks = [dict() for _ in range(self.num_sets)]
+        self.dirty = [set() for _ in range(self.num_sets)]  # Tags of dirty blocks per set
+        Pol = self._policy_class
+        self.eviction_handler = [Pol(self._mapping_pol, **self.policy_args) for _ in range(self.num_sets)]
+        # Time of the last access (hit or fill) of every block per set, comparable across sets,
+        # so that resize(..., "lru") keeps the most recently used blocks of the whole cache
+        self.stamps = [dict() for _ in range(self.num_sets)]
+        self._clock = 0
+
+    def _configure(self, cache_size: int, block_size: int, memory_size: int, mapping_pol: int,
+                   replace_pol: str, write_pol: str, policy_args: dict):
+        # Geometry and policies, shared with ArrayCache (which stores the blocks its own way)
         self.cache_blocks = cache_size//block_size
         # Mapping policy (1 mean direct, 2 means 2-way, n means n-way associative)
         self._mapping_pol = self.cache_blocks if mapping_pol is None else mapping_pol
         self._replace_pol = replace_pol  # Replacement policy
         self._write_pol = write_pol  # Write policy
+        if write_pol not in (self.WRITE_BACK, self.WRITE_THROUGH):
+            raise ValueError(f'Invalid write policy: {write_pol}')
+        self._write_back = write_pol == self.WRITE_BACK
+        self.policy_args = dict(policy_args) if policy_args else {}
+        self._policy_class = get_policy(replace_pol)  # See update_policies.register_policy
 
         self.num_sets = self.cache_blocks // self._mapping_pol
-        self.blocks = [dict() for _ in range(self.num_sets)]
-        replace_pol = replace_pol.lower()
-        if replace_pol == "lru":
-            Pol = LRUPolicy
-        elif replace_pol == "lfu":
-            Pol = LFUPolicy
-        elif replace_pol == "fifo":
-            Pol = FIFOPolicy
-        elif replace_pol.startswith("rand"):
-            Pol = RandomPolicy
-        else:
-            raise ValueError(f'Invalid eviction policy: {replace_pol}')
-        self.eviction_handler = [Pol(self._mapping_pol) for _ in range(self.num_sets)]
 
         self.map_pol = self._mapping_pol # These 3 lines are hilarious, just expose the protected attributes
         self.rep_pol = self._replace_pol
@@ -57,11 +79,10 @@ class Cache():
         self.memory_size = memory_size  # Memory size
         self.block_size = block_size  # Block size
 
-        # Bit offset of cache line tag
-        self._tag_shift = int(log(self.cache_size // self._mapping_pol, 2))
         # Bit offset of cache line set
         self._set_shift = int(log(self.block_size, 2))
-
+        # Bit offset of cache line tag, number of sets and ways
+        self._set_geometry(self.num_sets, self._mapping_pol)
 
     def read_from_cache(self, address):
         """Read a block of memory from the cache.
@@ -76,29 +97,42 @@ class Cache():
         if cache_tag in self.blocks[cache_set].keys():
             line = self.blocks[cache_set][cache_tag]
             self.eviction_handler[cache_set].update_access(cache_tag)
+            self._clock += 1
+            self.stamps[cache_set][cache_tag] = self._clock
             return line.data
         else:
             return None
 
-    def load_from_memory(self, address: int, data: Block):
+    def load_from_memory(self, address: int, data: Block, dirty: bool = False):
         """Load a block of memory into the cache.
 
         :param int address: memory address for data to load to cache
         :param data: block from memory to be loaded into cache
-        :return: tuple containing victim address and data (None if no victim)
+        :param dirty: whether the loaded block is dirty (written under write-back)
+        :return: tuple containing victim address, data and whether it was dirty (None if no victim)
         """
         cache_tag = self._get_tag(address)  # Tag of cache line
         cache_set = self._get_set(address)  # Set of cache lines
+        victim = None
 
         # Select the victim (victim is a block in a set)
         if self.eviction_handler[cache_set].is_full():
-            victim_tag = self.eviction_handler[cache_set].remove_one()
-            self.blocks[cache_set].pop(victim_tag)
+            victim_tag = self.eviction_handler[cache_set].remove_one(cache_tag)
+            victim_data = self.blocks[cache_set].pop(victim_tag)
+            del self.stamps[cache_set][victim_tag]
+            victim_dirty = victim_tag in self.dirty[cache_set]
+            if victim_dirty:
+                self.dirty[cache_set].discard(victim_tag)
+            victim = (self.get_physical_address(victim_tag, cache_set), victim_data, victim_dirty)
 
         # Store new block instead
         self.eviction_handler[cache_set].add_in(cache_tag)
         self.blocks[cache_set][cache_tag] = data
-        
+        self._clock += 1
+        self.stamps[cache_set][cache_tag] = self._clock
+        if dirty:
+            self.dirty[cache_set].add(cache_tag)
+        return victim
 
     def overwrite_cache(self, address: int, byte: int):
         """Write a byte to cache. (the address must be a valid one which means it was loaded from the memory to cache)
@@ -114,10 +148,205 @@ class Cache():
             line = self.blocks[cache_set][cache_tag]
             line.data[self.get_offset(address)] = byte
             self.eviction_handler[cache_set].update_access(cache_tag)
+            self._clock += 1
+            self.stamps[cache_set][cache_tag] = self._clock
+            if self._write_back:
+                self.dirty[cache_set].add(cache_tag)
             return True
         else:
             return False
 
+    def contains(self, address: int) -> bool:
+        """Whether the block holding address is cached (doesn't count as an access)."""
+        return self._get_tag(address) in self.blocks[self._get_set(address)]
+
+    def occupancy(self) -> int:
+        """Number of blocks cached."""
+        return sum(len(line) for line in self.blocks)
+
+    def remove(self, address: int):
+        """Invalidate the block holding address.
+
+        :return: tuple (block, dirty), None if the block is not cached
+        """
+        cache_tag = self._get_tag(address)
+        cache_set = self._get_set(address)
+        block = self.blocks[cache_set].pop(cache_tag, None)
+        if block is None:
+            return None
+        self.eviction_handler[cache_set].remove(cache_tag)
+        del self.stamps[cache_set][cache_tag]
+        dirty = cache_tag in self.dirty[cache_set]
+        self.dirty[cache_set].discard(cache_tag)
+        return block, dirty
+
+    def mark_dirty(self, address: int) -> bool:
+        """Mark the block holding address dirty (a write-back from the level above).
+
+        :return: False if the block is not cached
+        """
+        cache_tag = self._get_tag(address)
+        cache_set = self._get_set(address)
+        if cache_tag not in self.blocks[cache_set]:
+            return False
+        self.dirty[cache_set].add(cache_tag)
+        return True
+
+    def dirty_blocks(self) -> List[int]:
+        """Addresses of the dirty blocks."""
+        return [self.get_physical_address(tag, cache_set)
+                for cache_set, tags in enumerate(self.dirty) for tag in tags]
+
+    def is_dirty(self, cache_set: int, cache_tag: int) -> bool:
+        """Whether the block with this tag in this set is dirty."""
+        return cache_tag in self.dirty[cache_set]
+
+    def flush(self) -> int:
+        """Clean every dirty block (as if written back to memory).
+
+        :return: number of blocks that were dirty
+        """
+        count = sum(len(d) for d in self.dirty)
+        self.dirty = [set() for _ in range(self.num_sets)]
+        return count
+
+    def min_cache_size(self, survivors: str = "random") -> int:
+        """Smallest size resize can shrink to: one set, or one way per set with survivors="ways"."""
+        if survivors == "ways":
+            return self.num_sets * self.block_size
+        return self._mapping_pol * self.block_size
+
+    def check_resize(self, survivors: str):
+        """Raise ValueError if resize can't keep survivors with this replacement policy."""
+        if survivors not in self.RESIZE_SURVIVORS:
+            raise ValueError(f'Invalid resize survivors: {survivors}')
+        if survivors != "ways" and not self._policy_class.mergeable:
+            raise ValueError(f'{self._replace_pol} keeps per-set state that can\'t follow its blocks to other '
+                             f'sets, resize it with survivors="ways"')
+
+    def resize(self, new_size: int, survivors: str = "random"):
+        """Grow or shrink the cache in place, no block is read from memory.
+
+        - "random", "lru": keep the associativity and change the number of sets. Growing splits
+          every set, shrinking merges sets, keeping the blocks of a random sample of the old sets
+          ("random") or the most recently used blocks of the cache ("lru"). Tags depend on the
+          number of sets, so this touches every cached block, not only the moved or dropped ones.
+          Policies whose state isn't carried by their keys (see UpdatePolicy.mergeable) can't.
+        - "ways": keep the sets and change the associativity, every set evicting with its own
+          policy. Costs O(sets + dropped blocks), so it is the cheapest for fully associative caches.
+
+        :param new_size: new cache size (in number of integers)
+        :param survivors: "random", "lru" or "ways"
+        :return: list of (address, block, dirty) of the blocks dropped, for the caller to evict
+                 (CPUAdaptive passes them to CPU._evict)
+        """
+        self.check_resize(survivors)
+        new_blocks = new_size // self.block_size
+        if survivors == "ways":
+            assert new_blocks and new_blocks % self.num_sets == 0, "Size must be a multiple of the number of sets"
+            new_ways = new_blocks // self.num_sets
+            return self._resize_ways(new_ways) if new_ways != self._mapping_pol else []
+
+        new_sets = new_blocks // self._mapping_pol
+        if new_sets == self.num_sets:
+            return []
+        assert new_sets and new_sets & (new_sets - 1) == 0, "Number of sets must be a power of 2"
+        lines, dropped = self._merge_sets(self._contents(), new_sets, survivors)
+        self._rebuild(new_sets, self._mapping_pol, lines)
+        return [(number << self._set_shift, block, dirty) for _, number, block, dirty, _ in dropped]
+
+    def _merge_sets(self, lines, new_sets: int, survivors: str):
+        # Distribute the entries of every old set (see _contents) to the new sets
+        ways = self._mapping_pol
+        mask = new_sets - 1
+        new_lines = [[] for _ in range(new_sets)]
+        dropped = []
+        if new_sets > len(lines):
+            # Every new set gets part of one old set, nothing is dropped
+            for line in lines:
+                for entry in line:
+                    new_lines[entry[1] & mask].append(entry)
+            return new_lines, dropped
+
+        accepted = set(random.sample(range(len(lines)), k=new_sets)) if survivors == "random" else None
+        for cache_set, line in enumerate(lines):
+            if accepted is not None and cache_set not in accepted:
+                dropped.extend(line)
+            elif line:
+                new_lines[cache_set & mask].extend(line)
+        for cache_set, line in enumerate(new_lines):
+            if len(line) > 1:
+                line.sort(key=itemgetter(0))  # Least recent first
+                if len(line) > ways:
+                    dropped.extend(line[:-ways])
+                    new_lines[cache_set] = line[-ways:]
+        return new_lines, dropped
+
+    def _contents(self):
+        """Blocks of every set, least recent first, as (recency, block number, block, dirty, metadata).
+
+        Recency is the time of the last access (see stamps), metadata the policy's (see
+        UpdatePolicy.metadata).
+        """
+        set_bits = self._tag_shift - self._set_shift
+        lines = []
+        for cache_set, (line, dirty, stamps, policy) in enumerate(zip(self.blocks, self.dirty, self.stamps,
+                                                                      self.eviction_handler)):
+            if not line:
+                lines.append([])
+                continue
+            metadata = policy.metadata
+            lines.append(sorted((stamps[tag], (tag << set_bits) | cache_set, block, tag in dirty, metadata(tag))
+                                for tag, block in line.items()))
+        return lines
+
+    def _set_geometry(self, num_sets: int, ways: int):
+        self.num_sets = num_sets
+        self._mapping_pol = self.map_pol = ways
+        self.cache_blocks = num_sets * ways
+        self.cache_size = self.cache_blocks * self.block_size
+        self._tag_shift = int(log(self.cache_size // ways, 2))
+
+    def _rebuild(self, num_sets: int, ways: int, lines):
+        # Start over with the new geometry and insert each set's blocks, least recent first,
+        # with their access times and policy metadata
+        self._set_geometry(num_sets, ways)
+        self.blocks = [dict() for _ in range(num_sets)]
+        self.dirty = [set() for _ in range(num_sets)]
+        self.stamps = [dict() for _ in range(num_sets)]
+        Pol = self._policy_class
+        policy_args = self.policy_args
+        self.eviction_handler = [Pol(ways, **policy_args) for _ in range(num_sets)]
+        set_bits = self._tag_shift - self._set_shift
+        for blocks, dirty, stamps, policy, line in zip(self.blocks, self.dirty, self.stamps, self.eviction_handler,
+                                                       lines):
+            if not line:
+                continue
+            add_back = policy.add_back
+            for recency, number, block, is_dirty, metadata in line:
+                tag = number >> set_bits
+                add_back(tag, metadata)
+                blocks[tag] = block
+                stamps[tag] = recency
+                if is_dirty:
+                    dirty.add(tag)
+
+    def _resize_ways(self, new_ways: int):
+        dropped = []
+        for cache_set, policy in enumerate(self.eviction_handler):
+            policy.change_n(new_ways - self._mapping_pol)
+            blocks = self.blocks[cache_set]
+            dirty = self.dirty[cache_set]
+            stamps = self.stamps[cache_set]
+            while len(blocks) > new_ways:
+                tag = policy.remove_one()
+                del stamps[tag]
+                is_dirty = tag in dirty
+                dirty.discard(tag)
+                dropped.append((self.get_physical_address(tag, cache_set), blocks.pop(tag), is_dirty))
+        self._set_geometry(self.num_sets, new_ways)
+        return dropped
+
     def get_offset(self, address):
         """Get the offset from within a set from a physical address. (position of physical address inside block)
         e.g., block_size = 4, then add = 0 -> offset =0, add = 1 -> offset = 1, add=4 -> offset = 0, add = 5 -> offset = 1
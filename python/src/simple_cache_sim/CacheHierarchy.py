@@ -0,0 +1,219 @@
+from typing import List
+
+from simple_cache_sim.Cache import Cache
+from simple_cache_sim.Memory import Memory
+from simple_cache_sim.Block import Block
+
+
+class CacheHierarchy():
+    """
+    Several cache levels (L1, L2, ..., LLC) in front of memory
+
+    Has the interface of Cache, so CPU takes it in place of a single cache. A hit in any level
+    is a hit for the CPU, a miss in every level reads the block from memory (whose block size
+    must be the L1 block size). Every level keeps its own hits, misses, fills, evictions and
+    write-backs, see get_level_summary.
+
+    Inclusion modes:
+    - "inclusive": every block of a level is also in the levels below. A block evicted from a
+      level is invalidated in the levels above it (back-invalidation).
+    - "non-inclusive": blocks are filled into every level, levels evict independently.
+    - "exclusive": a block is in at most one level. Fills go to L1, a block evicted from a level
+      moves to the level below and a hit in a lower level moves the block up to L1. All levels
+      must have the same block size.
+
+    Only dirty blocks move down on eviction (except in exclusive mode where every victim does):
+    a dirty block evicted from a level is written back to the level below (allocated there if
+    missing), and dirty blocks evicted from the last level are written back to memory.
+    """
+    INCLUSIVE = "inclusive"
+    NON_INCLUSIVE = "non-inclusive"
+    EXCLUSIVE = "exclusive"
+
+    def __init__(self, levels: List[Cache], memory: Memory, inclusion: str = "non-inclusive"):
+        """
+
+        :param levels: caches from L1 to the last level
+        :param memory: memory behind the last level
+        :param inclusion: "inclusive", "non-inclusive" or "exclusive"
+        """
+        if inclusion not in (self.INCLUSIVE, self.NON_INCLUSIVE, self.EXCLUSIVE):
+            raise ValueError(f'Invalid inclusion mode: {inclusion}')
+        assert levels, "A hierarchy needs at least one level"
+        for upper, lower in zip(levels, levels[1:]):
+            assert lower.block_size >= upper.block_size, "Block sizes can't shrink towards memory"
+            if inclusion == self.EXCLUSIVE:
+                assert lower.block_size == upper.block_size, "Exclusive levels need the same block size"
+        assert memory.block_size == levels[0].block_size, "Memory block size must be the L1 block size"
+
+        self.levels = levels
+        self.memory = memory
+        self.inclusion = inclusion
+        self.block_size = levels[0].block_size
+        self.on_evict = None  # Called with (address, block, dirty) when a block leaves the last level
+
+        n = len(levels)
+        self.hits = [0] * n
+        self.misses = [0] * n
+        self.fills = [0] * n
+        self.evictions = [0] * n
+        self.writebacks = [0] * n  # Dirty blocks written back to the level below (or memory)
+
+    def get_offset(self, address):
+        return self.levels[0].get_offset(address)
+
+    def _block(self, i: int, address: int) -> Block:
+        # Block of level i holding address
+        if self.levels[i].block_size == self.block_size:
+            return self.memory.read_block_from_memory(address)
+        return self.memory.read_block_from_memory(address, self.levels[i].block_size)
+
+    def _insert(self, i: int, address: int, block: Block, dirty: bool):
+        # Fill a block into level i and handle its victim
+        self.fills[i] += 1
+        victim = self.levels[i].load_from_memory(address, block, dirty)
+        if victim is not None:
+            self._evicted(i, victim)
+
+    def _evicted(self, i: int, victim):
+        # A block was evicted from level i
+        address, block, dirty = victim
+        self.evictions[i] += 1
+        levels = self.levels
+
+        if self.inclusion == self.INCLUSIVE:
+            # Back-invalidate the copies above, a dirty copy makes the victim dirty
+            for upper in levels[:i]:
+                for a in range(address, address + block.block_size, upper.block_size):
+                    removed = upper.remove(a)
+                    if removed is not None and removed[1]:
+                        dirty = True
+
+        if dirty:
+            self.writebacks[i] += 1
+        if i + 1 == len(levels):
+            if self.on_evict is not None:
+                self.on_evict((address, block, dirty))
+            return
+
+        if self.inclusion == self.EXCLUSIVE:
+            self._insert(i + 1, address, block, dirty)
+        elif dirty and not levels[i + 1].mark_dirty(address):
+            self._insert(i + 1, address, self._block(i + 1, address), True)
+
+    def _promote(self, address: int):
+        # Look address up below L1 (after an L1 miss) and bring it to L1.
+        # Returns the L1 block, None if no level has it.
+        levels = self.levels
+        self.misses[0] += 1
+        for i in range(1, len(levels)):
+            if self.inclusion == self.EXCLUSIVE:
+                removed = levels[i].remove(address)
+                if removed is not None:
+                    self.hits[i] += 1
+                    block, dirty = removed
+                    self._insert(0, address, block, dirty)
+                    return block
+            elif levels[i].read_from_cache(address) is not None:
+                self.hits[i] += 1
+                for j in range(i - 1, 0, -1):
+                    self._insert(j, address, self._block(j, address), False)
+                block = self.memory.read_block_from_memory(address)
+                self._insert(0, address, block, False)
+                return block
+            self.misses[i] += 1
+        return None
+
+    def contains(self, address: int) -> bool:
+        """Whether any level holds the block of address (doesn't count as an access)."""
+        return any(level.contains(address) for level in self.levels)
+
+    def occupancy(self) -> int:
+        """Number of blocks cached, over all levels."""
+        return sum(level.occupancy() for level in self.levels)
+
+    def read_from_cache(self, address):
+        """Read a block of memory from the hierarchy.
+
+        :param int address: memory address for data to read from cache
+        :return: data of the L1 block (None if every level misses)
+        """
+        data = self.levels[0].read_from_cache(address)
+        if data is not None:
+            self.hits[0] += 1
+            return data
+        block = self._promote(address)
+        return None if block is None else block.data
+
+    def overwrite_cache(self, address: int, byte: int):
+        """Write a byte to the hierarchy (into L1, after bringing the block up if a lower level has it).
+
+        :return: boolean indicating whether data was written to cache
+        """
+        l1 = self.levels[0]
+        if l1.overwrite_cache(address, byte):
+            self.hits[0] += 1
+            return True
+        block = self._promote(address)
+        if block is None:
+            return False
+        block.data[l1.get_offset(address)] = byte
+        if l1.wri_pol == Cache.WRITE_BACK:
+            l1.mark_dirty(address)
+        return True
+
+    def load_from_memory(self, address: int, data: Block, dirty: bool = False):
+        """Load a block read from memory after a miss in every level.
+
+        Victims are reported through on_evict (a fill can push several blocks out of the last
+        level), so this returns None.
+
+        :param int address: memory address for data to load to cache
+        :param data: L1 sized block from memory
+        :param dirty: whether the loaded block is dirty (written under write-back)
+        """
+        if self.inclusion != self.EXCLUSIVE:
+            # Lowest level first so that back-invalidations can't remove the new block
+            for i in range(len(self.levels) - 1, 0, -1):
+                self._insert(i, address, self._block(i, address), False)
+        self._insert(0, address, data, dirty)
+        return None
+
+    def flush(self) -> int:
+        """Clean every level.
+
+        :return: number of blocks written back to memory (distinct last level blocks that were dirty somewhere)
+        """
+        llc_block_size = self.levels[-1].block_size
+        dirty = {a - a % llc_block_size for level in self.levels for a in level.dirty_blocks()}
+        for level in self.levels:
+            level.flush()
+        return len(dirty)
+
+    def reset_stats(self):
+        n = len(self.levels)
+        self.hits = [0] * n
+        self.misses = [0] * n
+        self.fills = [0] * n
+        self.evictions = [0] * n
+        self.writebacks = [0] * n
+
+    def get_level_summary(self):
+        """Counters of every level, L1 first.
+
+        :return: list of dicts with cache_hits, cache_misses, total_access, hit_rate, fills,
+                 evictions and writebacks
+        """
+        summary = []
+        for i in range(len(self.levels)):
+            total = self.hits[i] + self.misses[i]
+            summary.append({
+                'cache_hits': self.hits[i],
+                'cache_misses': self.misses[i],
+                'total_access': total,
+                'hit_rate': self.hits[i] / total if total else 0.0,
+                'fills': self.fills[i],
+                'evictions': self.evictions[i],
+                'writebacks': self.writebacks[i],
+            })
+        return summary
@@ -0,0 +1,112 @@
+from typing import Callable
+
+from simple_cache_sim.CacheHierarchy import CacheHierarchy
+from simple_cache_sim.Trace import Trace
+
+
+class Hooks():
+    """
+    Callbacks on the cache events of a CPU (see CPU(hooks=...))
+
+    Subscribe before the CPU is built, with hooks.on(event, callback) or the @hooks.on(event)
+    decorator. The CPU is bound to the hooks at construction: read/write are replaced by wrapped
+    versions only if hit or miss have subscribers, _fill only for fill, _evict only for evict or
+    writeback, so a CPU without hooks (or the events nobody listens to) runs the plain methods.
+
+    Events and callback arguments:
+    - hit, miss: (address, cache_set, tag, op), op is Trace.READ or Trace.WRITE. Called once the
+      access is done, so after the fill and eviction of a miss.
+    - fill: (address, cache_set, tag), a block loaded from memory (demand or prefetch)
+    - evict: (address, cache_set, tag, dirty), a block replaced by a fill or dropped by a resize
+      (then cache_set and tag are those of the new geometry)
+    - writeback: (address, cache_set, tag), an evicted dirty block written back to memory
+    - resize: (old_size, new_size, dropped), CPUAdaptive changed the cache size, dropped is the
+      list of (address, dirty) of the blocks that didn't survive
+
+    cache_set and tag are those of the cache the event happened in: L1 for hits, misses and fills,
+    the last level for evictions out of a hierarchy.
+    """
+    EVENTS = ('hit', 'miss', 'fill', 'evict', 'writeback', 'resize')
+
+    def __init__(self):
+        self.callbacks = {event: [] for event in self.EVENTS}
+        self.cpu = None
+        self._cpu_class = None
+        self._first = None  # Cache giving the set and tag of accesses and fills
+        self._last = None  # Cache giving the set and tag of evictions
+
+    def on(self, event: str, callback: Callable = None):
+        """Subscribe callback to event (returns a decorator if callback is None)."""
+        if event not in self.callbacks:
+            raise ValueError(f'Invalid event: {event}')
+        if callback is None:
+            return lambda f: self.on(event, f)
+        self.callbacks[event].append(callback)
+        return callback
+
+    def bind(self, cpu):
+        """Route the events of cpu to the callbacks (called by the CPU constructor)."""
+        self.cpu = cpu
+        self._cpu_class = type(cpu)
+        cache = cpu.cache
+        if isinstance(cache, CacheHierarchy):
+            self._first = cache.levels[0]
+            self._last = cache.levels[-1]
+        else:
+            self._first = self._last = cache
+        # Bound methods of the hooks (not closures) so that checkpoints can pickle the CPU
+        callbacks = self.callbacks
+        if callbacks['hit'] or callbacks['miss']:
+            cpu.read = self._read
+            cpu.write = self._write
+        if callbacks['fill']:
+            cpu._fill = self._fill
+        if callbacks['evict'] or callbacks['writeback']:
+            cpu._evict = self._evict
+
+    def _access(self, address: int, op: int, hit: bool):
+        callbacks = self.callbacks['hit' if hit else 'miss']
+        if callbacks:
+            cache = self._first
+            cache_set = cache._get_set(address)
+            tag = cache._get_tag(address)
+            for callback in callbacks:
+                callback(address, cache_set, tag, op)
+
+    def _read(self, address):
+        cpu = self.cpu
+        hits = cpu.hits
+        value = self._cpu_class.read(cpu, address)
+        self._access(address, Trace.READ, cpu.hits != hits)
+        return value
+
+    def _write(self, address, byte):
+        cpu = self.cpu
+        hits = cpu.hits
+        self._cpu_class.write(cpu, address, byte)
+        self._access(address, Trace.WRITE, cpu.hits != hits)
+
+    def _fill(self, address, block, dirty=False):
+        self._cpu_class._fill(self.cpu, address, block, dirty)
+        cache = self._first
+        cache_set = cache._get_set(address)
+        tag = cache._get_tag(address)
+        for callback in self.callbacks['fill']:
+            callback(address, cache_set, tag)
+
+    def _evict(self, victim):
+        self._cpu_class._evict(self.cpu, victim)
+        address, _, dirty = victim
+        cache = self._last
+        cache_set = cache._get_set(address)
+        tag = cache._get_tag(address)
+        for callback in self.callbacks['evict']:
+            callback(address, cache_set, tag, dirty)
+        if dirty:
+            for callback in self.callbacks['writeback']:
+                callback(address, cache_set, tag)
+
+    def resized(self, old_size: int, new_size: int, dropped):
+        """Called by CPUAdaptive after every change of cache size."""
+        for callback in self.callbacks['resize']:
+            callback(old_size, new_size, dropped)
@@ -1,40 +1,74 @@
-from typing import List
+import numpy as np
 
 from simple_cache_sim.Block import Block
-from simple_cache_sim import util
 
 
 class Memory():
-    def __init__(self, memory_size, block_size):
+    def __init__(self, memory_size, block_size, mmap_path: str = None):
         """
         Size of each value (per address) is 4 bytes to store enough an integer
         If memory_size and block_size is bytes, please divide by 4 before fetching into this Memory
         because each address is 4 bytes
 
+        The whole memory is one contiguous int64 buffer and blocks are views into it.
+        np.zeros only commits pages when they are touched, and with mmap_path the buffer is
+        a memory-mapped file so very large memories don't have to live in RAM.
+
         :param memory_size: memory size (in 4*Bytes)
         :param block_size: block size (in 4*Bytes)
+        :param mmap_path: optional file backing the memory (created/overwritten)
         """
         self.memory_size = memory_size
         self.block_size = block_size
         self.blocks_count = self.memory_size // self.block_size
-        self.memory_data = []
+        self.allocated_blocks = 0
+        self.mmap_path = mmap_path
 
+        size = self.blocks_count * self.block_size
+        if mmap_path is None:
+            self.memory_data = np.zeros(size, dtype=np.int64)
+        else:
+            self.memory_data = np.memmap(mmap_path, dtype=np.int64, mode='w+', shape=(size,))
 
-    def read_block_from_memory(self, address: int) -> Block:
+    def read_block_from_memory(self, address: int, block_size: int = None) -> Block:
         """
         Get data inside a block containing this address
         :param address:
-        :return: list of data , whose length is block_size
+        :param block_size: size of the block (default: block_size of the memory), e.g. for the
+                           lower levels of a CacheHierarchy
+        :return: Block whose data is a view of block_size values in memory
         """
-        # # Need to subtract (address % block_size) to find the start address of the block
-        # start = address - (address % self.block_size)  # Start address
-        # end = start + self.block_size  # End address
+        if not 0 <= address < self.allocated_blocks * self.block_size:
+            raise IndexError(f'Address {address} is not allocated')
+        if block_size is None:
+            block_size = self.block_size
+
+        start = address - address % block_size
+        if start + block_size > len(self.memory_data):
+            raise IndexError(f'Block of {block_size} at address {address} is out of memory')
+        return Block(block_size, self.memory_data[start:start + block_size])
 
-        # if start < 0 or end > self.memory_size:
-        #     raise IndexError
+    def write_values(self, address: int, values):
+        """Write values to consecutive addresses, bypassing any cache (cached blocks are views, so they see the new values).
+
+        :param address: first address
+        :param values: array-like of values, flattened in row-major order
+        """
+        values = np.asarray(values).ravel()
+        end = address + len(values)
+        if not 0 <= address <= end <= self.allocated_blocks * self.block_size:
+            raise IndexError(f'Addresses {address} to {end} are not allocated')
+        self.memory_data[address:end] = values
 
-        return self.memory_data[address//self.block_size]
+    def read_values(self, address: int, count: int) -> np.ndarray:
+        """Copy of the values at count consecutive addresses, bypassing any cache."""
+        end = address + count
+        if not 0 <= address <= end <= self.allocated_blocks * self.block_size:
+            raise IndexError(f'Addresses {address} to {end} are not allocated')
+        return np.array(self.memory_data[address:end])
 
     def allocate(self, num_blocks: int):
-        #num_blocks = min(num_blocks, self.blocks_count - len(self.memory_data))
-        self.memory_data.extend(Block(self.block_size) for _ in range(num_blocks))
+        if self.allocated_blocks + num_blocks > self.blocks_count:
+            raise MemoryError(f'Cannot allocate {num_blocks} blocks, '
+                              f'{self.blocks_count - self.allocated_blocks} of {self.blocks_count} left')
+        self.allocated_blocks += num_blocks
@@ -1,78 +1,304 @@
  
-from typing import Optional, Tuple, Any
-from functools import reduce
+from contextlib import contextmanager
+from operator import index as as_index
+from typing import Optional, Tuple, Any, List
 
 from simple_cache_sim.Cache import Cache
+from simple_cache_sim.ArrayCache import ArrayCache
+from simple_cache_sim.CacheHierarchy import CacheHierarchy
 from simple_cache_sim.Memory import Memory
 from simple_cache_sim.CPU import CPU
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.trace_file import TraceWriter
+from simple_cache_sim.Allocations import Allocations
+from simple_cache_sim import checkpoint
 
-import time
+import numpy as np
 
 
-def _get_flat_idx(idx: Tuple[int, ...], dimension: Tuple[int, ...]):
-    p = 1
-    idx_flat = 0
-    for i, d in zip(reversed(idx), reversed(dimension)):
-        assert 0 <= i < d, "Index must be at least 0 and less than dimension size"
-        idx_flat += i * p
-        p *= d
-    return idx_flat
+class ArrayHandle(int):
+    """
+    Pointer returned by Simulator.allocate
+
+    Behaves exactly like the int start address, so existing code (cs.read(ptr, i, j),
+    dict keys, arithmetic) keeps working, and also carries the shape and the precomputed
+    row-major strides of the allocation.
+
+    Indexing goes through the simulator that allocated it, like a NumPy array whose every
+    element access is simulated:
+    - A[i, k] is cs.read(A, i, k) and C[i, j] = v is cs.write(C, i, j, value=v)
+    - A[i, :], A[r0:r1, c0:c1], A[i] (missing trailing dimensions are taken whole) read the
+      selection in row-major order and return its values as a NumPy array (see read_slice)
+    - C[r0:r1, c0:c1] = X writes X (broadcast to the selection) in row-major order (see write_slice)
+    - C[r0:r1, c0:c1] += X reads the whole selection, then writes it back, like NumPy
+    Integers may be negative and slices may have a step, as in NumPy.
+    """
+
+    def __new__(cls, address: int, shape: Tuple[int, ...]):
+        self = super().__new__(cls, address)
+        self.start = int(address)
+        self.shape = tuple(shape)
+        strides = []
+        p = 1
+        for d in reversed(self.shape):
+            strides.append(p)
+            p *= d
+        self.strides = tuple(reversed(strides))
+        self.size = p
+        self.simulator = None  # Set by Simulator.allocate, used by indexing
+        return self
+
+    def __getnewargs__(self):
+        return self.start, self.shape
+
+    def _element(self, key) -> Optional[Tuple[int, ...]]:
+        # Non-negative index of a single element, None if key selects more than one
+        if len(key) != len(self.shape) or not all(isinstance(i, (int, np.integer)) for i in key):
+            return None
+        return tuple(i + d if i < 0 else i for i, d in zip(key, self.shape))
+
+    def _simulator(self):
+        if self.simulator is None:
+            raise TypeError('Indexing needs an array allocated by a Simulator')
+        return self.simulator
+
+    def __getitem__(self, key):
+        simulator = self._simulator()
+        idx = self._element(key if isinstance(key, tuple) else (key,))
+        if idx is not None:
+            return simulator.read(self, *idx)
+        return simulator.read_slice(self, key)
+
+    def __setitem__(self, key, value):
+        simulator = self._simulator()
+        idx = self._element(key if isinstance(key, tuple) else (key,))
+        if idx is not None:
+            simulator.write(self, *idx, value=value)
+        else:
+            simulator.write_slice(self, key, value)
+
+    def __iter__(self):
+        # Over the first axis like NumPy (without it, Python would iterate with self[0], self[1], ...
+        # until an IndexError)
+        if not self.shape:
+            raise TypeError('Iteration over a 0-d array')
+        return (self[i] for i in range(self.shape[0]))
+
+    def address(self, *idx: int) -> int:
+        """Memory address of element idx."""
+        if len(self.shape) != len(idx):
+            raise IndexError(f'{len(idx)} indices for an array of {len(self.shape)} dimensions')
+        addr = self.start
+        for i, d, s in zip(idx, self.shape, self.strides):
+            if not 0 <= i < d:
+                raise IndexError(f'Index {i} out of range for a dimension of size {d}')
+            addr += i * s
+        return addr
+
+    def addresses(self, key) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        """
+        Memory addresses of the elements selected by key (as in self[key]), in row-major order,
+        and the shape of the selection.
+
+        :param key: an integer or a slice per dimension, missing trailing dimensions are taken whole
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > len(self.shape):
+            raise IndexError(f'{len(key)} indices for an array of {len(self.shape)} dimensions')
+        key = key + (slice(None),) * (len(self.shape) - len(key))
+        offsets = np.zeros((), dtype=np.int64)
+        shape = []
+        for k, d, s in zip(key, self.shape, self.strides):
+            if isinstance(k, slice):
+                idx = np.arange(*k.indices(d), dtype=np.int64)
+                shape.append(len(idx))
+                offsets = offsets[..., np.newaxis] + idx * s  # One more axis, row-major
+            else:
+                try:
+                    i = as_index(k)
+                except TypeError:
+                    raise TypeError(f'Indices must be integers or slices, not {type(k).__name__}') from None
+                if not -d <= i < d:
+                    raise IndexError(f'Index {i} out of range for a dimension of size {d}')
+                if i < 0:
+                    i += d
+                offsets = offsets + i * s
+        return self.start + offsets.ravel(), tuple(shape)
+
+
+# Cache implementations selectable with Simulator(cache_engine=...)
+CACHE_ENGINES = {
+    "dict": Cache,  # per-set dicts and policy objects, any associativity
+    "array": ArrayCache,  # flat buffers indexed by set and way, LRU, LFU, FIFO and RAND only
+}
+
 
 class Simulator():
     def __init__(self, memory_size: int, cache_size: int, block_size: int, 
-                 mapping_pol: int = None, replace_pol: str = "LRU", write_pol: str = "WT"):
+                 mapping_pol: int = None, replace_pol: str = "LRU", write_pol: str = "WT",
+                 record_trace: bool = False, memory_path: str = None, policy_args: dict = None,
+                 cache_engine: str = "dict", write_allocate: bool = True,
+                 levels: List[dict] = None, inclusion: str = "non-inclusive", prefetcher=None,
+                 checkpoint_path: str = None, checkpoint_every: int = None, trace_path: str = None,
+                 telemetry=None, hooks=None, count_accesses: bool = False):
+        """
+
+        :param levels: cache hierarchy, one dict of cache arguments per level from L1 down
+                       (cache_size, block_size, mapping_pol, replace_pol, policy_args, cache_engine),
+                       missing arguments are taken from this constructor. None for a single cache.
+        :param inclusion: "inclusive", "non-inclusive" or "exclusive" (see CacheHierarchy)
+        :param prefetcher: optional Prefetcher issuing extra fills after every miss (see prefetchers)
+        :param checkpoint_path: file the simulator saves itself to every checkpoint_every accesses
+                                (see save and CPU.next_event)
+        :param trace_path: stream every access into this trace file (see trace_file) instead of
+                           recording an in-memory Trace, call self.trace.close() when done
+        :param telemetry: optional Telemetry sampling the counters over time (see telemetry)
+        :param hooks: optional Hooks called on cache events (see Hooks)
+        :param count_accesses: also count the accesses (so the hits) of every allocation, not just
+                               its misses and evictions (see get_allocation_summary). Costs one
+                               counter update per access.
+        """
         # self._data = dict()
+        if levels is not None:
+            levels = [dict(dict(cache_size=cache_size, block_size=block_size, mapping_pol=mapping_pol,
+                                replace_pol=replace_pol, policy_args=policy_args, cache_engine=cache_engine),
+                           **level) for level in levels]
+            cache_size = levels[0]['cache_size']
+            block_size = levels[0]['block_size']  # Memory blocks are L1 blocks
         self.memory_size = memory_size
         self.cache_size = cache_size
         self.block_size = block_size
 
-        self._data_dim = dict()
+        self._handles = dict()  # start address -> ArrayHandle
         self._start_address_in_memory = dict()
 
         self.last_assigned_address = 0
 
-        self.cache = Cache(
-            cache_size=cache_size, 
+        self.memory = Memory(memory_size=memory_size, block_size=block_size, mmap_path=memory_path)
+        # Every access is recorded here if record_trace, to be replayed later (see replay.py)
+        if trace_path is not None:
+            self.trace = TraceWriter(trace_path)
+        else:
+            self.trace = Trace() if record_trace else None
+        # Misses and evictions per allocation (accesses too with count_accesses), and counters
+        # per phase (see phase)
+        self.allocations = Allocations(count_accesses)
+        self._accesses = self.allocations.accesses if count_accesses else None
+        if count_accesses:
+            # Counting versions of the scalar accesses, so the default ones pay nothing for it
+            self.read = self._counted_read
+            self.write = self._counted_write
+            self.increment = self._counted_increment
+        self.phases = dict()
+        cache_args = dict(cache_size=cache_size, block_size=block_size, mapping_pol=mapping_pol,
+                          replace_pol=replace_pol, policy_args=policy_args, cache_engine=cache_engine)
+        self.cpu = self._build_cpu(cache_args, levels, inclusion, dict(
+            write_pol=write_pol, write_allocate=write_allocate, prefetcher=prefetcher, telemetry=telemetry,
+            hooks=hooks))
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.progress = dict()  # Saved with the checkpoints, e.g. the loop indices of a driver
+        self._schedule_checkpoints()
+
+    def _build_cpu(self, cache_args: dict, levels: List[dict], inclusion: str, cpu_args: dict):
+        # Build self.cache and return the CPU running on it (overridden by SimulatorFanout)
+        write_pol = cpu_args['write_pol']
+        if levels is None:
+            self.cache = self._build_cache(write_pol=write_pol, **cache_args)
+        else:
+            self.cache = CacheHierarchy([self._build_cache(write_pol=write_pol, **level) for level in levels],
+                                        self.memory, inclusion)
+        return CPU(cache=self.cache, memory=self.memory, trace=self.trace, allocations=self.allocations,
+                   **cpu_args)
+
+    def _build_cache(self, cache_size: int, block_size: int, mapping_pol: int, replace_pol: str,
+                     write_pol: str, policy_args: dict, cache_engine: str):
+        if cache_engine not in CACHE_ENGINES:
+            raise ValueError(f'Invalid cache engine: {cache_engine}')
+        return CACHE_ENGINES[cache_engine](
+            cache_size=cache_size,
             block_size=block_size,
-            memory_size=memory_size, 
+            memory_size=self.memory_size,
             mapping_pol=mapping_pol,
-            replace_pol=replace_pol, 
-            write_pol=write_pol
+            replace_pol=replace_pol,
+            write_pol=write_pol,
+            policy_args=policy_args
         )
-        self.memory = Memory(memory_size=memory_size, block_size=block_size)
-        self.cpu = CPU(cache=self.cache, memory=self.memory)
 
-    def allocate(self, *dimension: int, default_val: Any = None):
+    def allocate(self, *dimension: int, default_val: Any = None, name: str = None,
+                 through_cache: bool = True):
         """
         e.g. self.allocate() allocates a single value
              self.allocate(3) allocates 1-D array of size 3
              self.allocate(3, 6) allocates 2-D array of size 3x6
+             self.allocate(3, 6, name="A") counts its misses under "A" (see get_allocation_summary)
+             self.allocate(3, 6, default_val=0, through_cache=False) initialises memory directly,
+             without accesses
         """
-        addr = self.last_assigned_address
-        
-        if dimension == ():
-            self._data_dim[addr] = ()
-            self.last_assigned_address += 1
-            self.memory.allocate(1)
-            if default_val is not None:
-                self.cpu.write(addr, default_val)
-        else:
-            sz = reduce(lambda x, y: x * y, dimension)
-            self._data_dim[addr] = dimension
-            self.last_assigned_address += sz
-            self.memory.allocate((sz//self.block_size) + 1)
-            if default_val is not None:
-                for a in range(addr, addr + sz):
-                    self.cpu.write(a, default_val)
+        addr = ArrayHandle(self.last_assigned_address, dimension)
+        addr.simulator = self
+        if name is None:
+            name = f'alloc{len(self.allocations.starts)}'
+        addr.allocation = self.allocations.add(name, addr.start)
+        self._handles[addr] = addr
+        self.last_assigned_address += addr.size
+        self._allocate_memory()
+        if default_val is not None:
+            if not through_cache:
+                self.memory.write_values(addr.start, np.full(addr.size, default_val))
+                return addr
+            self._count(addr, addr.size)
+            write = self.cpu.write
+            for a in range(addr, addr + addr.size):
+                write(a, default_val)
+
+        return addr
 
+    def load_array(self, values, name: str = None) -> ArrayHandle:
+        """
+        e.g. self.load_array(A) allocates an array of the shape of A holding A
+        Writes memory directly: no accesses are counted and the cache is left untouched.
+        """
+        values = np.asarray(values)
+        addr = self.allocate(*values.shape, name=name)
+        self.memory.write_values(addr.start, values)
         return addr
 
-    def _get_mem_address(self, pointer: int, *idx: int):
-        dim = self._data_dim[pointer]
-        assert len(dim) == len(idx), "Dimension of array mismatch"
-        address_in_variable = _get_flat_idx(idx, dim)
-        mem_address = pointer + address_in_variable
-        return mem_address
+    def dump_array(self, pointer: int) -> np.ndarray:
+        """
+        e.g. self.dump_array(C) returns a copy of C with the shape of the allocation
+        Reads memory directly (always up to date, blocks in the cache are views of memory):
+        no accesses are counted and the cache is left untouched.
+        """
+        handle = self._get_handle(pointer)
+        return self.memory.read_values(handle.start, handle.size).reshape(handle.shape)
+
+    def _allocate_memory(self):
+        # Allocate just enough blocks to cover every address assigned so far
+        needed = -(-self.last_assigned_address // self.block_size) - self.memory.allocated_blocks
+        if needed > 0:
+            self.memory.allocate(needed)
+
+    def _get_handle(self, pointer: int) -> ArrayHandle:
+        return pointer if isinstance(pointer, ArrayHandle) else self._handles[pointer]
+
+    def _count(self, handle: ArrayHandle, accesses: int):
+        # Charge accesses to the allocation of handle (bulk operations, with count_accesses)
+        if self._accesses is not None:
+            self._accesses[handle.allocation] += accesses
+
+    def _tile_addresses(self, handle: ArrayHandle, r: int, c: int, rows: int, cols: int):
+        # Start address of every row of a rows x cols tile at (r, c) of a 2-D array. Callers
+        # charge the accesses (see _count) once every operand is checked.
+        if len(handle.shape) != 2:
+            raise IndexError('Tiles need a 2-D array')
+        n_rows, n_cols = handle.shape
+        if not (0 <= r and r + rows <= n_rows and 0 <= c and c + cols <= n_cols):
+            raise IndexError('Tile must lie inside the array')
+        row_stride = handle.strides[0]
+        start = handle + r * row_stride + c
+        return [start + i * row_stride for i in range(rows)]
 
     def write(self, pointer: int, *idx: int, value: Any):
         """
@@ -80,8 +306,8 @@ class Simulator():
              self.write(ptr, 3, value=4) sets *ptr[3] = 4
              self.write(ptr, 3, 6, value=4) sets *ptr[3][6] = 4
         """
-        mem_address = self._get_mem_address(pointer, *idx)
-        self.cpu.write(mem_address, value)
+        handle = pointer if isinstance(pointer, ArrayHandle) else self._handles[pointer]
+        self.cpu.write(handle.address(*idx), value)
 
     def increment(self, pointer: int, *idx: int, value: Any):
         """
@@ -89,7 +315,8 @@ class Simulator():
              self.increment(ptr, 3, value=4) sets *ptr[3] += 4
              self.increment(ptr, 3, 6, value=4) sets *ptr[3][6] += 4
         """
-        mem_address = self._get_mem_address(pointer, *idx)
+        handle = pointer if isinstance(pointer, ArrayHandle) else self._handles[pointer]
+        mem_address = handle.address(*idx)
         old_value = self.cpu.read(mem_address)
         new_value = old_value + value
         self.cpu.write(mem_address, new_value)
@@ -100,19 +327,223 @@ class Simulator():
              self.read(ptr, 3) returns value of *ptr[3]
              self.read(ptr, 3, 6) returns value of *ptr[3][6]
         """
-        mem_address = self._get_mem_address(pointer, *idx)
-        return self.cpu.read(mem_address)
+        handle = pointer if isinstance(pointer, ArrayHandle) else self._handles[pointer]
+        return self.cpu.read(handle.address(*idx))
+
+    # Counted once the access went through, so an index error charges nothing
+    def _counted_read(self, pointer: int, *idx: int):
+        handle = self._get_handle(pointer)
+        value = type(self).read(self, handle, *idx)
+        self._accesses[handle.allocation] += 1
+        return value
+
+    def _counted_write(self, pointer: int, *idx: int, value: Any):
+        handle = self._get_handle(pointer)
+        type(self).write(self, handle, *idx, value=value)
+        self._accesses[handle.allocation] += 1
+
+    def _counted_increment(self, pointer: int, *idx: int, value: Any):
+        handle = self._get_handle(pointer)
+        type(self).increment(self, handle, *idx, value=value)
+        self._accesses[handle.allocation] += 2
+
+    def read_row(self, pointer: int, i: int):
+        """
+        e.g. self.read_row(ptr, 3) returns [*ptr[3][0], *ptr[3][1], ...]
+        Same cache accesses, in the same order, as reading the row element by element.
+        """
+        n_cols = self._get_handle(pointer).shape[1]
+        return self.read_tile(pointer, i, 0, 1, n_cols)[0]
+
+    def read_slice(self, pointer: int, key):
+        """
+        e.g. self.read_slice(ptr, (3, slice(None))) returns ptr[3, :] as a NumPy array
+             self.read_slice(ptr, (slice(2, 5), slice(4, 7))) returns ptr[2:5, 4:7]
+        Addresses and counters of the selection are computed at once, then elements are read
+        in row-major order, like the equivalent nested loop of reads (see ArrayHandle.addresses).
+        """
+        handle = self._get_handle(pointer)
+        addresses, shape = handle.addresses(key)
+        self._count(handle, len(addresses))
+        return np.fromiter(map(self.cpu.read, addresses.tolist()), dtype=np.int64,
+                           count=len(addresses)).reshape(shape)
+
+    def write_slice(self, pointer: int, key, values):
+        """
+        e.g. self.write_slice(ptr, (slice(2, 5), slice(4, 7)), X) sets ptr[2:5, 4:7] = X
+        values is broadcast to the selection (a scalar fills it), elements are written in
+        row-major order, like the equivalent nested loop of writes.
+        """
+        handle = self._get_handle(pointer)
+        addresses, shape = handle.addresses(key)
+        values = np.broadcast_to(values, shape).ravel().tolist()
+        self._count(handle, len(addresses))
+        write = self.cpu.write
+        for a, v in zip(addresses.tolist(), values):
+            write(a, v)
+
+    def read_tile(self, pointer: int, r: int, c: int, rows: int, cols: int):
+        """
+        e.g. self.read_tile(ptr, 2, 4, 3, 3) returns ptr[2:5][4:7] as a 3x3 array
+        Elements are read in row-major order, like the equivalent nested loop of reads.
+        """
+        handle = self._get_handle(pointer)
+        starts = self._tile_addresses(handle, r, c, rows, cols)
+        self._count(handle, rows * cols)
+        read = self.cpu.read
+        return np.array([[read(a) for a in range(start, start + cols)] for start in starts], dtype=np.int64)
+
+    def write_tile(self, pointer: int, r: int, c: int, values):
+        """
+        e.g. self.write_tile(ptr, 2, 4, X) sets ptr[2:2+X.shape[0]][4:4+X.shape[1]] = X
+        Elements are written in row-major order, like the equivalent nested loop of writes.
+        """
+        values = np.asarray(values)
+        rows, cols = values.shape
+        handle = self._get_handle(pointer)
+        starts = self._tile_addresses(handle, r, c, rows, cols)
+        self._count(handle, rows * cols)
+        write = self.cpu.write
+        for start, row in zip(starts, values.tolist()):
+            for a, v in zip(range(start, start + cols), row):
+                write(a, v)
+
+    def increment_tile(self, pointer: int, r: int, c: int, values):
+        """
+        e.g. self.increment_tile(ptr, 2, 4, X) sets ptr[2:2+X.shape[0]][4:4+X.shape[1]] += X
+        Each element is read then written, in row-major order, like calling increment per element.
+        """
+        values = np.asarray(values)
+        rows, cols = values.shape
+        handle = self._get_handle(pointer)
+        starts = self._tile_addresses(handle, r, c, rows, cols)
+        self._count(handle, 2 * rows * cols)
+        read = self.cpu.read
+        write = self.cpu.write
+        for start, row in zip(starts, values.tolist()):
+            for a, v in zip(range(start, start + cols), row):
+                write(a, read(a) + v)
+
+    def matmul_tile(self, A: int, a_r: int, a_c: int, B: int, b_r: int, b_c: int,
+                    C: int, c_r: int, c_c: int, rows: int, inner: int, cols: int,
+                    accumulate: bool = False):
+        """
+        C[c_r:c_r+rows][c_c:c_c+cols] (+)= A[a_r:a_r+rows][a_c:a_c+inner] * B[b_r:b_r+inner][b_c:b_c+cols]
+
+        Charges exactly the accesses of the scalar loop
+            for i: for j: c = sum_k read(A, i, k) * read(B, k, j); write (or increment) C[i][j]
+        """
+        A, B, C = self._get_handle(A), self._get_handle(B), self._get_handle(C)
+        a_rows = self._tile_addresses(A, a_r, a_c, rows, inner)
+        b_rows = self._tile_addresses(B, b_r, b_c, inner, cols)
+        c_rows = self._tile_addresses(C, c_r, c_c, rows, cols)
+        self._count(A, rows * inner * cols)
+        self._count(B, rows * inner * cols)
+        self._count(C, (2 if accumulate else 1) * rows * cols)
+        read = self.cpu.read
+        write = self.cpu.write
+        for a_start, c_start in zip(a_rows, c_rows):
+            a_row = range(a_start, a_start + inner)
+            for j in range(cols):
+                c = 0
+                for a, b in zip(a_row, b_rows):
+                    c += read(a) * read(b + j)
+                if accumulate:
+                    c += read(c_start + j)
+                write(c_start + j, c)
 
     def get_dimension(self, pointer: int):
-        return self._data_dim[pointer]
+        return self._get_handle(pointer).shape
 
     def get_access_summary(self):
-        return {
-            'cache_hits': self.cpu.hits,
-            'cache_misses': self.cpu.miss,
-            'total_access': self.cpu.total_access,
-            'hit_rate': self.cpu.hits / self.cpu.total_access
-        }
+        return self.cpu.get_access_summary()
+
+    def get_level_summary(self):
+        """
+        Counters of every cache level, L1 first (see CacheHierarchy.get_level_summary).
+        A single cache is one level whose fills are the blocks read from memory.
+        """
+        if isinstance(self.cache, CacheHierarchy):
+            return self.cache.get_level_summary()
+        summary = self.cpu.get_access_summary()
+        return [{
+            'cache_hits': summary['cache_hits'],
+            'cache_misses': summary['cache_misses'],
+            'total_access': summary['total_access'],
+            'hit_rate': summary['hit_rate'],
+            'fills': summary['blocks_read'],
+            'evictions': summary['evictions'],
+            'writebacks': summary['blocks_written_back'],
+        }]
+
+    def get_allocation_summary(self):
+        """
+        e.g. self.get_allocation_summary()["A"]["cache_misses"] is the number of misses on A
+        Counters of every allocation name, see Allocations.summary (accesses, hits and hit rate
+        are None without count_accesses).
+        """
+        return self.allocations.summary()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        e.g. with self.phase("compute"):
+                 matmul(...)
+        Counts the accesses made inside the block under name (a phase entered several times
+        accumulates). Only snapshots the CPU counters on entry and exit.
+        """
+        before = self.cpu.get_counters()
+        try:
+            yield
+        finally:
+            after = self.cpu.get_counters()
+            totals = self.phases.setdefault(name, dict.fromkeys(after, 0))
+            for key, value in after.items():
+                totals[key] += value - before[key]
+
+    def get_phase_summary(self):
+        """Counters of every phase (same keys as get_access_summary)."""
+        summary = dict()
+        for name, totals in self.phases.items():
+            summary[name] = dict(totals)
+            summary[name]['hit_rate'] = totals['cache_hits'] / totals['total_access'] if totals['total_access'] else 0.0
+        return summary
+
+    def _schedule_checkpoints(self):
+        if self.checkpoint_every is not None:
+            assert self.checkpoint_path is not None, "checkpoint_every needs a checkpoint_path"
+            self.cpu.checkpoint = self._periodic_checkpoint
+            self.cpu.next_checkpoint = self.cpu.total_access + self.checkpoint_every
+
+    def _periodic_checkpoint(self):
+        self.cpu.next_checkpoint = self.cpu.total_access + self.checkpoint_every
+        self.save(self.checkpoint_path)
+
+    def save(self, path: str, compresslevel: int = 6):
+        """
+        e.g. self.save('warm.ckpt'), then Simulator.load('warm.ckpt') once per experiment branch
+        Checkpoint of the whole state: memory, caches and policy metadata, counters, trace,
+        memory profile, prefetcher and the global random states (see checkpoint).
+        """
+        checkpoint.save(self, path, compresslevel)
+
+    @staticmethod
+    def load(path: str, memory_path: str = None, restore_random: bool = True, trace_path: str = None):
+        """
+        Simulator (or SimulatorAdaptive) saved with save. Each load gives an independent copy.
+
+        :param memory_path: file backing the restored memory, None to keep it in RAM
+        :param restore_random: also restore the random and numpy.random global states
+        :param trace_path: file the restored simulator carries on streaming its trace to (with
+                           Simulator(trace_path=...), see checkpoint.load), a different one per branch
+        """
+        return checkpoint.load(path, memory_path, restore_random, trace_path)
 
     def reset_stats(self):
         self.cpu.reset_stats()
+        self.phases = dict()
+
+    def flush(self):
+        """Write back every dirty block, counted in blocks_flushed (WB only), so that
+        blocks_written_back + blocks_flushed covers the whole run."""
+        self.cpu.flush()
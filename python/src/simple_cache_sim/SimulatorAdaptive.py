@@ -2,13 +2,44 @@
 from typing import Optional, Tuple, Any
 from simple_cache_sim.Simulator import Simulator
 from simple_cache_sim.CPUAdaptive import CPUAdaptive
+from simple_cache_sim.memory_profiles import Profile
 
 
 class SimulatorAdaptive(Simulator):
     def __init__(self, memory_size: int, cache_size: int, block_size: int,
-                 mapping_pol: int = None, replace_pol: str = "LRU", write_pol: str = "WT", c1: int = 4):
+                 mapping_pol: int = None, replace_pol: str = "LRU", write_pol: str = "WT", c1: int = 4,
+                 record_trace: bool = False, memory_path: str = None, policy_args: dict = None,
+                 cache_engine: str = "dict", write_allocate: bool = True,
+                 resize_keep: str = "random", resize_every: int = 1,
+                 profile: Profile = None, seed: int = None, prefetcher=None,
+                 checkpoint_path: str = None, checkpoint_every: int = None, trace_path: str = None,
+                 telemetry=None, hooks=None, count_accesses: bool = False, record_misses: bool = False,
+                 work=None):
+        """
+
+        :param profile: memory profile (see memory_profiles). Simulators given the same profile
+                        see the same cache size after the same number of accesses, the cache is
+                        resized at the access counts where the profile changes, hits included.
+        :param resize_every: ask the default profile (MemoryProfile2) for a new cache size every
+                             resize_every misses
+        :param seed: seed of the default profile (MemoryProfile2) when no profile is given
+        :param record_misses: record the access count at every miss, for adaptivity.efficiency_report
+        :param work: names of the allocations whose accesses measure progress in the adaptivity
+                     report, e.g. ("A", "B") (see CPUAdaptive). Turns on count_accesses.
+        """
+        if work is not None:
+            count_accesses = True  # The work is read from the per-allocation access counters
 
         super().__init__( memory_size, cache_size, block_size,
-                 mapping_pol, replace_pol, write_pol)
+                 mapping_pol, replace_pol, write_pol, record_trace, memory_path, policy_args,
+                 cache_engine, write_allocate, trace_path=trace_path, count_accesses=count_accesses)
 
-        self.cpu = CPUAdaptive(cache=self.cache, memory=self.memory, write_pol=write_pol, c1=c1)
+        self.cpu = CPUAdaptive(cache=self.cache, memory=self.memory, write_pol=write_pol, c1=c1,
+                               trace=self.trace, write_allocate=write_allocate,
+                               resize_keep=resize_keep, resize_every=resize_every,
+                               allocations=self.allocations, profile=profile, seed=seed,
+                               prefetcher=prefetcher, telemetry=telemetry,
+                               hooks=hooks, record_misses=record_misses, work=work)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self._schedule_checkpoints()
@@ -0,0 +1,59 @@
+from typing import List
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.CPU import CPU
+from simple_cache_sim.CPUFanout import CPUFanout
+
+# Keys of a configuration passed to the CPU rather than to the cache
+_CPU_ARGS = ('write_allocate', 'prefetcher', 'telemetry', 'hooks')
+
+
+class SimulatorFanout(Simulator):
+    def __init__(self, memory_size: int, configs: List[dict], write_pol: str = "WT",
+                 record_trace: bool = False, memory_path: str = None, write_allocate: bool = True,
+                 checkpoint_path: str = None, checkpoint_every: int = None, trace_path: str = None,
+                 count_accesses: bool = False):
+        """
+        e.g. SimulatorFanout(2**20, [dict(cache_size=16, block_size=4), dict(cache_size=64, block_size=8,
+                                     mapping_pol=2, replace_pol="FIFO")])
+        Runs every access against all the cache configurations at once (see CPUFanout), for
+        sweeps over policies without the inclusion property (FIFO, RAND, set-associative LRU)
+        that stack_distance.lru_miss_curve can't cover in one pass.
+
+        :param configs: one dict per cache with cache_size and block_size, and optionally
+                        mapping_pol, replace_pol, policy_args, cache_engine, write_pol and
+                        write_allocate (default: the arguments of this constructor), prefetcher,
+                        telemetry and hooks (one object per configuration)
+        """
+        assert configs, "A fan-out needs at least one configuration"
+        block_size = min(config['block_size'] for config in configs)
+        largest = max(config['block_size'] for config in configs)
+        assert memory_size % largest == 0, "Memory size must be a multiple of every block size"
+
+        self.configs = [dict(dict(mapping_pol=None, replace_pol="LRU", policy_args=None, cache_engine="dict",
+                                  write_pol=write_pol, write_allocate=write_allocate), **config)
+                        for config in configs]
+        super().__init__(memory_size, configs[0]['cache_size'], block_size, write_pol=write_pol,
+                         record_trace=record_trace, memory_path=memory_path, write_allocate=write_allocate,
+                         checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every,
+                         trace_path=trace_path, count_accesses=count_accesses)
+
+    def _build_cpu(self, cache_args: dict, levels: List[dict], inclusion: str, cpu_args: dict):
+        # One cache and CPU per configuration, behind a CPUFanout
+        cpus = []
+        for i, config in enumerate(self.configs):
+            cache = self._build_cache(**{key: value for key, value in config.items() if key not in _CPU_ARGS})
+            # Misses and evictions per allocation are attributed with the first configuration
+            cpus.append(CPU(cache=cache, memory=self.memory, write_pol=config['write_pol'],
+                            allocations=self.allocations if i == 0 else None,
+                            **{key: value for key, value in config.items() if key in _CPU_ARGS}))
+        self.caches = [cpu.cache for cpu in cpus]
+        self.cache = self.caches[0]
+        return CPUFanout(cpus, trace=self.trace)
+
+    def get_summaries(self):
+        """
+        Access summary of every configuration, in the order of configs
+        (get_access_summary gives the first one).
+        """
+        return self.cpu.get_summaries()
@@ -0,0 +1,70 @@
+from array import array
+
+import numpy as np
+
+
+class Trace():
+    """
+    Address trace recorded from a CPU
+
+    Every access is stored as an (address, op) pair. Addresses live in a typed
+    array of int64 and ops in a bytearray, so a trace costs 9 bytes per access
+    instead of a Python tuple per access.
+    """
+    READ = 0
+    WRITE = 1
+
+    def __init__(self, addresses=None, ops=None):
+        """
+
+        :param addresses: optional iterable of addresses to start the trace with
+        :param ops: optional iterable of ops (Trace.READ / Trace.WRITE), same length as addresses
+        """
+        self.addresses = array('q')
+        self.ops = bytearray()
+        if addresses is not None:
+            self.addresses.extend(int(a) for a in addresses)
+            self.ops.extend(int(o) for o in ops)
+        assert len(self.addresses) == len(self.ops), "Addresses and ops must have the same length"
+
+    def append(self, address: int, op: int):
+        self.addresses.append(address)
+        self.ops.append(op)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __iter__(self):
+        return zip(self.addresses, self.ops)
+
+    def max_address(self) -> int:
+        return max(self.addresses, default=-1)
+
+    def as_numpy(self):
+        """Zero-copy NumPy views of the trace.
+
+        :return: tuple (addresses, ops) of int64 and uint8 arrays
+        """
+        return (np.frombuffer(self.addresses, dtype=np.int64),
+                np.frombuffer(self.ops, dtype=np.uint8))
+
+    def save(self, path):
+        """Save the trace as an .npz file.
+
+        :param path: file name to save to
+        """
+        addresses, ops = self.as_numpy()
+        np.savez(path, addresses=addresses, ops=ops)
+
+    @classmethod
+    def load(cls, path):
+        """Load a trace saved with Trace.save.
+
+        :param path: file name to load from
+        :return: Trace
+        """
+        trace = cls()
+        with np.load(path) as f:
+            trace.addresses.frombytes(f['addresses'].astype(np.int64).tobytes())
+            trace.ops.extend(f['ops'].astype(np.uint8).tobytes())
+        return trace
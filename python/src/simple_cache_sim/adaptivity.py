@@ -0,0 +1,121 @@
+"""
+Cache-adaptivity efficiency of a run under a memory profile
+
+In the cache-adaptive model time is counted in I/Os (misses) and the memory profile m(t) is the
+cache size in blocks during the t-th I/O. The profile of a run (CPUAdaptive.size_history) is
+decomposed greedily into the largest squares that fit under it: a square starting at I/O t has
+the largest size s (in blocks) such that m >= s during the s I/Os [t, t + s).
+
+An (a, b, c)-regular recursion (a subproblems of size N/b, e.g. a = 8, b = 4 for matrix
+multiplication with N the number of words of a matrix) can make at most O((s * B)^(log_b a))
+progress in a square of s blocks of B words. Progress is measured in the accesses of the
+allocations doing the work (SimulatorAdaptive(work=("A", "B"))), divided by accesses_per_unit
+(e.g. 2 for the reads of A and B of one multiply-add), so overhead such as the temporaries of an
+algorithm is not progress. Without work every access counts. The efficiency
+    total progress / sum of the square bounds
+is only defined up to a constant factor: compare algorithms under the same profile, an
+algorithm whose efficiency drops when the profile varies more is not cache-adaptive.
+"""
+import math
+from typing import Dict, List, Tuple
+
+from simple_cache_sim.CPUAdaptive import CPUAdaptive
+
+
+def square_decomposition(size_history, total_misses: int, block_size: int) -> List[Tuple[int, int]]:
+    """Squares under a profile.
+
+    :param size_history: (misses, accesses, cache size in words) at the start and after every
+                         change of size, in increasing misses (see CPUAdaptive.size_history)
+    :param total_misses: length of the run in I/Os
+    :param block_size: block size in words
+    :return: list of (first I/O, size in blocks) of every square. The last square is cut at the
+             end of the run.
+    """
+    starts = [misses for misses, _, _ in size_history]
+    sizes = [max(1, size // block_size) for _, _, size in size_history]
+    squares = []
+    t0 = 0
+    i = 0  # Step of the profile in effect at t0
+    while t0 < total_misses:
+        while i + 1 < len(starts) and starts[i + 1] <= t0:
+            i += 1
+        low = sizes[i]
+        j = i + 1
+        # Extend the square over the steps starting inside it, until one is too small
+        while j < len(starts) and starts[j] < min(t0 + low, total_misses):
+            span = starts[j] - t0
+            low = min(low, sizes[j])
+            if low <= span:
+                low = span
+                break
+            j += 1
+        side = min(low, total_misses - t0)
+        squares.append((t0, side))
+        t0 += side
+    return squares
+
+
+def progress_bound(square_blocks: int, block_size: int, a: int = 8, b: int = 4) -> float:
+    """Most progress an (a, b, c)-regular recursion can make in a square of square_blocks blocks."""
+    return float(square_blocks * block_size) ** math.log(a, b)
+
+
+def efficiency_report(cpu: CPUAdaptive, a: int = 8, b: int = 4, accesses_per_unit: float = 1) -> dict:
+    """Progress of a run in every square of its profile, against the bound of each square.
+
+    :param cpu: CPUAdaptive after the run (SimulatorAdaptive(record_misses=True, work=...).cpu)
+    :param a: number of subproblems of the recursion
+    :param b: size reduction of each subproblem
+    :param accesses_per_unit: accesses of the work allocations (every access without work) per
+                              unit of progress
+    :return: dict with squares (list of (first I/O, size in blocks, progress, bound)), progress,
+             bound and efficiency
+    """
+    if cpu.miss_accesses is None:
+        raise ValueError('The run did not record its misses, use SimulatorAdaptive(record_misses=True)')
+    block_size = cpu.cache.block_size
+    misses = cpu.miss
+    # Work done before the end of every I/O, and in the whole run
+    if cpu.miss_work is not None:
+        accesses_at = cpu.miss_work
+        total = cpu.allocations.accessed(cpu.work)
+    else:
+        accesses_at = cpu.miss_accesses
+        total = cpu.total_access
+    squares = []
+    progress = 0.0
+    bound = 0.0
+    for t0, side in square_decomposition(cpu.size_history, misses, block_size):
+        begin = accesses_at[t0 - 1] if t0 else 0
+        end = accesses_at[t0 + side - 1] if t0 + side < misses else total
+        square_progress = (end - begin) / accesses_per_unit
+        square_bound = progress_bound(side, block_size, a, b)
+        squares.append((t0, side, square_progress, square_bound))
+        progress += square_progress
+        bound += square_bound
+    return {
+        'squares': squares,
+        'progress': progress,
+        'bound': bound,
+        'efficiency': progress / bound if bound else 0.0,
+    }
+
+
+def compare(cpus: Dict[str, CPUAdaptive], a: int = 8, b: int = 4, accesses_per_unit: float = 1) -> Dict[str, dict]:
+    """Efficiency of several runs (e.g. one per algorithm, all under the same profile).
+
+    :return: dict name -> dict with cache_misses, total_access, squares (count), progress, bound and efficiency
+    """
+    report = dict()
+    for name, cpu in cpus.items():
+        run = efficiency_report(cpu, a, b, accesses_per_unit)
+        report[name] = {
+            'cache_misses': cpu.miss,
+            'total_access': cpu.total_access,
+            'squares': len(run['squares']),
+            'progress': run['progress'],
+            'bound': run['bound'],
+            'efficiency': run['efficiency'],
+        }
+    return report
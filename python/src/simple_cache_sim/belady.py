@@ -0,0 +1,111 @@
+from heapq import heapify, heappop, heappush
+
+import numpy as np
+
+from simple_cache_sim.Trace import Trace
+
+
+def next_use(blocks: np.ndarray) -> np.ndarray:
+    """Index of the next reference to the same block, for every reference.
+
+    :param blocks: block number of every reference
+    :return: int64 array, len(blocks) where the block is never referenced again
+    """
+    n = len(blocks)
+    nxt = np.full(n, n, dtype=np.int64)
+    if n > 1:
+        order = np.argsort(blocks, kind='stable')  # References of each block in time order
+        same = blocks[order[1:]] == blocks[order[:-1]]
+        nxt[order[:-1][same]] = order[1:][same]
+    return nxt
+
+
+def opt_replay(trace: Trace, cache_size: int, block_size: int, mapping_pol: int = None,
+               write_pol: str = "WT", write_allocate: bool = True, flush: bool = False):
+    """Replay a trace with Belady's optimal (OPT/MIN) replacement: evict the block of the set
+    whose next reference is the furthest in the future.
+
+    The next use of every reference is computed up front, and every set keeps a heap of its
+    blocks keyed by next use. Entries made stale by a hit are skipped when popped and the heap
+    is rebuilt when it gets twice as large as the set, so an eviction costs O(log ways).
+    OPT gives the fewest misses any replacement policy can get on this trace and cache geometry.
+
+    :param trace: trace recorded by a Simulator (record_trace=True), or a TraceReader (the window
+                  is loaded in memory)
+    :param cache_size: cache size (in number of integers)
+    :param block_size: block size (in number of integers)
+    :param mapping_pol: associativity (None means fully associative)
+    :param write_pol: write policy, "WT" or "WB" (only changes the memory traffic counters)
+    :param write_allocate: whether write misses load the block into the cache
+    :param flush: count the dirty blocks left at the end in blocks_flushed, like replay
+    :return: same dict as Simulator.get_access_summary
+    """
+    addresses, ops = trace.as_numpy()
+    blocks = addresses // block_size
+    nxt = next_use(blocks).tolist()
+    blocks = blocks.tolist()
+    writes = ops.tolist()
+
+    cache_blocks = cache_size // block_size
+    ways = cache_blocks if mapping_pol is None else mapping_pol
+    num_sets = cache_blocks // ways
+    write_back = write_pol == "WB"
+
+    heaps = [[] for _ in range(num_sets)]  # Per set: (-next use, block), may hold stale entries
+    filled = [0] * num_sets  # Blocks in each set
+    resident = dict()  # Block -> next use
+    dirty = set()
+    max_heap = 2 * ways + 8
+
+    hits = 0
+    blocks_read = 0
+    blocks_written_back = 0
+    words_written = 0
+    evictions = 0
+    for block, use, op in zip(blocks, nxt, writes):
+        cache_set = block % num_sets
+        heap = heaps[cache_set]
+        if block in resident:
+            hits += 1
+            resident[block] = use
+            heappush(heap, (-use, block))
+            if len(heap) > max_heap:
+                heap[:] = [(-resident[b], b) for b in {b for _, b in heap if b in resident}]
+                heapify(heap)
+        else:
+            if op == Trace.WRITE and not write_allocate:
+                words_written += 1
+                continue
+            blocks_read += 1
+            if filled[cache_set] == ways:
+                while True:
+                    neg_use, victim = heappop(heap)
+                    if resident.get(victim) == -neg_use:
+                        break
+                del resident[victim]
+                evictions += 1
+                if victim in dirty:
+                    dirty.discard(victim)
+                    blocks_written_back += 1
+            else:
+                filled[cache_set] += 1
+            resident[block] = use
+            heappush(heap, (-use, block))
+        if op == Trace.WRITE:
+            if write_back:
+                dirty.add(block)
+            else:
+                words_written += 1
+
+    total = len(blocks)
+    return {
+        'cache_hits': hits,
+        'cache_misses': total - hits,
+        'total_access': total,
+        'blocks_read': blocks_read,
+        'blocks_written_back': blocks_written_back,
+        'blocks_flushed': len(dirty) if flush else 0,
+        'words_written': words_written,
+        'evictions': evictions,
+        'hit_rate': hits / total if total else 0.0,
+    }
@@ -0,0 +1,110 @@
+"""
+Checkpoints of a whole Simulator (see Simulator.save and Simulator.load)
+
+A checkpoint is a gzip file holding, in order:
+- a pickled header (format version, memory geometry, random and numpy.random global states)
+- the allocated part of the memory as raw int64 values (the rest of the memory is zeros)
+- the pickled simulator, where the memory buffer is a reference to the values above, so that
+  cached blocks (views of the memory) are views of the restored memory again
+
+Everything reachable from the simulator is saved: cache tags and dirty bits, policy metadata,
+CPU, level, allocation and phase counters, the trace, the memory profile and its position,
+seeded generators and the prefetcher state. The file is written next to its destination and
+renamed, so an interrupted save leaves the previous checkpoint intact.
+"""
+import gzip
+import os
+import pickle
+import random
+
+import numpy as np
+
+VERSION = 1
+_MEMORY = "memory"
+_CHUNK = 1 << 24  # Bytes of memory compressed or decompressed at a time
+
+
+class _Pickler(pickle.Pickler):
+
+    def __init__(self, file, memory_data):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._memory_data = memory_data
+
+    def persistent_id(self, obj):
+        return _MEMORY if obj is self._memory_data else None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, memory_data):
+        super().__init__(file)
+        self._memory_data = memory_data
+
+    def persistent_load(self, pid):
+        assert pid == _MEMORY, f'Unknown persistent id: {pid}'
+        return self._memory_data
+
+
+def save(simulator, path: str, compresslevel: int = 6):
+    """Write a checkpoint of simulator to path.
+
+    :param compresslevel: gzip level, 1 (fastest) to 9 (smallest)
+    """
+    memory = simulator.memory
+    data = memory.memory_data
+    used = memory.allocated_blocks * memory.block_size
+    header = {
+        'version': VERSION,
+        'size': len(data),
+        'used': used,
+        'random': random.getstate(),
+        'numpy_random': np.random.get_state(),
+    }
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wb', compresslevel=compresslevel) as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        values = memoryview(data[:used]).cast('B')
+        for start in range(0, len(values), _CHUNK):
+            f.write(values[start:start + _CHUNK])
+        _Pickler(f, data).dump(simulator)
+    os.replace(tmp_path, path)
+
+
+def load(path: str, memory_path: str = None, restore_random: bool = True, trace_path: str = None):
+    """Read a checkpoint written by save.
+
+    :param memory_path: file backing the restored memory (like Simulator(memory_path=...)),
+                        None to keep it in RAM. Two simulators restored from the same
+                        checkpoint must not share a memory file.
+    :param restore_random: also restore the states of the random and numpy.random generators
+    :param trace_path: if the simulator streams its trace to a file (Simulator(trace_path=...)),
+                       carry on in this file, starting with a copy of the trace up to the
+                       checkpoint (the original path truncates the original file instead, see
+                       TraceWriter.resume). None leaves the trace file untouched and the restored
+                       writer refuses to write.
+    :return: the simulator
+    """
+    with gzip.open(path, 'rb') as f:
+        header = pickle.load(f)
+        if header['version'] != VERSION:
+            raise ValueError(f'Unsupported checkpoint version: {header["version"]}')
+        if memory_path is None:
+            data = np.zeros(header['size'], dtype=np.int64)
+        else:
+            data = np.memmap(memory_path, dtype=np.int64, mode='w+', shape=(header['size'],))
+        used = header['used']
+        values = memoryview(data[:used]).cast('B')
+        start = 0
+        while start < len(values):
+            n = f.readinto(values[start:start + _CHUNK])
+            if not n:
+                raise ValueError(f'Truncated checkpoint: {path}')
+            start += n
+        simulator = _Unpickler(f, data).load()
+    simulator.memory.mmap_path = memory_path
+    if trace_path is not None:
+        simulator.trace.resume(trace_path)
+    if restore_random:
+        random.setstate(header['random'])
+        np.random.set_state(header['numpy_random'])
+    return simulator
@@ -0,0 +1,216 @@
+"""
+Memory profiles for adaptive runs: the cache size as a function of the access count
+
+A profile is a deterministic function of the number of accesses made so far (CPU.total_access),
+so two algorithms run with the same profile see the same cache size after the same number of
+accesses, and a run can be reproduced exactly. CPUAdaptive resizes the cache right after the
+access at which the size changes (see Profile.next_change), hits included, so how often an
+algorithm misses doesn't matter. Profiles can be shared between simulators:
+lookups keep a cursor for the common case of increasing access counts (O(1) amortised) and
+fall back to a binary search (a replay of the walk for RandomWalkProfile) when the count goes
+back (a new run or reset_stats).
+
+Sizes are in words like Simulator(cache_size=...). CPUAdaptive rounds them down to a size the
+cache can take (see CPUAdaptive.valid_cache_size).
+"""
+import random
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+class Profile():
+    """Base class of the memory profiles."""
+
+    def size_at(self, access: int) -> int:
+        """Cache size after access accesses."""
+        raise NotImplementedError
+
+    def next_change(self, access: int) -> Optional[int]:
+        """First access count after access at which the size may change, None if it never does.
+
+        CPUAdaptive asks for the size again only then. The default is every access, subclasses
+        return their next step.
+        """
+        return access + 1
+
+    def sizes(self, accesses: Iterable[int]) -> List[int]:
+        """Cache sizes at several access counts (e.g. to plot the profile)."""
+        return [self.size_at(t) for t in accesses]
+
+
+class StepProfile(Profile):
+    """
+    Piecewise constant profile: size_i from access_i until the next point
+
+    With a period the profile repeats every period accesses.
+    """
+
+    def __init__(self, points: Sequence[Tuple[int, int]], period: int = None):
+        """
+
+        :param points: (access count, cache size) pairs, the first one at access 0
+        :param period: repeat the profile every period accesses (None: keep the last size forever)
+        """
+        points = sorted((int(t), int(size)) for t, size in points)
+        assert points and points[0][0] == 0, "The first point must be at access 0"
+        assert period is None or period > points[-1][0], "The period must cover every point"
+        self.starts = [t for t, _ in points]
+        self.values = [size for _, size in points]
+        self.period = period
+        self._i = 0  # Cursor: index of the last lookup
+
+    @classmethod
+    def from_file(cls, path: str, period: int = None):
+        """Load a profile from a text file of "access_count cache_size" lines.
+
+        Values may be separated by spaces or commas, empty lines and lines starting with # are skipped.
+        """
+        points = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                t, size = line.replace(',', ' ').split()[:2]
+                points.append((int(t), int(size)))
+        return cls(points, period)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            for t, size in zip(self.starts, self.values):
+                f.write(f'{t} {size}\n')
+
+    def size_at(self, access: int) -> int:
+        if self.period is not None:
+            access %= self.period
+        starts = self.starts
+        i = self._i
+        if access < starts[i]:
+            i = bisect_right(starts, access) - 1
+        else:
+            last = len(starts) - 1
+            while i < last and starts[i + 1] <= access:
+                i += 1
+        self._i = i
+        return self.values[i]
+
+    def next_change(self, access: int) -> Optional[int]:
+        offset = 0
+        if self.period is not None:
+            offset = access - access % self.period
+            access %= self.period
+        i = bisect_right(self.starts, access)
+        if i < len(self.starts):
+            return offset + self.starts[i]
+        return None if self.period is None else offset + self.period
+
+
+class SquareProfile(StepProfile):
+    """
+    Sequence of squares: a square of size m lasts m/B I/Os in the cache-adaptive model, here
+    scale * m/B accesses.
+    """
+
+    def __init__(self, square_sizes: Sequence[int], block_size: int, scale: int = 1, repeat: bool = False):
+        """
+
+        :param square_sizes: size of every square, in words
+        :param block_size: block size in words
+        :param scale: accesses per I/O of the square duration
+        :param repeat: start again after the last square (otherwise keep the last size)
+        """
+        points = []
+        t = 0
+        for m in square_sizes:
+            points.append((t, m))
+            t += max(1, scale * m // block_size)
+        super().__init__(points, t if repeat else None)
+
+
+class SawtoothProfile(Profile):
+    """Size moving linearly from low to high over period accesses, then jumping back."""
+
+    def __init__(self, low: int, high: int, period: int, rising: bool = True):
+        """
+
+        :param rising: ramp from low up to high (False: from high down to low)
+        """
+        assert 0 < low <= high and period > 0
+        self.low = low
+        self.high = high
+        self.period = period
+        self.rising = rising
+
+    def size_at(self, access: int) -> int:
+        phase = access % self.period
+        if not self.rising:
+            phase = self.period - 1 - phase
+        return self.low + (self.high - self.low) * phase // max(1, self.period - 1)
+
+    def next_change(self, access: int) -> Optional[int]:
+        if self.low == self.high:
+            return None
+        # Sizes are monotonic within a period: binary search for the first other size before
+        # the next period starts
+        size = self.size_at(access)
+        lo = access + 1
+        hi = access - access % self.period + self.period
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.size_at(mid) != size:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+
+class RandomWalkProfile(Profile):
+    """
+    Seeded random walk: every step accesses the size halves with probability p_down, doubles
+    otherwise, and stays within [low, high].
+
+    The walk is generated lazily from the seed, so the same seed gives the same sizes at the same
+    access counts whatever the order of the lookups. Only the current step is kept (the profile
+    stays small in checkpoints of long runs): a lookup before it replays the walk from access 0.
+    """
+
+    def __init__(self, start: int, low: int, high: int, step: int, p_down: float = 0.5, seed: int = 0):
+        """
+
+        :param start: size at access 0
+        :param step: accesses between two moves
+        :param p_down: probability of halving the size at each move
+        :param seed: seed of the walk
+        """
+        assert 0 < low <= start <= high and step > 0
+        self.low = low
+        self.high = high
+        self.step = step
+        self.p_down = p_down
+        self.seed = seed
+        self.start = start
+        self._restart()
+
+    def _restart(self):
+        self._random = random.Random(self.seed)
+        self._k = 0  # Current step of the walk
+        self._size = self.start  # Size at that step
+
+    def size_at(self, access: int) -> int:
+        k = access // self.step
+        if k < self._k:
+            self._restart()
+        size = self._size
+        if k > self._k:
+            rand = self._random.random
+            for _ in range(k - self._k):
+                if rand() < self.p_down:
+                    size = max(self.low, size // 2)
+                else:
+                    size = min(self.high, size * 2)
+            self._k = k
+            self._size = size
+        return size
+
+    def next_change(self, access: int) -> Optional[int]:
+        return (access // self.step + 1) * self.step
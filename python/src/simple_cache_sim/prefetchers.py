@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from typing import Any, Iterable, Tuple
+
+from simple_cache_sim.CacheHierarchy import CacheHierarchy
+
+
+class Prefetcher():
+    """
+    Hardware-style prefetcher driven by the CPU miss path (see CPU(prefetcher=...))
+
+    After every demand miss the prefetcher picks blocks to fetch, and every block that is
+    allocated in memory and not cached yet is filled into the cache like a demand fill (its
+    victim is evicted and written back as usual). Counters:
+    - issued: prefetch fills (also counted in the CPU blocks_read)
+    - useful: prefetched blocks hit before being evicted
+    - unused: prefetched blocks evicted before being hit
+    - polluting: demand misses on a block that a prefetch fill had evicted
+
+    A prefetcher keeps state about the run, so use one per CPU.
+    """
+
+    def __init__(self):
+        self.cpu = None
+        self.block_size = 1
+        self.issued = 0
+        self.useful = 0
+        self.unused = 0
+        self.polluting = 0
+        self._pending = dict()  # Prefetched block -> stream that issued it, until hit or evicted
+        self._displaced = OrderedDict()  # Blocks evicted by prefetch fills, most recent last
+        self._displaced_limit = 0
+
+    def attach(self, cpu):
+        self.cpu = cpu
+        self.block_size = cpu.cache.block_size
+        # Remember as many displaced blocks as the cache holds, older ones would be gone anyway
+        levels = cpu.cache.levels if isinstance(cpu.cache, CacheHierarchy) else [cpu.cache]
+        self._displaced_limit = sum(level.cache_size // level.block_size for level in levels)
+
+    def reset_stats(self):
+        self.issued = 0
+        self.useful = 0
+        self.unused = 0
+        self.polluting = 0
+
+    def get_counters(self):
+        return {
+            'prefetches_issued': self.issued,
+            'prefetches_useful': self.useful,
+            'prefetches_unused': self.unused,
+            'prefetches_polluting': self.polluting,
+        }
+
+    def candidates(self, block: int) -> Tuple[Iterable[int], Any]:
+        """Blocks to prefetch after a demand miss on block (block numbers), and the stream they
+        belong to (given back to used)."""
+        raise NotImplementedError
+
+    def used(self, block: int, stream) -> Iterable[int]:
+        """Blocks to prefetch after the first hit on a prefetched block (block numbers)."""
+        return ()
+
+    def _fetch(self, blocks, stream=None):
+        cpu = self.cpu
+        cache = cpu.cache
+        memory = cpu.memory
+        block_size = self.block_size
+        limit = memory.allocated_blocks * memory.block_size
+        for block in blocks:
+            address = block * block_size
+            if not 0 <= address < limit or block in self._pending or cache.contains(address):
+                continue
+            self.issued += 1
+            self._pending[block] = stream
+            before = cpu.evictions
+            cpu._fill(address, memory.read_block_from_memory(address, block_size))
+            if cpu.evictions != before:
+                displaced = self._displaced
+                displaced[cpu.last_victim[0] // block_size] = None
+                if len(displaced) > self._displaced_limit:
+                    displaced.popitem(last=False)
+
+    def miss(self, address: int):
+        """Called by the CPU after the fill of every demand miss."""
+        block = address // self.block_size
+        if block in self._displaced:
+            del self._displaced[block]
+            self.polluting += 1
+        blocks, stream = self.candidates(block)
+        self._fetch(blocks, stream)
+
+    def hit(self, address: int):
+        """Called by the CPU on every hit."""
+        if self._pending:
+            block = address // self.block_size
+            if block in self._pending:
+                stream = self._pending.pop(block)
+                self.useful += 1
+                self._fetch(self.used(block, stream), stream)
+
+    def evicted(self, address: int):
+        """Called by the CPU when a block starting at address leaves the cache."""
+        block = address // self.block_size
+        if block in self._pending:
+            del self._pending[block]
+            self.unused += 1
+
+
+class NextLinePrefetcher(Prefetcher):
+    """Fetch the next degree blocks after a miss (and, if tagged, after the first hit on a
+    prefetched block, which keeps a sequential scan ahead of its misses)."""
+
+    def __init__(self, degree: int = 1, tagged: bool = False):
+        super().__init__()
+        self.degree = degree
+        self.tagged = tagged
+
+    def candidates(self, block):
+        return range(block + 1, block + 1 + self.degree), None
+
+    def used(self, block, stream):
+        if self.tagged:
+            return (block + self.degree,)
+        return ()
+
+
+class StridePrefetcher(Prefetcher):
+    """
+    Stride detection per stream. Without a program counter the stream of an access is the
+    allocation it belongs to (a single stream if the CPU has no allocations, e.g. in replay).
+    Each stream remembers its last missed block and stride, and once the same stride has been
+    seen confidence times in a row the next degree blocks along the stride are fetched. The first
+    hit on a prefetched block fetches one more (like tagged next-line), so the stream stays
+    degree blocks ahead instead of missing again once the prefetched blocks are used.
+
+    :param table_size: number of streams tracked (least recently missed dropped first)
+    """
+
+    def __init__(self, degree: int = 2, confidence: int = 2, table_size: int = 16):
+        super().__init__()
+        self.degree = degree
+        self.confidence = confidence
+        self.table_size = table_size
+        self.table = OrderedDict()  # stream -> [last block, stride, times seen]
+
+    def _stream(self, block: int):
+        allocations = self.cpu.allocations
+        if allocations is None or not allocations.starts:
+            return 0
+        return allocations.owner(block * self.block_size)
+
+    def candidates(self, block):
+        stream = self._stream(block)
+        entry = self.table.pop(stream, None)
+        if entry is None:
+            self.table[stream] = [block, 0, 0]
+            if len(self.table) > self.table_size:
+                self.table.popitem(last=False)
+            return (), stream
+        self.table[stream] = entry
+        stride = block - entry[0]
+        entry[0] = block
+        if stride == 0:
+            return (), stream
+        if stride == entry[1]:
+            entry[2] += 1
+        else:
+            entry[1] = stride
+            entry[2] = 1
+        if entry[2] < self.confidence:
+            return (), stream
+        return [block + stride * k for k in range(1, self.degree + 1)], stream
+
+    def used(self, block, stream):
+        entry = self.table.get(stream)
+        if entry is None or entry[2] < self.confidence:
+            return ()
+        entry[0] = block  # Strides continue from the last block used
+        return (block + entry[1] * self.degree,)
+
+
+class StreamBufferPrefetcher(Prefetcher):
+    """
+    Stream buffers: a miss outside every stream starts a new stream (replacing the least recently
+    used one) that fetches the next depth blocks, and every hit on a block of a stream fetches
+    one more block, so a stream stays depth blocks ahead of the accesses that follow it.
+
+    Unlike hardware stream buffers the blocks are fetched into the cache, so their cost shows
+    up as evictions and polluting prefetches.
+    """
+
+    def __init__(self, streams: int = 4, depth: int = 4):
+        super().__init__()
+        self.streams = streams
+        self.depth = depth
+        self._next = OrderedDict()  # stream -> next block to fetch
+        self._count = 0
+
+    def candidates(self, block):
+        for stream, following in self._next.items():
+            if following == block:
+                # The accesses ran ahead of this stream
+                self._next.move_to_end(stream)
+                break
+        else:
+            self._count += 1
+            stream = self._count
+        self._next[stream] = block + 1 + self.depth
+        if len(self._next) > self.streams:
+            self._next.popitem(last=False)
+        return range(block + 1, block + 1 + self.depth), stream
+
+    def used(self, block, stream):
+        following = self._next.get(stream)
+        if following is None:
+            return ()
+        self._next.move_to_end(stream)
+        self._next[stream] = following + 1
+        return [following]
@@ -0,0 +1,75 @@
+from typing import List
+
+from simple_cache_sim.Simulator import CACHE_ENGINES
+from simple_cache_sim.Memory import Memory
+from simple_cache_sim.CPU import CPU
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.belady import opt_replay
+
+
+def replay(trace: Trace, cache_size: int, block_size: int, mapping_pol: int = None,
+           replace_pol: str = "LRU", write_pol: str = "WT", policy_args: dict = None,
+           cache_engine: str = "dict", write_allocate: bool = True, prefetcher=None,
+           telemetry=None, hooks=None, flush: bool = False):
+    """Feed a recorded trace into a fresh CPU/Cache and return its access summary.
+
+    Only addresses are replayed, so written values are meaningless (0 is written).
+    The summary matches a live run of the same program with the same configuration, and with
+    flush the one of a live run ending with Simulator.flush.
+
+    :param trace: trace recorded by a Simulator (record_trace=True), or a TraceReader (or a
+                  window of one) streaming a trace file
+    :param cache_size: cache size (in number of integers)
+    :param block_size: block size (in number of integers)
+    :param mapping_pol: associativity (None means fully associative)
+    :param replace_pol: replacement policy name, "OPT" for Belady's offline optimal (see belady.opt_replay)
+    :param write_pol: write policy
+    :param policy_args: extra keyword arguments for the replacement policy
+    :param cache_engine: "dict" (Cache) or "array" (ArrayCache)
+    :param write_allocate: whether write misses load the block into the cache
+    :param prefetcher: optional Prefetcher (a fresh one per replay, see prefetchers)
+    :param telemetry: optional Telemetry (a fresh one per replay, see telemetry)
+    :param hooks: optional Hooks called on cache events (see Hooks)
+    :param flush: write back the dirty blocks left at the end (counted in blocks_flushed, WB only)
+    :return: same dict as Simulator.get_access_summary
+    """
+    if replace_pol.upper() == "OPT":
+        assert prefetcher is None and telemetry is None and hooks is None, \
+            "OPT replays don't prefetch, sample or call hooks"
+        return opt_replay(trace, cache_size, block_size, mapping_pol, write_pol, write_allocate, flush)
+
+    num_blocks = (trace.max_address() // block_size + 1) if len(trace) else 1
+    memory_size = num_blocks * block_size
+
+    cache = CACHE_ENGINES[cache_engine](cache_size=cache_size, block_size=block_size, memory_size=memory_size,
+                  mapping_pol=mapping_pol, replace_pol=replace_pol, write_pol=write_pol,
+                  policy_args=policy_args)
+    memory = Memory(memory_size=memory_size, block_size=block_size)
+    memory.allocate(num_blocks)
+    cpu = CPU(cache=cache, memory=memory, write_pol=write_pol, write_allocate=write_allocate,
+              prefetcher=prefetcher, telemetry=telemetry,
+              hooks=hooks)
+
+    read = cpu.read
+    write = cpu.write
+    for address, op in trace:
+        if op == Trace.WRITE:
+            write(address, 0)
+        else:
+            read(address)
+    if flush:
+        cpu.flush()
+
+    return cpu.get_access_summary()
+
+
+def replay_many(trace: Trace, configs: List[dict]):
+    """Replay one trace against several cache configurations.
+
+    e.g. replay_many(trace, [dict(cache_size=64, block_size=4), dict(cache_size=256, block_size=8)])
+
+    :param trace: trace recorded by a Simulator
+    :param configs: list of keyword arguments for replay
+    :return: list of access summaries, one per config
+    """
+    return [replay(trace, **config) for config in configs]
@@ -0,0 +1,239 @@
+"""
+Spatially sampled LRU miss ratio curves (SHARDS, Waldspurger et al., FAST 2015)
+
+Blocks are hashed and only the references to blocks whose hash falls below a threshold T (out of
+P = 2^24) are fed to a StackDistance, so the sample holds a fraction R = T / P of the blocks with
+all their references. A stack distance d measured in the sample stands for 1 + (d - 1) / R in
+the full stream (the block itself plus d - 1 sampled blocks, each standing for 1 / R blocks;
+the paper uses d / R, which overestimates the short distances that small caches depend on) and
+every sampled reference for 1 / R references. This estimates the stack distance histogram,
+and from it the misses of fully associative LRU at every cache size.
+
+- fixed rate: T is fixed, memory is proportional to R times the number of distinct blocks. The
+  difference between the expected (references * R) and the actual number of sampled references
+  is added to the smallest distance (SHARDS_adj).
+- fixed size (max_blocks): at most max_blocks blocks are tracked. When one more would be, T is
+  lowered to the largest hash tracked and the blocks at or above it are forgotten, so memory is
+  bounded by the sample size whatever the length of the stream.
+
+The sampled blocks are also split into `groups` disjoint sub-samples (by hash) with their own
+stacks, and the spread of their curves gives the standard error of the estimate, so the error is
+reported without the exact curve. Compare with stack_distance.lru_miss_curve on a smaller run
+(mean_absolute_error) to check a sampling rate.
+"""
+from heapq import heappop, heappush
+from typing import Dict, Iterable
+
+import numpy as np
+
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.trace_file import TraceReader
+from simple_cache_sim.stack_distance import StackDistance
+
+HASH_BITS = 24
+P = 1 << HASH_BITS
+_M64 = (1 << 64) - 1
+
+
+def block_hash(blocks: np.ndarray) -> np.ndarray:
+    """64-bit hashes (splitmix64 finalizer) of block numbers, as uint64."""
+    z = blocks.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _hash(block: int) -> int:
+    # Same as block_hash for one block
+    z = (block + 0x9E3779B97F4A7C15) & _M64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _M64
+    return z ^ (z >> 31)
+
+
+class _Sample():
+    # Stack and scaled histogram of one sample of blocks
+    def __init__(self):
+        self.stack = StackDistance()
+        self.hist = dict()  # scaled distance -> estimated references
+        self.cold = 0.0
+        self.sampled = 0
+
+    def add(self, block: int, rate: float):
+        self.sampled += 1
+        d = self.stack.access(block)
+        if d == 0:
+            self.cold += 1 / rate
+        else:
+            scaled = 1 + int((d - 1) / rate)  # The block itself and d - 1 sampled others
+            self.hist[scaled] = self.hist.get(scaled, 0.0) + 1 / rate
+
+    def misses(self, cache_blocks, references: int, rate: float, adjust: bool) -> np.ndarray:
+        hist = dict(self.hist)
+        if adjust:
+            # SHARDS_adj: correct the sampled references to the expected count at the smallest distance
+            hist[1] = hist.get(1, 0.0) + references - self.sampled / rate
+        distances = np.array(sorted(hist), dtype=np.int64)
+        counts = np.array([hist[d] for d in distances], dtype=np.float64)
+        beyond = np.concatenate([np.cumsum(counts[::-1])[::-1], [0.0]])  # references at distance >= distances[i]
+        cache_blocks = np.asarray(cache_blocks, dtype=np.int64)
+        return self.cold + beyond[np.searchsorted(distances, cache_blocks, side='right')]
+
+
+class Shards():
+    """
+    Sampled LRU stack distances of a block reference stream
+
+    e.g. s = Shards(block_size=16, rate=0.001); s.update(trace); s.miss_ratio_curve([1024, 4096])
+    A live Simulator can feed it through hooks: s.subscribe(hooks) before Simulator(..., hooks=hooks).
+    """
+
+    def __init__(self, block_size: int, rate: float = 0.01, max_blocks: int = None, groups: int = 4):
+        """
+
+        :param block_size: block size (in number of integers)
+        :param rate: fraction of the blocks sampled (the starting rate with max_blocks)
+        :param max_blocks: fixed-size sampling, at most this many blocks tracked (None: fixed rate)
+        :param groups: sub-samples used to estimate the error (1 for no error estimate)
+        """
+        if not 0 < rate <= 1:
+            raise ValueError(f'Invalid sampling rate: {rate}')
+        if groups < 1:
+            raise ValueError(f'Invalid number of groups: {groups}')
+        self.block_size = block_size
+        self.threshold = max(1, int(rate * P))
+        self.max_blocks = max_blocks
+        self.groups = groups
+        self.references = 0
+        self.sample = _Sample()
+        self._group_samples = [_Sample() for _ in range(groups)] if groups > 1 else []
+        self._tracked = []  # Max-heap of (-hash key, block, group) of the tracked blocks (fixed size)
+
+    @property
+    def rate(self) -> float:
+        return self.threshold / P
+
+    def _sample(self, block: int, key: int, group: int):
+        if key >= self.threshold:
+            return
+        rate = self.threshold / P
+        new = block not in self.sample.stack
+        self.sample.add(block, rate)
+        if self._group_samples:
+            self._group_samples[group].add(block, rate / self.groups)
+        if new and self.max_blocks is not None:
+            heappush(self._tracked, (-key, block, group))
+            if len(self._tracked) > self.max_blocks:
+                self._lower_threshold()
+
+    def _lower_threshold(self):
+        # Drop the blocks with the largest hash, they are not sampled at the new threshold
+        tracked = self._tracked
+        self.threshold = -tracked[0][0]
+        while tracked and -tracked[0][0] >= self.threshold:
+            _, block, group = heappop(tracked)
+            self.sample.stack.forget(block)
+            if self._group_samples:
+                self._group_samples[group].stack.forget(block)
+
+    def access(self, address: int):
+        """Reference one address."""
+        block = address // self.block_size
+        self.references += 1
+        h = _hash(block)
+        key = h >> (64 - HASH_BITS)
+        if key < self.threshold:
+            self._sample(block, key, h % self.groups)
+
+    def append(self, address: int, op: int):
+        # Trace interface
+        self.access(address)
+
+    def subscribe(self, hooks):
+        """Sample every access of the CPU the hooks are bound to (see Hooks)."""
+        hooks.on('hit', self._hooked)
+        hooks.on('miss', self._hooked)
+
+    def _hooked(self, address, cache_set, tag, op):
+        self.access(address)
+
+    def update(self, addresses):
+        """Reference many addresses: a Trace, a TraceReader, an array or an iterable.
+
+        Hashing and filtering are vectorized, only the sampled references are processed one by one.
+        """
+        if isinstance(addresses, TraceReader):
+            for chunk, _ in addresses.chunks():
+                self.update(chunk)
+            return
+        if isinstance(addresses, Trace):
+            addresses = addresses.as_numpy()[0]
+        addresses = np.asarray(addresses, dtype=np.int64)
+        blocks = addresses // self.block_size
+        self.references += len(blocks)
+        h = block_hash(blocks)
+        keys = h >> np.uint64(64 - HASH_BITS)
+        selected = np.nonzero(keys < np.uint64(self.threshold))[0]
+        groups = (h[selected] % np.uint64(self.groups)).tolist()
+        for block, key, group in zip(blocks[selected].tolist(), keys[selected].tolist(), groups):
+            self._sample(block, key, group)
+
+    def misses(self, cache_sizes: Iterable[int]) -> Dict[int, float]:
+        """Estimated misses of fully associative LRU for each cache size (in number of integers)."""
+        cache_sizes = list(cache_sizes)
+        misses = self.sample.misses([c // self.block_size for c in cache_sizes], self.references,
+                                    self.rate, self.max_blocks is None)
+        return dict(zip(cache_sizes, misses.tolist()))
+
+    def miss_ratio_curve(self, cache_sizes: Iterable[int]) -> Dict[int, float]:
+        """Estimated LRU miss ratio for each cache size."""
+        return {c: m / self.references if self.references else 0.0 for c, m in self.misses(cache_sizes).items()}
+
+    def error(self, cache_sizes: Iterable[int]) -> Dict[int, float]:
+        """Standard error of the estimated miss ratio for each cache size, from the spread of the
+        sub-samples (NaN with groups=1)."""
+        cache_sizes = list(cache_sizes)
+        if not self._group_samples or not self.references:
+            return {c: float('nan') for c in cache_sizes}
+        blocks = [c // self.block_size for c in cache_sizes]
+        rate = self.rate / self.groups
+        curves = np.array([g.misses(blocks, self.references, rate, self.max_blocks is None)
+                           for g in self._group_samples]) / self.references
+        stderr = curves.std(axis=0, ddof=1) / np.sqrt(self.groups)
+        return dict(zip(cache_sizes, stderr.tolist()))
+
+    def summary(self, cache_sizes: Iterable[int]) -> Dict[int, dict]:
+        """Per cache size: misses, miss_ratio and error (standard error of the miss ratio)."""
+        cache_sizes = list(cache_sizes)
+        misses = self.misses(cache_sizes)
+        error = self.error(cache_sizes)
+        return {c: {'misses': misses[c],
+                    'miss_ratio': misses[c] / self.references if self.references else 0.0,
+                    'error': error[c]}
+                for c in cache_sizes}
+
+
+def shards_miss_curve(addresses, block_size: int, cache_sizes: Iterable[int], rate: float = 0.01,
+                      max_blocks: int = None, groups: int = 4) -> Dict[int, dict]:
+    """Estimated misses of fully associative LRU for many cache sizes, from a sample of the blocks.
+
+    Sampled counterpart of stack_distance.lru_miss_curve.
+
+    :param addresses: Trace, TraceReader, array or iterable of addresses
+    :param block_size: block size (in number of integers)
+    :param cache_sizes: cache sizes (in number of integers)
+    :param rate: fraction of the blocks sampled (starting rate with max_blocks)
+    :param max_blocks: fixed-size sampling with at most this many blocks (None: fixed rate)
+    :param groups: sub-samples used to estimate the error
+    :return: dict cache size -> dict with misses, miss_ratio and error (see Shards.summary)
+    """
+    sampler = Shards(block_size, rate, max_blocks, groups)
+    sampler.update(addresses)
+    return sampler.summary(cache_sizes)
+
+
+def mean_absolute_error(estimate: Dict[int, float], exact: Dict[int, float]) -> float:
+    """Mean absolute difference between two curves over their common cache sizes (e.g. miss ratio
+    curves from Shards.miss_ratio_curve and from lru_miss_curve divided by the references)."""
+    common = [c for c in estimate if c in exact]
+    return sum(abs(estimate[c] - exact[c]) for c in common) / len(common) if common else 0.0
@@ -0,0 +1,166 @@
+from typing import Iterable, List
+
+import numpy as np
+
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.trace_file import TraceReader
+
+
+class StackDistance():
+    """
+    LRU stack distances of a stream of block references
+
+    The last reference time of every block seen so far is marked in a Fenwick tree indexed
+    by time. The stack distance of a reference is 1 + the number of marks after the previous
+    reference to the same block, so each reference costs O(log n). Timestamps are compacted
+    when the tree is full, so memory is proportional to the number of distinct blocks.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+
+        :param capacity: initial number of timestamps in the tree (grows as needed)
+        """
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+        self._last = dict()  # block -> time of last reference (1-based)
+        self._time = 0
+        self._prev_block = None
+
+    def __len__(self):
+        return len(self._last)
+
+    def __contains__(self, block: int) -> bool:
+        return block in self._last
+
+    def _add(self, i: int, delta: int):
+        tree = self._tree
+        n = self._capacity
+        while i <= n:
+            tree[i] += delta
+            i += i & (-i)
+
+    def _prefix(self, i: int) -> int:
+        tree = self._tree
+        s = 0
+        while i > 0:
+            s += tree[i]
+            i -= i & (-i)
+        return s
+
+    def _compact(self):
+        """Renumber the live timestamps to 1..k, keeping their order."""
+        live = sorted(self._last.items(), key=lambda kv: kv[1])
+        k = len(live)
+        self._capacity = max(self._capacity, 2 * k)
+        self._last = {block: t + 1 for t, (block, _) in enumerate(live)}
+        self._time = k
+        # Linear time Fenwick construction with a mark at 1..k
+        n = self._capacity
+        tree = [0] * (n + 1)
+        for i in range(1, k + 1):
+            tree[i] = 1
+        for i in range(1, n + 1):
+            j = i + (i & (-i))
+            if j <= n:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def access(self, block: int) -> int:
+        """Reference a block.
+
+        :param block: block number (address // block_size)
+        :return: stack distance (1 means most recently used), 0 for the first reference
+        """
+        if block == self._prev_block:
+            # Already on top of the stack, its mark is the latest one
+            return 1
+        self._prev_block = block
+
+        if self._time == self._capacity:
+            self._compact()
+        self._time += 1
+        now = self._time
+
+        last = self._last.get(block)
+        if last is None:
+            distance = 0
+        else:
+            distance = len(self._last) - self._prefix(last) + 1
+            self._add(last, -1)
+        self._last[block] = now
+        self._add(now, 1)
+        return distance
+
+    def forget(self, block: int):
+        """Drop a block from the stack (as if it had never been referenced).
+
+        :param block: block number
+        """
+        last = self._last.pop(block, None)
+        if last is not None:
+            self._add(last, -1)
+            if block == self._prev_block:
+                self._prev_block = None
+
+
+def _blocks(addresses, block_size: int):
+    if isinstance(addresses, Trace):
+        addresses = addresses.addresses
+    elif isinstance(addresses, TraceReader):
+        addresses = addresses.iter_addresses()
+    shift = block_size.bit_length() - 1
+    if 1 << shift == block_size:
+        return (a >> shift for a in addresses)
+    return (a // block_size for a in addresses)
+
+
+def stack_distance_histogram(addresses, block_size: int):
+    """Histogram of LRU stack distances of an address stream.
+
+    :param addresses: Trace, TraceReader or iterable of addresses
+    :param block_size: block size (in number of integers)
+    :return: tuple (hist, cold) where hist[d] is the number of references at stack distance d
+             and cold is the number of first references
+    """
+    sd = StackDistance()
+    access = sd.access
+    counts = dict()
+    for block in _blocks(addresses, block_size):
+        d = access(block)
+        counts[d] = counts.get(d, 0) + 1
+    cold = counts.pop(0, 0)
+    hist = np.zeros(max(counts, default=0) + 1, dtype=np.int64)
+    for d, c in counts.items():
+        hist[d] = c
+    return hist, cold
+
+
+def lru_miss_counts(hist: np.ndarray, cold: int, cache_blocks: Iterable[int]) -> List[int]:
+    """Misses of a fully associative LRU cache for each number of cache blocks.
+
+    :param hist: stack distance histogram from stack_distance_histogram
+    :param cold: number of first references
+    :param cache_blocks: cache capacities (in blocks)
+    :return: list of miss counts
+    """
+    # misses(c) = cold + number of references with distance > c
+    beyond = np.concatenate([np.cumsum(hist[::-1])[::-1], [0]])
+    return [int(cold + beyond[min(c + 1, len(beyond) - 1)]) for c in cache_blocks]
+
+
+def lru_miss_curve(addresses, block_size: int, cache_sizes: Iterable[int]):
+    """Exact misses of fully associative LRU (mapping_pol=None) for many cache sizes in one pass.
+
+    e.g. lru_miss_curve(cs.trace, 4, [16, 64, 256]) gives the same misses as replaying the trace
+         on Cache(cache_size=16/64/256, block_size=4, mapping_pol=None, replace_pol="LRU")
+
+    :param addresses: Trace, TraceReader or iterable of addresses
+    :param block_size: block size (in number of integers)
+    :param cache_sizes: cache sizes (in number of integers)
+    :return: dict cache size -> number of misses
+    """
+    cache_sizes = list(cache_sizes)
+    hist, cold = stack_distance_histogram(addresses, block_size)
+    misses = lru_miss_counts(hist, cold, [c // block_size for c in cache_sizes])
+    return dict(zip(cache_sizes, misses))
@@ -0,0 +1,157 @@
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Union
+
+
+def expand_grid(grid: Union[Dict[str, list], List[dict]]) -> List[dict]:
+    """Points of a parameter grid.
+
+    e.g. expand_grid({'n': [64], 'cache_size': [16, 64]}) gives
+         [{'n': 64, 'cache_size': 16}, {'n': 64, 'cache_size': 64}]
+
+    :param grid: dict of parameter -> list of values (cartesian product), or a list of points
+    :return: list of points (dicts)
+    """
+    if isinstance(grid, dict):
+        keys = list(grid.keys())
+        return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    return [dict(point) for point in grid]
+
+
+def _cell(value) -> str:
+    # How a value looks once it went through csv (None is written as an empty cell)
+    return '' if value is None else str(value)
+
+
+def _point_key(point: dict, keys: List[str]) -> tuple:
+    return tuple(_cell(point.get(k)) for k in keys)
+
+
+def read_results(path: str) -> List[dict]:
+    """Rows written by run_sweep (all values are strings).
+
+    :param path: csv file written by run_sweep
+    :return: list of dicts, empty if the file doesn't exist
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _read_header(path: str) -> List[str]:
+    # Column names of a csv file, None if it doesn't exist or is empty
+    if not os.path.exists(path):
+        return None
+    with open(path, newline='') as f:
+        return next(csv.reader(f), None)
+
+
+def _run_point(run_point: Callable[[dict], dict], point: dict) -> dict:
+    begin = time.time()
+    result = run_point(dict(point))
+    row = dict(point)
+    row.update(result)
+    row.setdefault('runtime', time.time() - begin)
+    return row
+
+
+def run_sweep(grid: Union[Dict[str, list], List[dict]], run_point: Callable[[dict], dict],
+              out_path: str, processes: int = None, resume: bool = True, verbose: bool = True) -> List[dict]:
+    """Run run_point on every point of a grid in a process pool, writing rows as they finish.
+
+    Each finished point is appended to out_path (csv) and flushed immediately, so an
+    interrupted sweep loses at most the points that were running. A point whose run_point
+    raises (or whose worker dies) doesn't stop the sweep: it gets a row with the exception in
+    the error column and empty results. With resume, points already in out_path without an
+    error are skipped, so failed points are run again (their old error rows stay in the file).
+
+    :param grid: dict of parameter -> list of values, or a list of points (see expand_grid)
+    :param run_point: function point -> dict of results (misses, accesses, ...). Must be
+                      defined at module level so it can be sent to worker processes.
+    :param out_path: csv file for the results (config columns then result columns)
+    :param processes: number of worker processes (None: one per core, 1: run in this process)
+    :param resume: skip points already present in out_path
+    :param verbose: print a line per finished point
+    :return: rows computed by this call, including error rows
+    """
+    points = expand_grid(grid)
+    if not points:
+        return []
+    keys = list(points[0].keys())
+
+    existing = read_results(out_path) if resume else []
+    done = {_point_key(row, keys) for row in existing if not row.get('error')}
+    todo = [p for p in points if _point_key(p, keys) not in done]
+    if verbose:
+        print(f'Sweep: {len(points)} points, {len(points) - len(todo)} already done, {len(todo)} to run')
+
+    # A file holding only a header still has its columns
+    fieldnames = _read_header(out_path) if resume else None
+    rows = []
+    with open(out_path, 'a' if resume else 'w', newline='') as f:
+        writer = None if fieldnames is None else csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        failed = []  # Error rows waiting for a successful row to give the result columns
+
+        def start(columns):
+            nonlocal writer
+            writer = csv.DictWriter(f, fieldnames=columns + ([] if 'error' in columns else ['error']),
+                                    extrasaction='ignore')
+            writer.writeheader()
+
+        def finish(point, row=None, error=None):
+            if error is not None:
+                row = dict(point)
+                row['error'] = f'{type(error).__name__}: {error}'
+                if writer is None:
+                    failed.append(row)
+            elif writer is None:
+                start(list(row.keys()))
+                writer.writerows(failed)
+            if writer is not None:
+                writer.writerow(row)
+                f.flush()
+            rows.append(row)
+            if verbose:
+                print(f'[{len(rows)}/{len(todo)}] ' + ' '.join(f'{k}={v}' for k, v in row.items()))
+
+        if processes == 1:
+            for point in todo:
+                try:
+                    row = _run_point(run_point, point)
+                except Exception as e:
+                    finish(point, error=e)
+                else:
+                    finish(point, row)
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                futures = {pool.submit(_run_point, run_point, point): point for point in todo}
+                for future in as_completed(futures):
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        finish(futures[future], error=e)
+                    else:
+                        finish(futures[future], row)
+        if writer is None and failed:
+            # Every point failed: no result columns to write
+            start(keys)
+            writer.writerows(failed)
+            f.flush()
+    return rows
+
+
+def to_parquet(csv_path: str, parquet_path: str):
+    """Convert sweep results to Parquet (needs pandas and pyarrow).
+
+    :param csv_path: csv file written by run_sweep
+    :param parquet_path: Parquet file to write
+    """
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError('to_parquet needs pandas and pyarrow (pip install pandas pyarrow)') from e
+    pd.read_csv(csv_path).to_parquet(parquet_path)
@@ -0,0 +1,116 @@
+"""
+Time series of the CPU counters, sampled every N accesses
+
+Samples are taken right after the access that reaches every multiple of every, hits and
+misses alike, so every window has exactly every accesses. The CPU schedules them with the
+checkpoints (see CPU.next_event): an access pays one comparison, with or without telemetry.
+Every sample stores the cumulative counters and the cache size and occupancy in
+a preallocated ring buffer, the oldest samples are overwritten once it is full. Rates over
+each window are computed from the differences between consecutive samples.
+"""
+import csv
+from typing import Dict, Sequence
+
+import numpy as np
+
+from simple_cache_sim.CacheHierarchy import CacheHierarchy
+
+FIELDS = ('total_access', 'cache_hits', 'cache_misses', 'evictions', 'blocks_read',
+          'blocks_written_back', 'cache_size', 'occupancy')
+
+
+class Telemetry():
+    """
+    Ring buffer of counter samples of one CPU (see CPU(telemetry=...))
+
+    e.g. cs = Simulator(..., telemetry=Telemetry(every=10000)), run, then
+         cs.cpu.telemetry.sample() for the tail of the run and cs.cpu.telemetry.to_csv(path)
+    """
+
+    def __init__(self, every: int = 10000, capacity: int = 1 << 16):
+        """
+
+        :param every: accesses between samples
+        :param capacity: samples kept (the most recent ones)
+        """
+        if every <= 0:
+            raise ValueError(f'Invalid sampling period: {every}')
+        self.every = every
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, len(FIELDS)), dtype=np.int64)
+        self.taken = 0  # Samples taken since the last reset, the buffer holds the last capacity
+        self.start = (0, 0)  # Accesses and hits at the last reset
+        self.cpu = None
+
+    def attach(self, cpu):
+        self.cpu = cpu
+        self.reset()
+
+    def reset(self):
+        """Drop the samples and restart at the current access count (e.g. after CPU.reset_stats)."""
+        self.taken = 0
+        self.start = (self.cpu.total_access, self.cpu.hits)
+        self.cpu.next_sample = (self.cpu.total_access // self.every + 1) * self.every
+
+    def sample(self):
+        """Record the counters now (called by the CPU, or by hand at the end of a run)."""
+        cpu = self.cpu
+        cache = cpu.cache
+        if isinstance(cache, CacheHierarchy):
+            cache_size = sum(level.cache_size for level in cache.levels)
+        else:
+            cache_size = cache.cache_size
+        self.buffer[self.taken % self.capacity] = (
+            cpu.total_access, cpu.hits, cpu.miss, cpu.evictions, cpu.blocks_read,
+            cpu.blocks_written_back, cache_size, cache.occupancy())
+        self.taken += 1
+        cpu.next_sample = (cpu.total_access // self.every + 1) * self.every
+
+    def __len__(self):
+        return min(self.taken, self.capacity)
+
+    def samples(self) -> Dict[str, np.ndarray]:
+        """Samples in time order.
+
+        :return: dict field -> int64 array, plus hit_rate (cumulative) and window_hit_rate (over
+                 the accesses since the previous sample), NaN where no access was made
+        """
+        n = len(self)
+        rows = np.roll(self.buffer[:n], -(self.taken % n), axis=0) if self.taken > n else self.buffer[:n]
+        data = {field: rows[:, i].copy() for i, field in enumerate(FIELDS)}
+        accesses = data['total_access']
+        hits = data['cache_hits']
+        # The first window starts at the reset, unless its samples were overwritten
+        before = (np.nan, np.nan) if self.taken > n else self.start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            data['hit_rate'] = hits / accesses
+            window = np.diff(accesses, prepend=before[0])
+            data['window_hit_rate'] = np.diff(hits, prepend=before[1]) / window
+        return data
+
+    def to_csv(self, path: str):
+        data = self.samples()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(data))
+            writer.writerows(zip(*(column.tolist() for column in data.values())))
+
+    def save(self, path: str):
+        """Save the samples as an .npz file (np.load(path) gives the samples dict back)."""
+        np.savez(path, **self.samples())
+
+    def plot(self, fields: Sequence[str] = ('window_hit_rate', 'cache_size'), ax=None):
+        """Plot fields against the access count, one axis per field (needs matplotlib).
+
+        :return: the axes
+        """
+        import matplotlib.pyplot as plt
+        data = self.samples()
+        if ax is None:
+            _, ax = plt.subplots(len(fields), 1, sharex=True, squeeze=False)
+            ax = ax[:, 0]
+        for axis, field in zip(ax, fields):
+            axis.plot(data['total_access'], data[field])
+            axis.set_ylabel(field)
+        ax[-1].set_xlabel('accesses')
+        return ax
@@ -0,0 +1,299 @@
+"""
+Chunked, compressed on-disk traces that are written and read with bounded memory
+
+A trace file is a header followed by chunks of at most chunk_size accesses and an index:
+- header: magic
+- chunk: fixed header (count, payload length, delta width, compressed flag, first address,
+  largest address), then the payload: address deltas in the narrowest of int8/16/32/64 that
+  fits, followed by the ops packed 8 per byte, optionally zlib compressed
+- index: (file offset, first access, count, largest address) of every chunk, then a footer
+  with the index offset
+
+The index lets a reader seek to the chunk holding any access, so any window of a trace can be
+replayed without reading what comes before it. A file whose index is missing (the writer was
+never closed, e.g. after a crash) is still readable: the chunks are scanned instead.
+"""
+import copy
+import os
+import struct
+import zlib
+from array import array
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from simple_cache_sim.Trace import Trace
+
+MAGIC = b'SCTRACE1'
+_CHUNK = struct.Struct('<IIBBqq')  # count, payload bytes, delta width, compressed, first address, max address
+_ENTRY = struct.Struct('<QQIq')  # offset, first access, count, max address
+_FOOTER = struct.Struct('<QQ8s')  # index offset, number of chunks, magic
+_WIDTHS = ((1, np.int8), (2, np.int16), (4, np.int32), (8, np.int64))
+
+
+def _encode(addresses: np.ndarray, ops: np.ndarray, compresslevel: int) -> bytes:
+    deltas = np.diff(addresses)
+    low = int(deltas.min()) if len(deltas) else 0
+    high = int(deltas.max()) if len(deltas) else 0
+    for width, dtype in _WIDTHS:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            break
+    payload = deltas.astype(dtype).tobytes() + np.packbits(ops).tobytes()
+    compressed = compresslevel > 0
+    if compressed:
+        payload = zlib.compress(payload, compresslevel)
+    return _CHUNK.pack(len(addresses), len(payload), width, compressed,
+                       int(addresses[0]), int(addresses.max())) + payload
+
+
+def _decode(header: tuple, payload: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    count, _, width, compressed, first, _ = header
+    if compressed:
+        payload = zlib.decompress(payload)
+    dtype = dict(_WIDTHS)[width]
+    split = (count - 1) * width
+    addresses = np.empty(count, dtype=np.int64)
+    addresses[0] = first
+    np.cumsum(np.frombuffer(payload, dtype=dtype, count=count - 1), dtype=np.int64, out=addresses[1:])
+    addresses[1:] += first
+    ops = np.unpackbits(np.frombuffer(payload, dtype=np.uint8, offset=split))[:count]
+    return addresses, ops
+
+
+class TraceWriter():
+    """
+    Appends accesses to a trace file one chunk at a time
+
+    Has the append interface of Trace, so Simulator(trace_path=...) streams into it while
+    running. Only the current chunk is held in memory. Call close (or use it as a context
+    manager) to write the index.
+
+    A writer restored from a checkpoint leaves the file alone until resume is called, so loading
+    an old checkpoint (or several branches of one) never damages the trace written since.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1 << 16, compresslevel: int = 6):
+        """
+
+        :param path: file to write (created/overwritten)
+        :param chunk_size: accesses per chunk
+        :param compresslevel: zlib level of every chunk, 0 for no compression
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.compresslevel = compresslevel
+        self.addresses = array('q')
+        self.ops = bytearray()
+        self.index = []  # (offset, first access, count, max address) of the written chunks
+        self.count = 0  # Accesses in the written chunks
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+
+    def __getstate__(self):
+        # Checkpoints (see checkpoint) remember how far the file was written. A restored writer
+        # is detached: it never touches a file until resume says where to carry on. A closed
+        # writer resumes before its index (see close)
+        if self._file is not None and not self._file.closed:
+            self._flush()
+            self._file.flush()
+            offset = self._file.tell()
+        else:
+            offset = self._offset
+        state = self.__dict__.copy()
+        state['_file'] = None
+        state['_offset'] = offset
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def resume(self, path: str = None):
+        """
+        Carry on writing after the checkpoint this writer was restored from.
+
+        :param path: new file, starting with a copy of the trace up to the checkpoint. None (or
+                     the original path) truncates the original file to the checkpoint instead,
+                     dropping everything written after it, e.g. to recover a crashed run.
+        """
+        if self._file is not None:
+            raise ValueError('Only a writer restored from a checkpoint can be resumed')
+        if os.path.getsize(self.path) < self._offset:
+            raise ValueError(f'{self.path} is shorter than at the checkpoint')
+        if path is None or os.path.abspath(path) == os.path.abspath(self.path):
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(self._offset)
+        else:
+            with open(self.path, 'rb') as src, open(path, 'wb') as dst:
+                left = self._offset
+                while left:
+                    data = src.read(min(left, 1 << 24))
+                    dst.write(data)
+                    left -= len(data)
+            self._file = open(path, 'r+b')
+            self.path = path
+        self._file.seek(self._offset)
+
+    def append(self, address: int, op: int):
+        self.addresses.append(address)
+        self.ops.append(op)
+        if len(self.ops) >= self.chunk_size:
+            self._flush()
+
+    def extend(self, addresses, ops):
+        """Append many accesses (e.g. Trace.as_numpy()), filling and writing a chunk at a time."""
+        addresses = np.asarray(addresses, dtype=np.int64)
+        ops = np.asarray(ops, dtype=np.uint8)
+        if len(addresses) != len(ops):
+            raise ValueError(f'{len(addresses)} addresses but {len(ops)} ops')
+        start = 0
+        while start < len(ops):
+            stop = start + self.chunk_size - len(self.ops)
+            self.addresses.frombytes(addresses[start:stop].tobytes())
+            self.ops.extend(ops[start:stop].tobytes())
+            if len(self.ops) >= self.chunk_size:
+                self._flush()
+            start = stop
+
+    def __len__(self):
+        return self.count + len(self.ops)
+
+    def _flush(self):
+        if not self.ops:
+            return
+        if self._file is None:
+            raise ValueError('Writer restored from a checkpoint, call resume(path) before writing')
+        addresses = np.frombuffer(self.addresses, dtype=np.int64)
+        chunk = _encode(addresses, np.frombuffer(self.ops, dtype=np.uint8), self.compresslevel)
+        self.index.append((self._file.tell(), self.count, len(self.ops), int(addresses.max())))
+        self._file.write(chunk)
+        self.count += len(self.ops)
+        self.addresses = array('q')
+        self.ops = bytearray()
+
+    def close(self):
+        """Write the last chunk and the index."""
+        if self._file is None:
+            self._flush()  # Raises if anything was appended since the restore
+            return
+        if self._file.closed:
+            return
+        self._flush()
+        index_offset = self._offset = self._file.tell()
+        for entry in self.index:
+            self._file.write(_ENTRY.pack(*entry))
+        self._file.write(_FOOTER.pack(index_offset, len(self.index), MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader():
+    """
+    Streams a trace file (or a window of it) chunk by chunk
+
+    Iterating gives (address, op) pairs like Trace, so replay and the other Trace consumers
+    can read a trace much larger than memory. Only one chunk is decoded at a time and the
+    file is opened per pass, so readers are cheap to copy and share between processes.
+    """
+
+    def __init__(self, path: str, start: int = 0, stop: int = None):
+        """
+
+        :param path: file written by TraceWriter
+        :param start: first access of the window
+        :param stop: access after the window (None: end of the trace)
+        """
+        self.path = path
+        self.index = self._read_index()
+        total = sum(entry[2] for entry in self.index)
+        self.start = max(0, start)
+        self.stop = total if stop is None else min(stop, total)
+
+    def _read_index(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'Not a trace file: {self.path}')
+            size = f.seek(0, os.SEEK_END)
+            if size >= len(MAGIC) + _FOOTER.size:
+                f.seek(size - _FOOTER.size)
+                index_offset, chunks, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+                if magic == MAGIC:
+                    f.seek(index_offset)
+                    return [_ENTRY.unpack(f.read(_ENTRY.size)) for _ in range(chunks)]
+            # No index (writer not closed): scan the complete chunks
+            index = []
+            offset = len(MAGIC)
+            first = 0
+            while offset + _CHUNK.size <= size:
+                f.seek(offset)
+                count, length, _, _, _, max_address = _CHUNK.unpack(f.read(_CHUNK.size))
+                if offset + _CHUNK.size + length > size:
+                    break
+                index.append((offset, first, count, max_address))
+                offset += _CHUNK.size + length
+                first += count
+            return index
+
+    def __len__(self):
+        return max(0, self.stop - self.start)
+
+    def window(self, start: int, stop: int = None):
+        """Reader of accesses start to stop (relative to this reader)."""
+        view = copy.copy(self)
+        view.start = self.start + max(0, start)
+        view.stop = self.stop if stop is None else min(self.start + stop, self.stop)
+        return view
+
+    def _entries(self):
+        # Chunks overlapping the window
+        return [entry for entry in self.index
+                if entry[1] < self.stop and entry[1] + entry[2] > self.start]
+
+    def max_address(self) -> int:
+        """Largest address of the chunks overlapping the window (an upper bound for the window)."""
+        return max((entry[3] for entry in self._entries()), default=-1)
+
+    def chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(addresses, ops) NumPy arrays of every chunk, cut to the window."""
+        with open(self.path, 'rb') as f:
+            for offset, first, count, _ in self._entries():
+                f.seek(offset)
+                header = _CHUNK.unpack(f.read(_CHUNK.size))
+                addresses, ops = _decode(header, f.read(header[1]))
+                lo = max(self.start - first, 0)
+                hi = min(self.stop - first, count)
+                yield addresses[lo:hi], ops[lo:hi]
+
+    def __iter__(self):
+        for addresses, ops in self.chunks():
+            yield from zip(addresses.tolist(), ops.tolist())
+
+    def iter_addresses(self) -> Iterator[int]:
+        for addresses, _ in self.chunks():
+            yield from addresses.tolist()
+
+    def as_numpy(self):
+        """The window as (addresses, ops) NumPy arrays, like Trace.as_numpy (loads it in memory)."""
+        chunks = list(self.chunks())
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+        return np.concatenate([a for a, _ in chunks]), np.concatenate([o for _, o in chunks])
+
+    def to_trace(self) -> Trace:
+        """Load the window into an in-memory Trace."""
+        trace = Trace()
+        for addresses, ops in self.chunks():
+            trace.addresses.frombytes(addresses.tobytes())
+            trace.ops.extend(ops.tobytes())
+        return trace
+
+
+def write_trace(trace: Trace, path: str, chunk_size: int = 1 << 16, compresslevel: int = 6):
+    """Save an in-memory Trace as a trace file."""
+    with TraceWriter(path, chunk_size, compresslevel) as writer:
+        writer.extend(*trace.as_numpy())
@@ -2,7 +2,34 @@ from collections import OrderedDict
 import random
 
 
+POLICIES = dict()  # Lower case name -> UpdatePolicy subclass
+
+
+def register_policy(*names: str):
+    """Class decorator registering an UpdatePolicy subclass under one or more names, so that
+    Cache(replace_pol=name) can use it. Names are case insensitive.
+    """
+    def register(cls):
+        for name in names:
+            POLICIES[name.lower()] = cls
+        return cls
+    return register
+
+
+def get_policy(name: str):
+    """UpdatePolicy subclass registered under name (any name starting with "rand" is RAND)."""
+    name = name.lower()
+    if name not in POLICIES and name.startswith("rand"):
+        name = "rand"
+    if name not in POLICIES:
+        raise ValueError(f'Invalid eviction policy: {name}')
+    return POLICIES[name]
+
+
 class UpdatePolicy:
+    # Whether the state of a set is only its keys and their metadata, so that Cache.resize can split
+    # and merge sets by moving keys (ghost lists and adaptive targets can't follow their keys)
+    mergeable = True
 
     def __init__(self, n: int):
         self.n = n
@@ -19,10 +46,31 @@ class UpdatePolicy:
     def add_in(self, new_i: int):
         raise NotImplementedError
 
-    def remove_one(self) -> int:
+    def remove_one(self, new_i: int = None) -> int:
+        """Pick and forget a victim.
+
+        :param new_i: key about to be added in its place, if known (adaptive policies use it)
+        """
         raise NotImplementedError
 
+    def remove(self, i: int):
+        """Forget a key (the block left the cache without being chosen as a victim)."""
+        raise NotImplementedError
 
+    def keys(self) -> list:
+        """Keys in eviction order (next victim first, as far as the policy knows)."""
+        raise NotImplementedError
+
+    def metadata(self, i: int):
+        """State of key i beyond its recency, for add_back when the key moves to another set."""
+        return None
+
+    def add_back(self, new_i: int, metadata):
+        """Add a key moved from another set, with its metadata. Keys are added least recent first."""
+        self.add_in(new_i)
+
+
+@register_policy("lru")
 class LRUPolicy(UpdatePolicy):
 
     def __init__(self, n: int):
@@ -39,38 +87,147 @@ class LRUPolicy(UpdatePolicy):
         assert len(self.ordering) < self.n
         self.ordering[new_i] = None
 
-    def remove_one(self):
+    def remove_one(self, new_i: int = None):
         k, _ = self.ordering.popitem(last=False)
         return k
 
+    def remove(self, i: int):
+        del self.ordering[i]
+
+    def keys(self):
+        return list(self.ordering)
+
 
+class _FreqNode:
+    __slots__ = ('freq', 'keys', 'prev', 'next')
+
+    def __init__(self, freq: int):
+        self.freq = freq
+        self.keys = OrderedDict()  # Keys with this count, least recently used first
+        self.prev = None
+        self.next = None
+
+
+@register_policy("lfu")
 class LFUPolicy(UpdatePolicy):
+    """
+    Least frequently used, ties broken by least recently used.
 
-    def __init__(self, n: int):
+    Keys are kept in frequency nodes linked in increasing order of count, so finding the
+    victim, counting an access and adding a key are all O(1). With aging_period, every count
+    is halved once every aging_period accesses so that old frequencies don't dominate.
+    """
+
+    def __init__(self, n: int, aging_period: int = None):
         super().__init__(n)
-        self.ordering = dict()
+        self.ordering = dict()  # key -> frequency node
+        self.head = None  # Node with the lowest count
+        self.aging_period = aging_period
+        self._ticks = 0
 
     def is_full(self):
         return len(self.ordering) >= self.n
-    
+
+    def _insert_after(self, node, freq):
+        # Insert a new node with count freq after node (at the head if node is None)
+        new_node = _FreqNode(freq)
+        new_node.prev = node
+        new_node.next = self.head if node is None else node.next
+        if new_node.next is not None:
+            new_node.next.prev = new_node
+        if node is None:
+            self.head = new_node
+        else:
+            node.next = new_node
+        return new_node
+
+    def _unlink(self, node):
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is not None:
+            node.next.prev = node.prev
+
+    def _tick(self):
+        if self.aging_period is not None:
+            self._ticks += 1
+            if self._ticks >= self.aging_period:
+                self._ticks = 0
+                self.age()
+
     def update_access(self, i: int):
-        self.ordering[i] += 1
+        node = self.ordering[i]
+        target = node.next
+        if target is None or target.freq != node.freq + 1:
+            target = self._insert_after(node, node.freq + 1)
+        del node.keys[i]
+        if not node.keys:
+            self._unlink(node)
+        target.keys[i] = None
+        self.ordering[i] = target
+        self._tick()
 
     def add_in(self, new_i: int):
         assert len(self.ordering) < self.n
-        self.ordering[new_i] = 0
+        node = self.head
+        if node is None or node.freq != 0:
+            node = self._insert_after(None, 0)
+        node.keys[new_i] = None
+        self.ordering[new_i] = node
+        self._tick()
 
-    def remove_one(self):
-        k_remove = 0
-        v_remove = float('inf')
-        for k, v in self.ordering.items():
-            if v < v_remove:
-                k_remove = k
-                v_remove = v
-        self.ordering.pop(k_remove)
-        return k_remove
+    def remove_one(self, new_i: int = None):
+        node = self.head
+        k, _ = node.keys.popitem(last=False)
+        if not node.keys:
+            self._unlink(node)
+        self.ordering.pop(k)
+        return k
 
+    def remove(self, i: int):
+        node = self.ordering.pop(i)
+        del node.keys[i]
+        if not node.keys:
+            self._unlink(node)
+
+    def metadata(self, i: int):
+        return self.ordering[i].freq
+
+    def add_back(self, new_i: int, metadata):
+        assert len(self.ordering) < self.n
+        node, last = self.head, None
+        while node is not None and node.freq < metadata:
+            last, node = node, node.next
+        if node is None or node.freq != metadata:
+            node = self._insert_after(last, metadata)
+        node.keys[new_i] = None
+        self.ordering[new_i] = node
 
+    def keys(self):
+        keys = []
+        node = self.head
+        while node is not None:
+            keys.extend(node.keys)
+            node = node.next
+        return keys
+
+    def age(self):
+        """Halve every count. Keys whose counts merge keep lower-count keys first."""
+        node = self.head
+        self.head = None
+        last = None
+        while node is not None:
+            freq = node.freq >> 1
+            if last is None or last.freq != freq:
+                last = self._insert_after(last, freq)
+            for k in node.keys:
+                last.keys[k] = None
+                self.ordering[k] = last
+            node = node.next
+
+
+@register_policy("fifo")
 class FIFOPolicy(UpdatePolicy):
     
     def __init__(self, n: int):
@@ -87,11 +244,18 @@ class FIFOPolicy(UpdatePolicy):
         assert len(self.ordering) < self.n
         self.ordering[new_i] = None
 
-    def remove_one(self):
+    def remove_one(self, new_i: int = None):
         k, _ = self.ordering.popitem(last=False)
         return k
 
+    def remove(self, i: int):
+        del self.ordering[i]
+
+    def keys(self):
+        return list(self.ordering)
 
+
+@register_policy("rand", "random")
 class RandomPolicy(UpdatePolicy):
     # based on https://stackoverflow.com/questions/15993447/python-data-structure-for-efficient-add-remove-and-random-choice
 
@@ -111,11 +275,334 @@ class RandomPolicy(UpdatePolicy):
         self.items.append(new_i)
         self.item_to_position[new_i] = len(self.items) - 1
 
-    def remove_one(self):
+    def remove_one(self, new_i: int = None):
         rand_i = random.choice(self.items)
-        position = self.item_to_position.pop(rand_i)
+        self.remove(rand_i)
+        return rand_i
+
+    def remove(self, i: int):
+        position = self.item_to_position.pop(i)
         last_item = self.items.pop()
         if position != len(self.items):
             self.items[position] = last_item
             self.item_to_position[last_item] = position
-        return rand_i
+
+    def keys(self):
+        return list(self.items)
+
+
+@register_policy("clock")
+class ClockPolicy(UpdatePolicy):
+    """
+    CLOCK (second chance): keys sit on a circle with a reference bit set by every hit. The hand
+    skips and clears referenced keys and evicts the first unreferenced one.
+
+    The circle is an OrderedDict starting at the hand, so a skipped key moves to the end.
+    Every skip clears a bit set by a hit, so an eviction is O(1) amortised.
+    """
+
+    def __init__(self, n: int):
+        super().__init__(n)
+        self.ordering = OrderedDict()  # key -> reference bit, from the hand
+
+    def is_full(self):
+        return len(self.ordering) >= self.n
+
+    def update_access(self, i: int):
+        self.ordering[i] = True
+
+    def add_in(self, new_i: int):
+        assert len(self.ordering) < self.n
+        self.ordering[new_i] = False  # Just behind the hand
+
+    def remove_one(self, new_i: int = None):
+        ordering = self.ordering
+        while True:
+            k, referenced = ordering.popitem(last=False)
+            if not referenced:
+                return k
+            ordering[k] = False
+
+    def remove(self, i: int):
+        del self.ordering[i]
+
+    def metadata(self, i: int):
+        return self.ordering[i]
+
+    def add_back(self, new_i: int, metadata):
+        assert len(self.ordering) < self.n
+        self.ordering[new_i] = metadata
+
+    def keys(self):
+        return ([k for k, referenced in self.ordering.items() if not referenced]
+                + [k for k, referenced in self.ordering.items() if referenced])
+
+
+@register_policy("2q")
+class TwoQPolicy(UpdatePolicy):
+    """
+    2Q (Johnson and Shasha): new keys enter a FIFO (A1in). Keys evicted from it are remembered
+    in a ghost FIFO (A1out) and go to the main LRU list (Am) if they miss again while remembered,
+    so a scan only flushes A1in.
+
+    :param kin: share of the ways for A1in
+    :param kout: number of ghosts kept in A1out, as a share of the ways
+    """
+    mergeable = False
+
+    def __init__(self, n: int, kin: float = 0.25, kout: float = 0.5):
+        super().__init__(n)
+        self.kin = kin
+        self.kout = kout
+        self.a1in = OrderedDict()
+        self.a1out = OrderedDict()  # Ghosts, not in the cache
+        self.am = OrderedDict()
+
+    def is_full(self):
+        return len(self.a1in) + len(self.am) >= self.n
+
+    def update_access(self, i: int):
+        if i in self.am:
+            self.am.move_to_end(i)
+
+    def add_in(self, new_i: int):
+        assert len(self.a1in) + len(self.am) < self.n
+        if new_i in self.a1out:
+            # Missed again while remembered
+            del self.a1out[new_i]
+            self.am[new_i] = None
+        else:
+            self.a1in[new_i] = None
+
+    def remove_one(self, new_i: int = None):
+        if self.a1in and (len(self.a1in) > max(1, int(self.kin * self.n)) or not self.am):
+            k, _ = self.a1in.popitem(last=False)
+            self.a1out[k] = None
+            if len(self.a1out) > max(1, int(self.kout * self.n)):
+                self.a1out.popitem(last=False)
+            return k
+        k, _ = self.am.popitem(last=False)
+        return k
+
+    def remove(self, i: int):
+        if i in self.a1in:
+            del self.a1in[i]
+        else:
+            del self.am[i]
+
+    def keys(self):
+        if len(self.a1in) > max(1, int(self.kin * self.n)):
+            return list(self.a1in) + list(self.am)
+        return list(self.am) + list(self.a1in)
+
+
+@register_policy("arc")
+class ARCPolicy(UpdatePolicy):
+    """
+    ARC (Megiddo and Modha): keys seen once (T1) and keys seen at least twice (T2) are LRU lists,
+    with ghost lists B1 and B2 remembering keys recently evicted from each. A miss on a ghost
+    of B1 grows the target size p of T1, a miss on a ghost of B2 shrinks it, and the victim
+    comes from T1 when T1 is above its target.
+
+    Each list is an OrderedDict, so every operation is O(1).
+    """
+    mergeable = False
+
+    def __init__(self, n: int):
+        super().__init__(n)
+        self.p = 0  # Target size of T1
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()  # Ghosts, not in the cache
+        self.b2 = OrderedDict()
+        self._adapted = None  # Key whose miss already adapted p (in remove_one)
+
+    def change_n(self, delta: int):
+        super().change_n(delta)
+        self.p = min(self.p, self.n)
+
+    def is_full(self):
+        return len(self.t1) + len(self.t2) >= self.n
+
+    def update_access(self, i: int):
+        if i in self.t1:
+            del self.t1[i]
+            self.t2[i] = None
+        else:
+            self.t2.move_to_end(i)
+
+    def _adapt(self, i: int):
+        if i in self.b1:
+            self.p = min(self.n, self.p + max(len(self.b2) // len(self.b1), 1))
+        elif i in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+
+    def add_in(self, new_i: int):
+        assert len(self.t1) + len(self.t2) < self.n
+        if self._adapted != new_i:
+            self._adapt(new_i)
+        self._adapted = None
+        if new_i in self.b1:
+            del self.b1[new_i]
+            self.t2[new_i] = None
+        elif new_i in self.b2:
+            del self.b2[new_i]
+            self.t2[new_i] = None
+        else:
+            # Keep |T1| + |B1| <= n and the ghosts within n
+            while self.b1 and len(self.t1) + len(self.b1) >= self.n:
+                self.b1.popitem(last=False)
+            while self.b2 and len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) >= 2 * self.n:
+                self.b2.popitem(last=False)
+            self.t1[new_i] = None
+
+    def remove_one(self, new_i: int = None):
+        if new_i is not None:
+            self._adapt(new_i)
+            self._adapted = new_i
+        if self.t1 and (len(self.t1) > self.p or (new_i in self.b2 and len(self.t1) == self.p) or not self.t2):
+            k, _ = self.t1.popitem(last=False)
+            self.b1[k] = None
+        else:
+            k, _ = self.t2.popitem(last=False)
+            self.b2[k] = None
+        return k
+
+    def remove(self, i: int):
+        if i in self.t1:
+            del self.t1[i]
+        else:
+            del self.t2[i]
+
+    def keys(self):
+        if len(self.t1) > self.p or not self.t2:
+            return list(self.t1) + list(self.t2)
+        return list(self.t2) + list(self.t1)
+
+
+@register_policy("lirs")
+class LIRSPolicy(UpdatePolicy):
+    """
+    LIRS (Jiang and Zhang): keys with a low inter-reference recency (LIR) keep most of the ways,
+    the remaining hir_ratio of the ways hold high inter-reference recency (HIR) keys, evicted first
+    in FIFO order (queue Q). The recency stack S orders the LIR keys and the recently seen HIR
+    keys, including non-resident ones: an HIR key referenced again while in S becomes LIR and the
+    LIR key at the bottom of S becomes HIR.
+
+    The bottom of S is always LIR (pruning is amortised O(1)) and at most ghost_ratio * n
+    non-resident keys are remembered, so every operation is O(1) amortised.
+    """
+    mergeable = False
+    _LIR = 0
+    _HIR = 1  # Resident HIR
+    _GHOST = 2  # Non-resident HIR
+
+    def __init__(self, n: int, hir_ratio: float = 0.01, ghost_ratio: float = 2):
+        super().__init__(n)
+        self.hir_ratio = hir_ratio
+        self.ghost_ratio = ghost_ratio
+        self.status = dict()  # key -> _LIR, _HIR or _GHOST
+        self.stack = OrderedDict()  # S, bottom first
+        self.queue = OrderedDict()  # Resident HIR keys, next victim first
+        self.ghosts = OrderedDict()  # Non-resident HIR keys in S, oldest first
+        self.lir_count = 0
+
+    def _lir_size(self):
+        return self.n - max(1, int(self.hir_ratio * self.n))
+
+    def change_n(self, delta: int):
+        super().change_n(delta)
+        while self.lir_count > max(self._lir_size(), 0):
+            self._demote_bottom()
+
+    def is_full(self):
+        return self.lir_count + len(self.queue) >= self.n
+
+    def _prune(self):
+        # Drop HIR keys from the bottom of S
+        stack = self.stack
+        status = self.status
+        while stack:
+            k = next(iter(stack))
+            state = status[k]
+            if state == self._LIR:
+                return
+            del stack[k]
+            if state == self._GHOST:
+                del status[k]
+                del self.ghosts[k]
+
+    def _demote_bottom(self):
+        # The LIR key at the bottom of S becomes a resident HIR key
+        self._prune()
+        k, _ = self.stack.popitem(last=False)
+        self.status[k] = self._HIR
+        self.lir_count -= 1
+        self.queue[k] = None
+        self._prune()
+
+    def _promote(self, i: int):
+        # HIR key i, referenced while in S, becomes LIR
+        self.status[i] = self._LIR
+        self.lir_count += 1
+        self.stack.move_to_end(i)
+        if self.lir_count > self._lir_size():
+            self._demote_bottom()
+
+    def update_access(self, i: int):
+        state = self.status[i]
+        if state == self._LIR:
+            bottom = next(iter(self.stack)) == i
+            self.stack.move_to_end(i)
+            if bottom:
+                self._prune()
+        elif i in self.stack:
+            del self.queue[i]
+            self._promote(i)
+        else:
+            self.stack[i] = None
+            self.queue.move_to_end(i)
+
+    def add_in(self, new_i: int):
+        assert self.lir_count + len(self.queue) < self.n
+        state = self.status.get(new_i)
+        if state == self._GHOST:
+            del self.ghosts[new_i]
+            self._promote(new_i)
+        elif self.lir_count < self._lir_size():
+            # Cold start: LIR until the LIR ways are used
+            self.status[new_i] = self._LIR
+            self.lir_count += 1
+            self.stack[new_i] = None
+        else:
+            self.status[new_i] = self._HIR
+            self.stack[new_i] = None
+            self.queue[new_i] = None
+
+    def remove_one(self, new_i: int = None):
+        if not self.queue:
+            self._demote_bottom()
+        k, _ = self.queue.popitem(last=False)
+        if k in self.stack:
+            self.status[k] = self._GHOST
+            self.ghosts[k] = None
+            if len(self.ghosts) > self.ghost_ratio * self.n:
+                ghost, _ = self.ghosts.popitem(last=False)
+                del self.stack[ghost]
+                del self.status[ghost]
+                self._prune()
+        else:
+            del self.status[k]
+        return k
+
+    def remove(self, i: int):
+        state = self.status.pop(i)
+        self.stack.pop(i, None)
+        if state == self._LIR:
+            self.lir_count -= 1
+            self._prune()
+        else:
+            del self.queue[i]
+
+    def keys(self):
+        return list(self.queue) + [k for k in self.stack if self.status[k] == self._LIR]
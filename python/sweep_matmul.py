@@ -0,0 +1,75 @@
+# Parallel, resumable sweep of the matmul algorithms over block and cache sizes
+from matmul import matmul_naive, load_matrix_to_cs, matmul_cache_aware, matmul_cache_oblivious, matmul_cache_adaptive
+import numpy as np
+import time
+import argparse
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.sweep import run_sweep
+
+
+def run_point(point):
+    n = point["n"]
+    rng = np.random.default_rng(point.get("seed", 0))
+    A = rng.integers(-20, 20, size=(n, n))
+    B = rng.integers(-20, 20, size=(n, n))
+
+    cs = Simulator(
+        memory_size=2**26,
+        cache_size=point["cache_size"],
+        block_size=point["block_size"],
+        mapping_pol=point["mapping_pol"],
+        write_pol="WT",
+        replace_pol=point["replace_pol"]
+    )
+
+    A_addr = load_matrix_to_cs(cs, A, name="A")
+    B_addr = load_matrix_to_cs(cs, B, name="B")
+    C_addr = cs.allocate(n, n, default_val=0, name="C", through_cache=False)
+
+    option = point["option"]
+    begin = time.time()
+    if option == "naive":
+        matmul_naive(cs, A_addr, B_addr, C_addr)
+    elif option == 'aware':
+        matmul_cache_aware(cs, A_addr, B_addr, C_addr, cache_sz=point["cache_size"])
+    elif option == "oblivious":
+        matmul_cache_oblivious(cs, A_addr, B_addr, C_addr)
+    elif option == "adaptive":
+        matmul_cache_adaptive(cs, A_addr, B_addr, C_addr)
+    else:
+        raise ValueError('Invalid option')
+    end = time.time()
+
+    C = cs.dump_array(C_addr)
+
+    stats = cs.get_access_summary()
+    return {
+        'misses': stats["cache_misses"],
+        'accesses': stats["total_access"],
+        'hit_rate': stats["hit_rate"],
+        'correct': bool((np.matmul(A, B) == C).all()),
+        'runtime': end - begin,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep matmul algorithms over cache configurations.')
+    parser.add_argument('-N', dest='n', type=int, default=64, help='Matrix size')
+    parser.add_argument('-o', dest='out', default='sweep_results.csv', help='Output csv (resumed if it exists)')
+    parser.add_argument('-j', dest='processes', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--fresh', action='store_true', help='Ignore existing results')
+    args = parser.parse_args()
+
+    block_size = [4, 8, 16, 32]
+    cache_size = [16, 64, 256, 1024]  # Paired with block_size (tall cache)
+    points = [dict(option=option, n=args.n, block_size=bs, cache_size=cs,
+                   mapping_pol=None, replace_pol="lru", seed=0)
+              for option in ["naive", "aware", "oblivious", "adaptive"]
+              for bs, cs in zip(block_size, cache_size)]
+
+    run_sweep(points, run_point, args.out, processes=args.processes, resume=not args.fresh)
+
+
+if __name__ == '__main__':
+    main()
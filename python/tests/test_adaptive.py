@@ -0,0 +1,128 @@
+import pytest
+
+from simple_cache_sim.ArrayCache import ArrayCache
+from simple_cache_sim.Cache import Cache
+from simple_cache_sim.Hooks import Hooks
+from simple_cache_sim.Memory import Memory
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.SimulatorAdaptive import SimulatorAdaptive
+from simple_cache_sim.memory_profiles import SquareProfile
+
+
+def run(resize_keep, cache_engine="dict", hooks=None, replace_pol="LRU"):
+    profile = SquareProfile([256, 64, 256, 32], block_size=8, scale=8, repeat=True)
+    cs = SimulatorAdaptive(memory_size=2**14, cache_size=256, block_size=8, mapping_pol=4, write_pol="WB",
+                           resize_keep=resize_keep, profile=profile, cache_engine=cache_engine, hooks=hooks,
+                           replace_pol=replace_pol)
+    A = cs.allocate(32, 32, default_val=0, name="A", through_cache=False)
+    for _ in range(2):
+        for i in range(32):
+            for j in range(32):
+                cs.write(A, j, i, value=cs.read(A, i, j) + 1)
+    return cs
+
+
+@pytest.mark.parametrize('resize_keep,cache_engine', [('random', 'dict'), ('lru', 'dict'), ('ways', 'dict'),
+                                                      ('lru', 'array'), ('ways', 'array')])
+def test_blocks_dropped_by_a_shrink_are_evictions(resize_keep, cache_engine):
+    hooks = Hooks()
+    evicted, written_back, dropped = [], [], []
+    hooks.on('evict', lambda address, cache_set, tag, dirty: evicted.append((address, dirty)))
+    hooks.on('writeback', lambda address, cache_set, tag: written_back.append(address))
+    hooks.on('resize', lambda old, new, blocks: dropped.extend(blocks))
+    cs = run(resize_keep, cache_engine, hooks)
+    summary = cs.get_access_summary()
+    assert dropped and set(dropped) <= set(evicted)
+    assert summary['evictions'] == len(evicted)
+    assert summary['blocks_written_back'] == len(written_back) == sum(dirty for _, dirty in evicted)
+    assert cs.get_allocation_summary()["A"]['evictions'] == summary['evictions']
+    # Every block read is either still cached or was evicted
+    assert summary['blocks_read'] == summary['evictions'] + cs.cache.occupancy()
+
+
+@pytest.mark.parametrize('engine', [Cache, ArrayCache])
+def test_lru_shrink_keeps_the_most_recent_blocks_across_sets(engine):
+    memory = Memory(memory_size=1024, block_size=4)
+    memory.allocate(256)
+    cache = engine(cache_size=16, block_size=4, memory_size=1024, mapping_pol=2)
+    for number in [1, 3, 0, 2]:  # Blocks 1 and 3 in set 1, 0 and 2 in set 0
+        cache.load_from_memory(number * 4, memory.read_block_from_memory(number * 4))
+    dropped = cache.resize(8, "lru")
+    assert sorted(address // 4 for address, _, _ in dropped) == [1, 3]
+    assert [cache.contains(number * 4) for number in range(4)] == [True, False, True, False]
+
+
+@pytest.mark.parametrize('replace_pol', ['LRU', 'LFU'])
+@pytest.mark.parametrize('resize_keep', ['lru', 'ways'])
+def test_engines_agree_through_resizes(replace_pol, resize_keep):
+    dict_run = run(resize_keep, "dict", replace_pol=replace_pol)
+    array_run = run(resize_keep, "array", replace_pol=replace_pol)
+    assert dict_run.get_access_summary() == array_run.get_access_summary()
+    assert dict_run.cpu.size_history == array_run.cpu.size_history
+
+
+def test_lfu_counts_survive_a_change_of_the_number_of_sets():
+    memory = Memory(memory_size=1024, block_size=4)
+    memory.allocate(256)
+    cache = Cache(cache_size=32, block_size=4, memory_size=1024, mapping_pol=2, replace_pol="LFU")
+    for number, hits in [(0, 3), (1, 0), (2, 1), (3, 2)]:
+        cache.load_from_memory(number * 4, memory.read_block_from_memory(number * 4))
+        for _ in range(hits):
+            cache.read_from_cache(number * 4)
+
+    def counts():
+        return {cache.get_physical_address(tag, cache_set) // 4: policy.metadata(tag)
+                for cache_set, policy in enumerate(cache.eviction_handler) for tag in policy.keys()}
+    for size in [16, 32]:  # Merge 4 sets into 2 (nothing dropped), then split them again
+        cache.resize(size, "lru")
+        assert counts() == {0: 3, 1: 0, 2: 1, 3: 2}
+
+
+@pytest.mark.parametrize('replace_pol', ['2Q', 'ARC', 'LIRS'])
+def test_stateful_policies_only_resize_their_ways(replace_pol):
+    for resize_keep in ['random', 'lru']:
+        with pytest.raises(ValueError):
+            run(resize_keep, replace_pol=replace_pol)
+    assert run('ways', replace_pol=replace_pol).cpu.size_history
+
+
+def fill(cache_engine):
+    # Read blocks 0..31 in order into a full 8 set, 4 way cache, writing the even ones
+    cs = Simulator(memory_size=2**12, cache_size=256, block_size=8, mapping_pol=4, write_pol="WB",
+                   cache_engine=cache_engine)
+    A = cs.allocate(32, 8)
+    for i in range(32):
+        if i % 2:
+            cs.read(A, i, 0)
+        else:
+            cs.write(A, i, 0, value=i)
+    return cs, A
+
+
+@pytest.mark.parametrize('cache_engine', ['dict', 'array'])
+@pytest.mark.parametrize('survivors', ['random', 'lru', 'ways'])
+def test_shrink_drops_blocks_and_keeps_the_others(cache_engine, survivors):
+    cs, _ = fill(cache_engine)
+    dropped = cs.cache.resize(128, survivors)
+    assert cs.cache.cache_size == 128
+    assert all(dirty == (address // 8 % 2 == 0) for address, _, dirty in dropped)
+    gone = {address for address, _, _ in dropped}
+    kept = [address for address in range(0, 256, 8) if address not in gone]
+    assert len(gone) == len(dropped) >= 16
+    assert all(cs.cache.read_from_cache(address) is None for address in gone)
+    assert all(cs.cache.read_from_cache(address)[0] == cs.memory.memory_data[address] for address in kept)
+    if survivors != 'random':
+        assert kept == list(range(128, 256, 8))
+
+
+@pytest.mark.parametrize('cache_engine', ['dict', 'array'])
+@pytest.mark.parametrize('survivors', ['random', 'lru', 'ways'])
+def test_grow_keeps_every_block(cache_engine, survivors):
+    cs, A = fill(cache_engine)
+    dropped = cs.cache.resize(128, survivors)
+    assert cs.cache.resize(256, survivors) == []
+    assert cs.cache.cache_size == 256
+    for i in range(32):
+        cs.read(A, i, 0)
+    # Only the blocks dropped by the shrink are read again
+    assert cs.get_access_summary()['cache_misses'] == 32 + len(dropped)
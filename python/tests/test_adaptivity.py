@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from simple_cache_sim.SimulatorAdaptive import SimulatorAdaptive
+from simple_cache_sim.adaptivity import compare, efficiency_report, progress_bound, square_decomposition
+from simple_cache_sim.memory_profiles import SquareProfile
+
+
+def profile_at(size_history, block_size, t):
+    # Profile in blocks during I/O t
+    size = None
+    for misses, _, words in size_history:
+        if misses <= t:
+            size = max(1, words // block_size)
+    return size
+
+
+def test_constant_and_step_profiles():
+    assert square_decomposition([(0, 0, 16)], 10, 4) == [(0, 4), (4, 4), (8, 2)]
+    # 8 blocks for 3 I/Os then 2 blocks: the first square can only span the 3 I/Os
+    assert square_decomposition([(0, 0, 32), (3, 0, 8)], 7, 4) == [(0, 3), (3, 2), (5, 2)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_squares_are_the_largest_that_fit(seed):
+    rng = random.Random(seed)
+    history = [(0, 0, 4 * rng.choice([1, 2, 4, 8, 16]))]
+    for _ in range(30):
+        history.append((history[-1][0] + rng.randrange(1, 20), 0, 4 * rng.choice([1, 2, 4, 8, 16])))
+    total = history[-1][0] + 10
+    squares = square_decomposition(history, total, 4)
+    assert squares[0][0] == 0
+    for (t0, side), (t1, _) in zip(squares, squares[1:] + [(total, 0)]):
+        assert t0 + side == t1
+        assert all(profile_at(history, 4, t) >= side for t in range(t0, t0 + side))
+        if t1 < total:
+            bigger = side + 1
+            assert any(profile_at(history, 4, t) < bigger for t in range(t0, t0 + bigger))
+
+
+def test_efficiency_report_accounts_for_every_access():
+    cs = SimulatorAdaptive(memory_size=2**14, cache_size=256, block_size=8, mapping_pol=4, record_misses=True,
+                           profile=SquareProfile([256, 64, 128], block_size=8, scale=16, repeat=True))
+    A = cs.allocate(2048, default_val=0, through_cache=False)
+    for i in range(6000):
+        cs.read(A, (i * 13) % 2048)
+    report = efficiency_report(cs.cpu, accesses_per_unit=2)
+    assert sum(side for _, side, _, _ in report['squares']) == cs.cpu.miss
+    assert report['progress'] == pytest.approx(cs.cpu.total_access / 2)
+    assert report['bound'] == pytest.approx(sum(progress_bound(side, 8) for _, side, _, _ in report['squares']))
+    assert report['efficiency'] == pytest.approx(report['progress'] / report['bound'])
+    summary = compare({'strided': cs.cpu}, accesses_per_unit=2)['strided']
+    assert summary['squares'] == len(report['squares'])
+    assert summary['efficiency'] == report['efficiency']
+
+
+def test_only_accesses_of_the_work_allocations_are_progress():
+    def run(**kwargs):
+        cs = SimulatorAdaptive(memory_size=2**14, cache_size=256, block_size=8, mapping_pol=4, record_misses=True,
+                               profile=SquareProfile([256, 64, 128], block_size=8, scale=16, repeat=True), **kwargs)
+        A = cs.allocate(1024, default_val=0, name="A", through_cache=False)
+        T = cs.allocate(1024, default_val=0, name="T", through_cache=False)
+        for i in range(3000):
+            cs.read(A, (i * 13) % 1024)
+            if i % 3 == 0:
+                cs.write(T, (i * 7) % 1024, value=i)  # Overhead
+        return cs.cpu
+
+    cpu = run(work=("A",))
+    report = efficiency_report(cpu)
+    assert report['progress'] == 3000
+    assert sum(progress for _, _, progress, _ in report['squares']) == 3000
+    assert cpu.miss_accesses.tolist() == run().miss_accesses.tolist()
+    assert efficiency_report(run())['progress'] == 4000
+
+
+def test_misses_are_only_recorded_on_request():
+    cs = SimulatorAdaptive(memory_size=2**14, cache_size=256, block_size=8, mapping_pol=4,
+                           profile=SquareProfile([256, 64], block_size=8, scale=16))
+    A = cs.allocate(2048, default_val=0, through_cache=False)
+    for i in range(0, 2048, 8):
+        cs.read(A, i)
+    assert cs.cpu.miss_accesses is None
+    with pytest.raises(ValueError):
+        efficiency_report(cs.cpu)
@@ -0,0 +1,90 @@
+import pickle
+
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+
+
+def run(count_accesses, **kwargs):
+    cs = Simulator(memory_size=2**14, cache_size=128, block_size=8, mapping_pol=2, write_pol="WB",
+                   count_accesses=count_accesses, **kwargs)
+    A = cs.allocate(16, 16, default_val=1, name="A", through_cache=False)
+    B = cs.allocate(16, 16, default_val=2, name="B", through_cache=False)
+    C = cs.allocate(16, 16, default_val=0, name="C", through_cache=False)
+    for i in range(16):
+        for j in range(16):
+            cs.increment(C, i, j, value=cs.read(A, i, j) * cs.read(B, j, i))
+    C[0, :4] = B[1, :4]
+    return cs
+
+
+@pytest.mark.parametrize('engine', ['dict', 'array'])
+def test_counting_accesses_does_not_change_misses_or_evictions(engine):
+    counted = run(True, cache_engine=engine).get_allocation_summary()
+    uncounted = run(False, cache_engine=engine).get_allocation_summary()
+    for name in "ABC":
+        assert counted[name]['cache_misses'] == uncounted[name]['cache_misses']
+        assert counted[name]['evictions'] == uncounted[name]['evictions']
+        assert uncounted[name]['total_access'] is None
+        assert uncounted[name]['cache_hits'] is None
+
+
+def test_counted_accesses_add_up_to_the_cpu_totals():
+    cs = run(True)
+    allocations = cs.get_allocation_summary()
+    total = cs.get_access_summary()
+    assert allocations["A"]['total_access'] == 256
+    assert allocations["B"]['total_access'] == 256 + 4
+    assert allocations["C"]['total_access'] == 2 * 256 + 4
+    assert sum(s['total_access'] for s in allocations.values()) == total['total_access']
+    assert sum(s['cache_misses'] for s in allocations.values()) == total['cache_misses']
+    assert sum(s['cache_hits'] for s in allocations.values()) == total['cache_hits']
+
+
+def test_counting_survives_pickling():
+    cs = pickle.loads(pickle.dumps(run(True)))
+    before = cs.get_allocation_summary()["A"]['total_access']
+    A = cs._handles[0]
+    cs.read(A, 0, 0)
+    assert cs.get_allocation_summary()["A"]['total_access'] == before + 1
+
+
+def test_out_of_range_accesses_are_not_counted():
+    cs = run(True)
+    before = cs.get_allocation_summary()
+    A = cs._handles[0]
+    with pytest.raises(IndexError):
+        cs.read(A, 16, 0)
+    with pytest.raises(IndexError):
+        cs.write(A, 0, 16, value=1)
+    with pytest.raises(IndexError):
+        cs.increment(A, 0, value=1)
+    assert cs.get_allocation_summary() == before
+
+
+def product(engine="dict"):
+    # C[i][j] += A[i][j] * B[j][i], every allocation initialised through the cache
+    cs = Simulator(memory_size=2**14, cache_size=128, block_size=8, mapping_pol=2, write_pol="WB",
+                   cache_engine=engine)
+    with cs.phase("init"):
+        A = cs.allocate(16, 16, default_val=1, name="A")
+        B = cs.allocate(16, 16, default_val=2, name="B")
+        C = cs.allocate(16, 16, default_val=0, name="C")
+    for half in range(2):
+        with cs.phase("compute"):
+            for i in range(8 * half, 8 * half + 8):
+                for j in range(16):
+                    cs.increment(C, i, j, value=cs.read(A, i, j) * cs.read(B, j, i))
+    return cs
+
+
+def test_phases_accumulate_and_cover_the_run():
+    cs = product()
+    phases = cs.get_phase_summary()
+    total = cs.get_access_summary()
+    assert phases["init"]['total_access'] == 3 * 256
+    assert phases["compute"]['total_access'] == 4 * 256
+    for key in ['total_access', 'cache_hits', 'cache_misses']:
+        assert phases["init"][key] + phases["compute"][key] == total[key]
+    cs.reset_stats()
+    assert cs.get_phase_summary() == {}
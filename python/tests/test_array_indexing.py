@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import ArrayHandle, Simulator
+
+
+def simulator():
+    return Simulator(memory_size=2**14, cache_size=64, block_size=4, mapping_pol=2, record_trace=True)
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).integers(-9, 9, size=(16, 12))
+
+
+def test_scalar_indexing_is_read_and_write(values):
+    a, b = simulator(), simulator()
+    A, B = a.load_array(values), b.load_array(values)
+    for i, j in [(0, 0), (3, 5), (15, 11), (7, 2)]:
+        assert A[i, j] == b.read(B, i, j) == values[i, j]
+        A[i, j] = 5
+        b.write(B, i, j, value=5)
+    assert A[-1, -2] == b.read(B, 15, 10)
+    assert list(a.trace) == list(b.trace)
+    assert a.get_access_summary() == b.get_access_summary()
+
+
+def test_slices_access_in_row_major_order(values):
+    cs = simulator()
+    A = cs.load_array(values)
+    assert np.array_equal(A[2:5, ::3], values[2:5, ::3])
+    expected = [A.address(i, j) for i in range(2, 5) for j in range(0, 12, 3)]
+    assert cs.trace.as_numpy()[0].tolist() == expected
+    assert np.array_equal(A[3], values[3])
+    assert np.array_equal(A[:, 4], values[:, 4])
+    assert np.array_equal(A[-1, 1:-1], values[-1, 1:-1])
+
+
+def test_slice_assignment(values):
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, mapping_pol=2, count_accesses=True)
+    A = cs.load_array(values)
+    C = cs.allocate(16, 12, default_val=0, name="C", through_cache=False)
+    C[4:8, 2:6] = 7
+    C[4:8, 2:6] += A[4:8, 2:6]
+    C[0] = np.arange(12)
+    C[1, :] = A[1]
+    expected = np.zeros((16, 12), dtype=np.int64)
+    expected[4:8, 2:6] = 7 + values[4:8, 2:6]
+    expected[0] = np.arange(12)
+    expected[1] = values[1]
+    assert np.array_equal(cs.dump_array(C), expected)
+    assert cs.get_allocation_summary()["C"]["total_access"] == 16 + 2 * 16 + 12 + 12
+
+
+def test_blocked_matmul_with_slices():
+    rng = np.random.default_rng(1)
+    X, Y = rng.integers(-5, 5, (16, 16)), rng.integers(-5, 5, (16, 16))
+    cs = Simulator(memory_size=2**14, cache_size=256, block_size=8)
+    A, B = cs.load_array(X), cs.load_array(Y)
+    C = cs.allocate(16, 16, default_val=0, through_cache=False)
+    for i in range(0, 16, 4):
+        for j in range(0, 16, 4):
+            for k in range(0, 16, 4):
+                C[i:i + 4, j:j + 4] += A[i:i + 4, k:k + 4] @ B[k:k + 4, j:j + 4]
+    assert np.array_equal(cs.dump_array(C), X @ Y)
+
+
+def test_iteration_over_first_axis(values):
+    cs = simulator()
+    A = cs.load_array(values)
+    rows = list(A)
+    assert len(rows) == 16
+    assert all(np.array_equal(row, expected) for row, expected in zip(rows, values))
+    v = cs.allocate(5, default_val=2, through_cache=False)
+    assert [int(x) for x in v] == [2] * 5
+    with pytest.raises(TypeError):
+        iter(cs.allocate())
+
+
+@pytest.mark.parametrize('key', [(16, 0), (0, 12), (-17, 0), (16, slice(None)), (slice(None), -13),
+                                 (1, 2, 3), (slice(None), slice(None), 0)])
+def test_bad_indices_raise_index_error(values, key):
+    cs = simulator()
+    A = cs.load_array(values)
+    with pytest.raises(IndexError):
+        A[key]
+    with pytest.raises(IndexError):
+        A[key] = 0
+
+
+def test_bad_index_types_raise_type_error(values):
+    cs = simulator()
+    A = cs.load_array(values)
+    with pytest.raises(TypeError):
+        A[1.5, 0]
+    with pytest.raises(TypeError):
+        A[[1, 2], 0]
+    with pytest.raises(TypeError):
+        ArrayHandle(0, (4,))[0]
+
+
+def test_scalar_api_raises_index_error(values):
+    cs = simulator()
+    A = cs.load_array(values)
+    with pytest.raises(IndexError):
+        cs.read(A, 16, 0)
+    with pytest.raises(IndexError):
+        cs.write(A, 0, value=1)
+    with pytest.raises(IndexError):
+        cs.read_tile(A, 14, 0, 4, 4)
+
+
+def test_handle_is_still_an_int(values):
+    cs = simulator()
+    A = cs.load_array(values)
+    C = cs.allocate(4, 4)
+    assert int(C) == A.size and C + 1 == A.size + 1
+    assert {int(A): 1}[A] == 1
+    assert np.array([A, C]).dtype == np.int64
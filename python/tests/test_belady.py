@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.belady import next_use
+from simple_cache_sim.replay import replay
+from simple_cache_sim.update_policies import POLICIES
+
+
+def make_trace(addresses, writes=None):
+    trace = Trace()
+    for i, address in enumerate(addresses):
+        trace.append(int(address), Trace.WRITE if writes is not None and writes[i] else Trace.READ)
+    return trace
+
+
+def test_next_use():
+    assert next_use(np.array([1, 2, 1, 3, 2, 1])).tolist() == [2, 4, 5, 6, 6, 6]
+
+
+def test_opt_on_the_textbook_reference_string():
+    pages = [7, 0, 1, 2, 0, 3, 0, 4, 2, 3, 0, 3, 2, 1, 2, 0, 1, 7, 0, 1]
+    summary = replay(make_trace(pages), cache_size=3, block_size=1, replace_pol="OPT")
+    assert summary['cache_misses'] == 9
+    assert replay(make_trace(pages), cache_size=3, block_size=1, replace_pol="LRU")['cache_misses'] == 12
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+@pytest.mark.parametrize('ways', [1, 2, 4, None])
+def test_opt_never_misses_more_than_other_policies(seed, ways):
+    rng = np.random.default_rng(seed)
+    n = 5000
+    # A drifting working set with some random accesses
+    addresses = np.where(rng.random(n) < 0.8, (np.arange(n) // 50 + rng.integers(0, 200, n)) % 2048,
+                         rng.integers(0, 2048, n))
+    trace = make_trace(addresses, rng.random(n) < 0.25)
+    kwargs = dict(cache_size=256, block_size=8, mapping_pol=ways, write_pol="WB")
+    opt = replay(trace, replace_pol="OPT", **kwargs)
+    for policy in sorted(set(POLICIES)):
+        summary = replay(trace, replace_pol=policy, **kwargs)
+        assert opt['cache_misses'] <= summary['cache_misses'], policy
+        assert opt['total_access'] == summary['total_access']
+    if ways == 1:
+        # Direct-mapped caches have no choice of victim
+        assert opt == replay(trace, replace_pol="LRU", **kwargs)
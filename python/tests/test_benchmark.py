@@ -0,0 +1,17 @@
+import benchmark
+
+
+def test_peak_memory_excludes_the_setup():
+    benchmark.register_cases()
+    # The simulator of every case holds a 2**20 word (8 MiB) memory buffer
+    result = benchmark.measure(benchmark.CASES['stream/seq/lru-8way'], scale=0.05, repeat=1, memory=True)
+    assert result['work'] == 5000
+    assert 0 < result['peak'] < 2**20
+    assert result['rate'] == result['work'] / result['seconds']
+
+
+def test_compare_flags_slower_and_larger_cases():
+    baseline = {'cases': {'a': {'rate': 100.0, 'peak': 1000}, 'b': {'rate': 100.0, 'peak': 1000}}}
+    results = {'a': {'rate': 95.0, 'peak': 1050}, 'b': {'rate': 80.0, 'peak': 1200}, 'c': {'rate': 1.0}}
+    assert benchmark.compare(results, baseline, threshold=0.1) == [('b', 'rate', 100.0, 80.0),
+                                                                    ('b', 'peak', 1000, 1200)]
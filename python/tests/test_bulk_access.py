@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+
+
+def pair():
+    # Same matrices in two simulators, one driven with bulk calls and one with scalar calls
+    rng = np.random.default_rng(0)
+    X, Y = rng.integers(-9, 9, (12, 10)), rng.integers(-9, 9, (10, 8))
+    sims = []
+    for _ in range(2):
+        cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, mapping_pol=2, record_trace=True,
+                       count_accesses=True)
+        A, B = cs.load_array(X, name="A"), cs.load_array(Y, name="B")
+        C = cs.allocate(12, 8, default_val=1, name="C", through_cache=False)
+        sims.append((cs, A, B, C))
+    return sims
+
+
+def same(bulk, scalar):
+    assert list(bulk.trace) == list(scalar.trace)
+    assert bulk.get_access_summary() == scalar.get_access_summary()
+    assert bulk.get_allocation_summary() == scalar.get_allocation_summary()
+
+
+def test_read_row_and_tile():
+    (bulk, A, _, _), (scalar, A2, _, _) = pair()
+    row = bulk.read_row(A, 3)
+    tile = bulk.read_tile(A, 2, 4, 3, 5)
+    assert list(row) == [scalar.read(A2, 3, j) for j in range(10)]
+    assert tile.tolist() == [[scalar.read(A2, i, j) for j in range(4, 9)] for i in range(2, 5)]
+    same(bulk, scalar)
+
+
+def test_write_and_increment_tile():
+    (bulk, _, _, C), (scalar, _, _, C2) = pair()
+    values = np.arange(6).reshape(2, 3)
+    bulk.write_tile(C, 1, 2, values)
+    bulk.increment_tile(C, 2, 3, values)
+    for i in range(2):
+        for j in range(3):
+            scalar.write(C2, 1 + i, 2 + j, value=int(values[i, j]))
+    for i in range(2):
+        for j in range(3):
+            scalar.increment(C2, 2 + i, 3 + j, value=int(values[i, j]))
+    assert np.array_equal(bulk.dump_array(C), scalar.dump_array(C2))
+    same(bulk, scalar)
+
+
+@pytest.mark.parametrize('accumulate', [False, True])
+def test_matmul_tile_charges_the_scalar_loop(accumulate):
+    (bulk, A, B, C), (scalar, A2, B2, C2) = pair()
+    bulk.matmul_tile(A, 2, 1, B, 3, 2, C, 4, 1, rows=5, inner=6, cols=4, accumulate=accumulate)
+    for i in range(5):
+        for j in range(4):
+            c = sum(scalar.read(A2, 2 + i, 1 + k) * scalar.read(B2, 3 + k, 2 + j) for k in range(6))
+            if accumulate:
+                c += scalar.read(C2, 4 + i, 1 + j)
+            scalar.write(C2, 4 + i, 1 + j, value=c)
+    assert np.array_equal(bulk.dump_array(C), scalar.dump_array(C2))
+    same(bulk, scalar)
+
+
+def test_tiles_out_of_bounds_raise_without_charging_accesses():
+    (cs, A, B, C), _ = pair()
+    before = cs.get_allocation_summary()
+    with pytest.raises(IndexError):
+        cs.read_tile(A, 10, 0, 3, 3)
+    with pytest.raises(IndexError):
+        cs.read_tile(A, 0, 8, 1, 3)
+    with pytest.raises(IndexError):
+        cs.increment_tile(C, 11, 0, np.ones((2, 2)))
+    with pytest.raises(IndexError):
+        # A and B fit, C doesn't
+        cs.matmul_tile(A, 0, 0, B, 0, 0, C, 10, 0, rows=4, inner=2, cols=2)
+    with pytest.raises(ValueError):
+        cs.write_slice(C, (slice(0, 2), slice(0, 3)), np.ones(4))
+    assert cs.get_allocation_summary() == before
+    assert cs.cpu.total_access == 0
+
+
+def test_bulk_reads_return_int64():
+    (cs, A, _, _), _ = pair()
+    assert cs.read_tile(A, 0, 0, 2, 2).dtype == np.int64
+    assert cs.read_row(A, 0).dtype == np.int64
+    assert cs.read_slice(A, (slice(0, 2), slice(0, 2))).dtype == np.int64
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.ArrayCache import ArrayCache
+from simple_cache_sim.Cache import Cache
+from simple_cache_sim.Memory import Memory
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.replay import replay
+
+
+def random_trace(n=20000, span=4096, seed=0):
+    rng = np.random.default_rng(seed)
+    trace = Trace()
+    # A hot region and random accesses, about one write in four
+    addresses = np.where(rng.random(n) < 0.6, rng.integers(0, 256, n), rng.integers(0, span, n))
+    for address, op in zip(addresses.tolist(), (rng.random(n) < 0.25).tolist()):
+        trace.append(address, int(op))
+    return trace
+
+
+@pytest.mark.parametrize('policy', ['LRU', 'LFU', 'FIFO'])
+@pytest.mark.parametrize('ways', [1, 2, 4, 8, None])
+@pytest.mark.parametrize('write_pol', ['WT', 'WB'])
+def test_array_engine_matches_dict_engine(policy, ways, write_pol):
+    trace = random_trace()
+    kwargs = dict(cache_size=256, block_size=8, mapping_pol=ways, replace_pol=policy, write_pol=write_pol)
+    assert replay(trace, cache_engine="array", **kwargs) == replay(trace, cache_engine="dict", **kwargs)
+
+
+@pytest.mark.parametrize('ways', [2, 8, None])
+def test_array_engine_matches_dict_engine_with_lfu_aging(ways):
+    trace = random_trace()
+    kwargs = dict(cache_size=256, block_size=8, mapping_pol=ways, replace_pol="LFU")
+    aged = replay(trace, cache_engine="array", policy_args={'aging_period': 50}, **kwargs)
+    assert aged == replay(trace, cache_engine="dict", policy_args={'aging_period': 50}, **kwargs)
+    if ways is None:
+        assert aged != replay(trace, cache_engine="array", **kwargs)
+
+
+def test_array_engine_in_a_hierarchy_matches_dict_engine():
+    from simple_cache_sim.Simulator import Simulator
+    summaries = []
+    for engine in ["dict", "array"]:
+        cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, write_pol="WB", cache_engine=engine,
+                       levels=[dict(mapping_pol=2), dict(cache_size=512, block_size=8, mapping_pol=4)])
+        A = cs.allocate(32, 32, default_val=0, through_cache=False)
+        for i in range(32):
+            for j in range(32):
+                cs.write(A, j, i, value=cs.read(A, i, j) + 1)
+        cs.flush()
+        summaries.append((cs.get_level_summary(), cs.get_access_summary()))
+    assert summaries[0] == summaries[1]
+
+
+def test_array_engine_bookkeeping():
+    memory = Memory(memory_size=1024, block_size=4)
+    memory.allocate(256)
+    cache = ArrayCache(cache_size=32, block_size=4, memory_size=1024, mapping_pol=2, write_pol="WB")
+    reference = Cache(cache_size=32, block_size=4, memory_size=1024, mapping_pol=2, write_pol="WB")
+    for address in [0, 4, 32, 68, 100]:
+        for c in (cache, reference):
+            if not c.contains(address):
+                c.load_from_memory(address, memory.read_block_from_memory(address))
+            c.overwrite_cache(address, 1) if address % 8 == 0 else c.read_from_cache(address)
+    assert cache.occupancy() == reference.occupancy()
+    assert sorted(cache.dirty_blocks()) == sorted(reference.dirty_blocks())
+    assert [set(line) for line in cache.blocks] == [set(line) for line in reference.blocks]
+    assert cache.remove(32)[1] == reference.remove(32)[1]
+    assert not cache.contains(32)
+    assert cache.occupancy() == reference.occupancy()
+    assert cache.flush() == reference.flush()
+    assert cache.dirty_blocks() == []
+
+
+def test_array_engine_fifo_order_survives_remove():
+    memory = Memory(memory_size=1024, block_size=4)
+    memory.allocate(256)
+    caches = [ArrayCache(cache_size=16, block_size=4, memory_size=1024, replace_pol="FIFO"),
+              Cache(cache_size=16, block_size=4, memory_size=1024, replace_pol="FIFO")]
+    victims = []
+    for cache in caches:
+        for address in [0, 4, 8, 12]:
+            cache.load_from_memory(address, memory.read_block_from_memory(address))
+        cache.remove(4)
+        evicted = [cache.load_from_memory(address, memory.read_block_from_memory(address))
+                   for address in [16, 20, 24, 28]]
+        victims.append([victim[0] if victim else None for victim in evicted])
+    assert victims[0] == victims[1] == [None, 0, 8, 12]
+
+
+def test_array_engine_rejects_unsupported_options():
+    with pytest.raises(ValueError):
+        ArrayCache(cache_size=256, block_size=8, memory_size=2**14, replace_pol="ARC")
+    with pytest.raises(ValueError):
+        ArrayCache(cache_size=256, block_size=8, memory_size=2**14, replace_pol="LRU",
+                   policy_args={'aging_period': 10})
+
+
+def test_array_engine_shares_the_cache_configuration():
+    kwargs = dict(cache_size=256, block_size=8, memory_size=2**14, mapping_pol=4, replace_pol="LFU",
+                  write_pol="WB", policy_args={'aging_period': 10})
+    cache, reference = ArrayCache(**kwargs), Cache(**kwargs)
+    for name in ['cache_blocks', 'num_sets', 'map_pol', 'rep_pol', 'wri_pol', 'cache_size', 'memory_size',
+                 'block_size', 'policy_args', '_policy_class', '_tag_shift', '_set_shift']:
+        assert getattr(cache, name) == getattr(reference, name)
+    assert cache.blocks == reference.blocks
+    assert cache.min_cache_size("ways") == reference.min_cache_size("ways")
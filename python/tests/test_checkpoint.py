@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.SimulatorAdaptive import SimulatorAdaptive
+from simple_cache_sim.memory_profiles import RandomWalkProfile
+from simple_cache_sim.prefetchers import StridePrefetcher
+
+N = 24
+
+
+def plain():
+    return Simulator(memory_size=2**14, cache_size=128, block_size=8, mapping_pol=4, replace_pol="RAND",
+                     write_pol="WB", record_trace=True, prefetcher=StridePrefetcher())
+
+
+def adaptive():
+    return SimulatorAdaptive(memory_size=2**14, cache_size=256, block_size=8, mapping_pol=4, replace_pol="ARC",
+                             write_pol="WB", record_trace=True, resize_keep="ways",
+                             profile=RandomWalkProfile(256, 64, 256, step=300, seed=1))
+
+
+def hierarchy():
+    return Simulator(memory_size=2**14, cache_size=32, block_size=4, write_pol="WB", record_trace=True,
+                     levels=[dict(mapping_pol=2), dict(cache_size=256, block_size=8, replace_pol="LIRS")],
+                     inclusion="inclusive")
+
+
+def start(make):
+    random.seed(0)
+    np.random.seed(0)
+    cs = make()
+    rng = np.random.default_rng(0)
+    A = cs.load_array(rng.integers(-9, 9, (N, N)), name="A")
+    B = cs.load_array(rng.integers(-9, 9, (N, N)), name="B")
+    C = cs.allocate(N, N, default_val=0, name="C", through_cache=False)
+    return cs, (A, B, C)
+
+
+def run(cs, handles, rows):
+    A, B, C = (int(h) for h in handles)  # Looked up in cs, so handles of the original work after a load
+    for i in rows:
+        for k in range(N):
+            a = cs.read(A, i, k)
+            for j in range(N):
+                cs.increment(C, i, j, value=a * cs.read(B, k, j))
+
+
+def state(cs, handles):
+    return (cs.get_access_summary(), cs.get_allocation_summary(), cs.get_level_summary(),
+            cs.dump_array(int(handles[2])).tolist(), list(cs.trace))
+
+
+@pytest.mark.parametrize('make', [plain, adaptive, hierarchy])
+def test_resumed_run_matches_uninterrupted_run(tmp_path, make):
+    cs, handles = start(make)
+    run(cs, handles, range(N))
+    expected = state(cs, handles)
+
+    cs, handles = start(make)
+    run(cs, handles, range(N // 2))
+    cs.save(str(tmp_path / 'half.ckpt'))
+    random.random()  # The random states are restored by load
+    np.random.random()
+    del cs
+    resumed = Simulator.load(str(tmp_path / 'half.ckpt'))
+    run(resumed, handles, range(N // 2, N))
+    assert state(resumed, handles) == expected
+
+
+def test_loads_are_independent(tmp_path):
+    cs, handles = start(plain)
+    run(cs, handles, range(4))
+    cs.save(str(tmp_path / 'warm.ckpt'))
+    first = Simulator.load(str(tmp_path / 'warm.ckpt'))
+    second = Simulator.load(str(tmp_path / 'warm.ckpt'))
+    run(first, handles, range(4, 8))
+    assert second.get_access_summary() == cs.get_access_summary()
+    assert second.dump_array(int(handles[2])).tolist() == cs.dump_array(int(handles[2])).tolist()
+    assert first.memory.memory_data is not second.memory.memory_data
+
+
+def test_periodic_checkpoints_are_taken_while_hitting(tmp_path):
+    path = str(tmp_path / 'run.ckpt')
+    cs = Simulator(memory_size=2**14, cache_size=128, block_size=8, checkpoint_path=path, checkpoint_every=100)
+    A = cs.allocate(16, default_val=0, through_cache=False)
+    for i in range(950):
+        cs.read(A, i % 16)  # 2 misses, then only hits
+    assert cs.cpu.miss == 2
+    saved = Simulator.load(path)
+    assert saved.cpu.total_access == 900
+    assert saved.cpu.next_checkpoint == 1000
@@ -0,0 +1,60 @@
+import numpy as np
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.SimulatorFanout import SimulatorFanout
+from simple_cache_sim.prefetchers import NextLinePrefetcher
+from simple_cache_sim.replay import replay
+
+
+def configs():
+    # Fresh prefetchers every time, they keep their counters
+    return [
+        dict(cache_size=64, block_size=4, mapping_pol=2),
+        dict(cache_size=256, block_size=8, replace_pol="FIFO", write_pol="WB"),
+        dict(cache_size=256, block_size=8, mapping_pol=4, replace_pol="LFU", cache_engine="array"),
+        dict(cache_size=512, block_size=16, replace_pol="ARC", write_pol="WB", write_allocate=False),
+        dict(cache_size=128, block_size=4, mapping_pol=4, prefetcher=NextLinePrefetcher()),
+    ]
+
+
+def transpose_add(cs):
+    A = cs.allocate(24, 24, default_val=0, through_cache=False)
+    for _ in range(2):
+        for i in range(24):
+            for j in range(24):
+                cs.write(A, j, i, value=cs.read(A, i, j) + i)
+    return cs.dump_array(A)
+
+
+def test_fanout_matches_a_replay_per_configuration():
+    cs = SimulatorFanout(memory_size=2**14, configs=configs(), record_trace=True)
+    transpose_add(cs)
+    summaries = cs.get_summaries()
+    assert cs.get_access_summary() == summaries[0]
+    for config, summary in zip(configs(), summaries):
+        assert replay(cs.trace, **config) == summary
+
+
+def test_fanout_matches_separate_simulators():
+    def same_block_size():
+        return [config for config in configs() if config['block_size'] == 4]
+    cs = SimulatorFanout(memory_size=2**14, configs=same_block_size())
+    values = transpose_add(cs)
+    for config, summary in zip(same_block_size(), cs.get_summaries()):
+        single = Simulator(memory_size=2**14, **config)
+        assert np.array_equal(transpose_add(single), values)
+        assert single.get_access_summary() == summary
+
+
+def test_checkpoints_are_taken_after_every_cpu_saw_the_access(tmp_path):
+    path = str(tmp_path / 'fanout.ckpt')
+    cs = SimulatorFanout(memory_size=2**14, configs=configs()[:2], checkpoint_path=path, checkpoint_every=10)
+    A = cs.allocate(8, default_val=0, through_cache=False)
+    for i in range(8):
+        cs.write(A, i, value=cs.read(A, i) + 1)
+    saved = Simulator.load(path)
+    assert [cpu.total_access for cpu in saved.cpu.cpus] == [10, 10]
+    # The checkpoint was taken after the write of A[4]
+    for i in range(5, 8):
+        saved.write(A, i, value=saved.read(A, i) + 1)
+    assert saved.get_summaries() == cs.get_summaries()
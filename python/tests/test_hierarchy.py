@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+
+
+def cached(cache):
+    # Addresses of the blocks held by one level
+    return {cache.get_physical_address(tag, cache_set)
+            for cache_set, line in enumerate(cache.blocks) for tag in line}
+
+
+def check_invariants(hierarchy):
+    levels = hierarchy.levels
+    for level in levels:
+        assert level.occupancy() == len(cached(level)) <= level.cache_blocks
+    if hierarchy.inclusion == "inclusive":
+        for upper, lower in zip(levels, levels[1:]):
+            assert all(lower.contains(address) for address in cached(upper))
+    elif hierarchy.inclusion == "exclusive":
+        for i, upper in enumerate(levels):
+            for lower in levels[i + 1:]:
+                assert not cached(upper) & cached(lower)
+
+
+@pytest.mark.parametrize('inclusion', ['inclusive', 'non-inclusive', 'exclusive'])
+@pytest.mark.parametrize('engine', ['dict', 'array'])
+@pytest.mark.parametrize('write_pol', ['WT', 'WB'])
+def test_hierarchy_invariants(inclusion, engine, write_pol):
+    l2_block = 4 if inclusion == 'exclusive' else 8
+    cs = Simulator(memory_size=2**14, cache_size=32, block_size=4, write_pol=write_pol, cache_engine=engine,
+                   levels=[dict(mapping_pol=2), dict(cache_size=128, block_size=l2_block, mapping_pol=4),
+                           dict(cache_size=512, block_size=l2_block, mapping_pol=4)],
+                   inclusion=inclusion)
+    A = cs.allocate(1024, default_val=0, through_cache=False)
+    expected = np.zeros(1024, dtype=np.int64)
+    rng = np.random.default_rng(0)
+    # Mostly a small hot region that fits in L2, then accesses over the whole array
+    indexes = np.where(rng.random(4000) < 0.7, rng.integers(0, 96, 4000), rng.integers(0, 1024, 4000))
+    for step, (i, write) in enumerate(zip(indexes.tolist(), (rng.random(4000) < 0.3).tolist())):
+        if write:
+            cs.write(A, i, value=step)
+            expected[i] = step
+        else:
+            assert cs.read(A, i) == expected[i]
+        if step % 97 == 0:
+            check_invariants(cs.cache)
+    check_invariants(cs.cache)
+
+    levels = cs.get_level_summary()
+    summary = cs.get_access_summary()
+    assert summary['cache_hits'] == sum(level['cache_hits'] for level in levels)
+    assert summary['cache_misses'] == levels[-1]['cache_misses']
+    for upper, lower in zip(levels, levels[1:]):
+        assert lower['total_access'] == upper['cache_misses']
+        assert 0 < lower['cache_hits']
+
+    cs.flush()
+    assert all(level.dirty_blocks() == [] for level in cs.cache.levels)
+    assert np.array_equal(cs.dump_array(A), expected)
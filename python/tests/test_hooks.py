@@ -0,0 +1,98 @@
+import pickle
+from collections import Counter
+
+import pytest
+
+from simple_cache_sim.Hooks import Hooks
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.Trace import Trace
+
+
+def run(hooks=None, **kwargs):
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, mapping_pol=2, write_pol="WB", hooks=hooks,
+                   **kwargs)
+    A = cs.allocate(32, 32, default_val=0, through_cache=False)
+    for i in range(32):
+        for j in range(32):
+            cs.write(A, j, i, value=cs.read(A, i, j) + 1)
+    return cs
+
+
+class Recorder():
+    # Module level callbacks (bound methods) so that the simulator stays picklable
+    def __init__(self):
+        self.events = Counter()
+        self.ops = Counter()
+
+    def hit(self, address, cache_set, tag, op):
+        self.events['hit'] += 1
+        self.ops[op] += 1
+
+    def miss(self, address, cache_set, tag, op):
+        self.events['miss'] += 1
+        self.ops[op] += 1
+
+    def fill(self, address, cache_set, tag):
+        self.events['fill'] += 1
+
+    def evict(self, address, cache_set, tag, dirty):
+        self.events['evict'] += 1
+
+    def writeback(self, address, cache_set, tag):
+        self.events['writeback'] += 1
+
+    def subscribe(self, hooks):
+        for event in ['hit', 'miss', 'fill', 'evict', 'writeback']:
+            hooks.on(event, getattr(self, event))
+        return hooks
+
+
+@pytest.mark.parametrize('levels', [None, [dict(), dict(cache_size=256, block_size=8, mapping_pol=4)]])
+def test_events_match_the_counters(levels):
+    recorder = Recorder()
+    cs = run(recorder.subscribe(Hooks()), levels=levels)
+    summary = cs.get_access_summary()
+    assert recorder.events['hit'] == summary['cache_hits']
+    assert recorder.events['miss'] == summary['cache_misses']
+    assert recorder.events['evict'] == summary['evictions']
+    assert recorder.events['writeback'] == summary['blocks_written_back']
+    assert recorder.ops == {Trace.READ: 1024, Trace.WRITE: 1024}
+    if levels is None:
+        assert recorder.events['fill'] == summary['blocks_read']
+    assert summary == run(levels=levels).get_access_summary()
+
+
+def test_only_subscribed_events_wrap_the_cpu():
+    cs = run()
+    assert not {'read', 'write', '_fill', '_evict'} & set(vars(cs.cpu))
+    hooks = Hooks()
+    hooks.on('evict', lambda *args: None)
+    cs = run(hooks)
+    assert {'read', 'write', '_fill', '_evict'} & set(vars(cs.cpu)) == {'_evict'}
+
+
+def test_decorator_and_invalid_event():
+    hooks = Hooks()
+    misses = []
+
+    @hooks.on('miss')
+    def on_miss(address, cache_set, tag, op):
+        misses.append(address)
+
+    assert on_miss is not None
+    cs = run(hooks)
+    assert len(misses) == cs.get_access_summary()['cache_misses']
+    with pytest.raises(ValueError):
+        hooks.on('nope', on_miss)
+
+
+def test_hooked_simulator_pickles():
+    recorder = Recorder()
+    cs = pickle.loads(pickle.dumps(run(recorder.subscribe(Hooks()))))
+    events = cs.cpu.hooks.callbacks['hit'][0].__self__.events  # The copy of the recorder
+    before = events['hit'] + events['miss']
+    A = cs._handles[0]
+    cs.read(A, 0, 0)
+    cs.read(A, 0, 0)
+    assert events['hit'] + events['miss'] == before + 2
+    assert events['hit'] + events['miss'] == cs.get_access_summary()['total_access']
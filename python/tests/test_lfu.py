@@ -0,0 +1,38 @@
+import random
+from collections import OrderedDict
+
+from simple_cache_sim.update_policies import LFUPolicy
+
+
+def test_lfu_matches_a_naive_model():
+    rng = random.Random(0)
+    policy = LFUPolicy(8)
+    counts = OrderedDict()  # key -> count, least recently counted first
+    for _ in range(5000):
+        key = rng.randrange(20)
+        if key in counts:
+            policy.update_access(key)
+            counts[key] += 1
+            counts.move_to_end(key)
+        else:
+            if policy.is_full():
+                victim = min(counts, key=counts.get)  # First of the least counted keys
+                assert policy.remove_one() == victim
+                del counts[victim]
+            policy.add_in(key)
+            counts[key] = 0
+        assert policy.keys() == sorted(counts, key=counts.get)
+
+
+def test_lfu_aging_forgets_old_frequencies():
+    victims = []
+    for aging_period in [None, 4]:
+        policy = LFUPolicy(2, aging_period=aging_period)
+        policy.add_in("old")
+        for _ in range(20):
+            policy.update_access("old")
+        policy.add_in("new")
+        for _ in range(6):
+            policy.update_access("new")
+        victims.append(policy.remove_one())
+    assert victims == ["new", "old"]
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+
+
+def simulator(**kwargs):
+    return Simulator(memory_size=2**14, cache_size=64, block_size=4, record_trace=True, **kwargs)
+
+
+@pytest.mark.parametrize('levels', [None, [dict(), dict(cache_size=256, block_size=8)]])
+def test_load_and_dump_make_no_accesses(levels):
+    cs = simulator(levels=levels)
+    values = np.arange(-50, 70).reshape(12, 10)
+    A = cs.load_array(values, name="A")
+    B = cs.allocate(5, 7, default_val=3, through_cache=False)
+    assert np.array_equal(cs.dump_array(A), values)
+    assert np.array_equal(cs.dump_array(B), np.full((5, 7), 3))
+    assert cs.cpu.get_counters()['total_access'] == 0
+    assert len(cs.trace) == 0
+    assert cs.cache.occupancy() == 0
+
+
+def test_dump_sees_cached_writes():
+    cs = simulator(write_pol="WB")
+    A = cs.load_array(np.zeros((4, 4), dtype=np.int64))
+    cs.write(A, 1, 2, value=7)
+    assert cs.cache.dirty_blocks()
+    assert cs.dump_array(A)[1, 2] == 7
+
+
+def test_allocate_through_the_cache_writes_every_element():
+    cs = simulator()
+    A = cs.allocate(6, 4, default_val=5)
+    assert cs.get_access_summary()['total_access'] == 24
+    assert list(cs.trace.as_numpy()[0]) == list(range(int(A), int(A) + 24))
+    assert np.array_equal(cs.dump_array(A), np.full((6, 4), 5))
+
+
+def test_loads_and_dumps_must_fit():
+    cs = simulator()
+    A = cs.allocate(3, 3)
+    with pytest.raises(MemoryError):
+        cs.load_array(np.zeros(2**14 + 1))
+    assert cs.dump_array(A).shape == (3, 3)
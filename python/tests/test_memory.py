@@ -0,0 +1,52 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from simple_cache_sim.Memory import Memory
+from simple_cache_sim.Simulator import Simulator
+
+
+def test_blocks_are_views_of_memory():
+    memory = Memory(64, 4)
+    memory.allocate(4)
+    memory.write_values(0, np.arange(16))
+    block = memory.read_block_from_memory(6)
+    assert block.data.tolist() == [4, 5, 6, 7]
+    block.data[1] = 50
+    assert memory.read_values(4, 4).tolist() == [4, 50, 6, 7]
+    assert memory.read_block_from_memory(8, 8).data.tolist() == list(range(8, 16))
+
+
+def test_unallocated_and_exhausted_memory():
+    memory = Memory(64, 4)
+    memory.allocate(2)
+    with pytest.raises(IndexError):
+        memory.read_block_from_memory(8)
+    with pytest.raises(IndexError):
+        memory.write_values(6, [1, 2, 3])
+    with pytest.raises(MemoryError):
+        memory.allocate(15)
+
+
+def test_pickled_blocks_stay_views_of_the_pickled_memory():
+    memory = Memory(64, 4)
+    memory.allocate(4)
+    blocks = [memory.read_block_from_memory(a) for a in (0, 4, 12)]
+    memory2, blocks2 = pickle.loads(pickle.dumps((memory, blocks)))
+    blocks2[2].data[3] = 9
+    assert memory2.read_values(15, 1).tolist() == [9]
+    assert memory.read_values(15, 1).tolist() == [0]
+
+
+def test_memory_mapped_file(tmp_path):
+    path = tmp_path / 'memory.bin'
+    cs = Simulator(memory_size=2**12, cache_size=64, block_size=4, memory_path=str(path))
+    values = np.arange(100).reshape(10, 10)
+    A = cs.load_array(values)
+    assert cs.read(A, 3, 4) == 34
+    cs.write(A, 3, 4, value=-1)
+    cs.memory.memory_data.flush()
+    on_disk = np.memmap(str(path), dtype=np.int64, mode='r')
+    assert on_disk[int(A.address(3, 4))] == -1
+    assert np.array_equal(cs.dump_array(A), np.where(values == 34, -1, values))
@@ -0,0 +1,110 @@
+import pickle
+import random
+from bisect import bisect_right
+
+import pytest
+
+from simple_cache_sim.SimulatorAdaptive import SimulatorAdaptive
+from simple_cache_sim.memory_profiles import RandomWalkProfile, SawtoothProfile, SquareProfile, StepProfile
+
+
+def test_step_profile_lookups_in_any_order():
+    points = [(0, 64), (10, 32), (25, 128), (40, 16)]
+    profile = StepProfile(points)
+    starts = [t for t, _ in points]
+    accesses = list(range(60))
+    random.Random(0).shuffle(accesses)
+    for t in accesses + sorted(accesses):
+        assert profile.size_at(t) == points[bisect_right(starts, t) - 1][1]
+
+
+def test_step_profile_period_and_files(tmp_path):
+    profile = StepProfile([(0, 64), (10, 32)], period=15)
+    assert profile.sizes([0, 9, 10, 14, 15, 25, 31]) == [64, 64, 32, 32, 64, 32, 64]
+    path = tmp_path / 'profile.txt'
+    profile.save(str(path))
+    assert StepProfile.from_file(str(path), period=15).sizes(range(40)) == profile.sizes(range(40))
+    path.write_text('# access, size\n0, 8\n\n5 4\n')
+    assert StepProfile.from_file(str(path)).sizes([0, 4, 5, 100]) == [8, 8, 4, 4]
+
+
+def test_square_profile_durations():
+    profile = SquareProfile([64, 16], block_size=4, scale=2, repeat=True)
+    # A square of m words lasts scale * m / B accesses
+    assert profile.starts == [0, 32] and profile.period == 40
+    assert profile.sizes([0, 31, 32, 39, 40]) == [64, 64, 16, 16, 64]
+    assert SquareProfile([64, 16], block_size=4).size_at(10**6) == 16
+
+
+def test_sawtooth_profile():
+    rising = SawtoothProfile(16, 64, period=5)
+    assert rising.sizes(range(6)) == [16, 28, 40, 52, 64, 16]
+    assert SawtoothProfile(16, 64, period=5, rising=False).sizes(range(5)) == [64, 52, 40, 28, 16]
+
+
+def test_random_walk_is_deterministic_whatever_the_lookup_order():
+    forward = RandomWalkProfile(256, 16, 1024, step=10, seed=3)
+    backward = RandomWalkProfile(256, 16, 1024, step=10, seed=3)
+    accesses = list(range(0, 5000, 7))
+    sizes = forward.sizes(accesses)
+    assert backward.sizes(accesses[::-1]) == sizes[::-1]
+    assert all(16 <= size <= 1024 and size & (size - 1) == 0 for size in sizes)
+    assert RandomWalkProfile(256, 16, 1024, step=10, seed=4).sizes(accesses) != sizes
+
+
+def test_random_walk_keeps_only_its_current_step():
+    profile = RandomWalkProfile(256, 16, 1024, step=1, seed=3)
+    size = len(pickle.dumps(profile))
+    end = profile.size_at(200000)
+    assert len(pickle.dumps(profile)) < size + 64  # Checkpoints don't grow with the run
+    assert profile.size_at(5) == RandomWalkProfile(256, 16, 1024, step=1, seed=3).size_at(5)
+    assert profile.size_at(200000) == end
+
+
+def test_algorithms_see_the_same_sizes_at_the_same_access_counts():
+    histories = []
+    for stride in [1, 7]:
+        profile = RandomWalkProfile(256, 32, 256, step=200, seed=1)
+        cs = SimulatorAdaptive(memory_size=2**14, cache_size=256, block_size=8, mapping_pol=4, profile=profile)
+        A = cs.allocate(2048, default_val=0, through_cache=False)
+        for i in range(4000):
+            cs.read(A, (i * stride) % 2048)
+        reference = RandomWalkProfile(256, 32, 256, step=200, seed=1)
+        assert len(cs.cpu.size_history) > 3
+        for _, access, size in cs.cpu.size_history[1:]:
+            assert size == cs.cpu.valid_cache_size(reference.size_at(access))
+        histories.append(cs.cpu.size_history)
+    assert histories[0] != histories[1]
+
+
+@pytest.mark.parametrize('profile', [
+    StepProfile([(0, 64), (10, 32), (25, 128), (40, 16)]),
+    StepProfile([(0, 64), (10, 32), (25, 64)], period=30),
+    SquareProfile([64, 16, 32], block_size=4, scale=2, repeat=True),
+    SawtoothProfile(16, 64, period=20),
+    SawtoothProfile(16, 64, period=20, rising=False),
+    SawtoothProfile(32, 32, period=20),
+    RandomWalkProfile(64, 16, 256, step=7, seed=2),
+])
+def test_size_is_constant_until_the_next_change(profile):
+    for t in range(120):
+        change = profile.next_change(t)
+        assert change is None or change > t
+        end = 200 if change is None else change
+        assert profile.sizes(range(t, end)) == [profile.size_at(t)] * (end - t)
+
+
+def test_resizes_happen_at_the_access_count_whatever_the_misses():
+    runs = []
+    for hits_only in [True, False]:
+        cs = SimulatorAdaptive(memory_size=2**14, cache_size=1024, block_size=8, mapping_pol=4,
+                               profile=StepProfile([(0, 1024), (100, 256), (2500, 512)]))
+        A = cs.allocate(4096, default_val=0, through_cache=False)
+        for i in range(5000):
+            cs.read(A, i % 16 if hits_only else (i * 8) % 4096)
+        assert cs.cpu.cache.cache_size == 512
+        runs.append(cs.cpu)
+    hits, misses = runs
+    assert hits.miss < 10 and misses.miss == 5000  # The resizes can drop the two blocks read
+    assert [(access, size) for _, access, size in hits.size_history] == \
+           [(access, size) for _, access, size in misses.size_history] == [(0, 1024), (100, 256), (2500, 512)]
@@ -0,0 +1,106 @@
+import random
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from simple_cache_sim.Cache import Cache
+from simple_cache_sim.Memory import Memory
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.replay import replay
+from simple_cache_sim.update_policies import POLICIES, UpdatePolicy, get_policy, register_policy
+
+NAMES = sorted(set(POLICIES))
+
+
+def make_trace(addresses):
+    trace = Trace()
+    for address in addresses:
+        trace.append(address, Trace.READ)
+    return trace
+
+
+def test_get_policy():
+    assert get_policy("LRU") is POLICIES["lru"]
+    assert get_policy("RANDOM_2") is POLICIES["rand"]
+    with pytest.raises(ValueError):
+        get_policy("nope")
+
+
+@pytest.mark.parametrize('name', NAMES)
+@pytest.mark.parametrize('ways', [4, None])
+def test_policy_keys_match_the_cached_blocks(name, ways):
+    cache = Cache(cache_size=64, block_size=4, memory_size=2**14, mapping_pol=ways, replace_pol=name)
+    rng = np.random.default_rng(0)
+    addresses = np.where(rng.random(3000) < 0.6, rng.integers(0, 128, 3000), rng.integers(0, 2**14, 3000))
+    memory = Memory(2**14, 4)
+    memory.allocate(2**12)
+    for step, address in enumerate(addresses.tolist()):
+        if cache.read_from_cache(address) is None:
+            cache.load_from_memory(address, memory.read_block_from_memory(address))
+        if step % 50 == 0:
+            cache.remove(int(rng.integers(0, 128)))
+        if step % 100 == 0:
+            for cache_set, policy in enumerate(cache.eviction_handler):
+                assert sorted(policy.keys()) == sorted(cache.blocks[cache_set])
+                assert len(cache.blocks[cache_set]) <= cache._mapping_pol
+
+
+@pytest.mark.parametrize('name', NAMES)
+def test_working_set_that_fits_only_misses_once(name):
+    trace = make_trace(list(range(16)) * 10)
+    assert replay(trace, cache_size=16, block_size=1, replace_pol=name)['cache_misses'] == 16
+
+
+def test_scan_resistant_policies_keep_the_hot_set():
+    rng = random.Random(0)
+    addresses = []
+    for scan in range(100):
+        addresses += [rng.randrange(12) for _ in range(40)] + list(range(100 + scan * 6, 106 + scan * 6))
+    trace = make_trace(addresses)
+    misses = {name: replay(trace, cache_size=16, block_size=1, replace_pol=name)['cache_misses']
+              for name in ["LRU", "2Q", "ARC", "LIRS"]}
+    for name in ["2Q", "ARC", "LIRS"]:
+        assert misses[name] < misses["LRU"]
+    assert misses["LIRS"] <= 12 + 600 + 10  # Cold misses and the scans
+
+
+def test_lirs_handles_a_loop_larger_than_the_cache():
+    trace = make_trace(list(range(17)) * 20)
+    lru = replay(trace, cache_size=16, block_size=1, replace_pol="LRU")['cache_misses']
+    lirs = replay(trace, cache_size=16, block_size=1, replace_pol="LIRS")['cache_misses']
+    assert lru == 17 * 20
+    assert lirs < lru / 4
+
+
+def test_registered_policy_is_usable_by_name():
+    @register_policy("test-mru")
+    class MRUPolicy(UpdatePolicy):
+        def __init__(self, n):
+            super().__init__(n)
+            self.ordering = OrderedDict()
+
+        def is_full(self):
+            return len(self.ordering) >= self.n
+
+        def update_access(self, i):
+            self.ordering.move_to_end(i)
+
+        def add_in(self, new_i):
+            self.ordering[new_i] = None
+
+        def remove_one(self, new_i=None):
+            return self.ordering.popitem(last=True)[0]
+
+        def remove(self, i):
+            del self.ordering[i]
+
+        def keys(self):
+            return list(self.ordering)[::-1]
+
+    try:
+        trace = make_trace(list(range(17)) * 20)
+        # MRU keeps most of a loop larger than the cache
+        assert replay(trace, cache_size=16, block_size=1, replace_pol="TEST-MRU")['cache_misses'] < 17 * 20 / 4
+    finally:
+        del POLICIES["test-mru"]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.prefetchers import NextLinePrefetcher, StreamBufferPrefetcher, StridePrefetcher
+
+
+def scan(prefetcher, step=1, arrays=1):
+    # Read arrays of 256 words (64 blocks) with a stride of step words, interleaved
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, prefetcher=prefetcher)
+    handles = [cs.allocate(256, default_val=0, through_cache=False) for _ in range(arrays)]
+    for i in range(0, 256, step):
+        for A in handles:
+            cs.read(A, i)
+    return cs.get_access_summary()
+
+
+def check_counters(summary):
+    assert summary['blocks_read'] == summary['cache_misses'] + summary['prefetches_issued']
+    assert summary['prefetches_useful'] + summary['prefetches_unused'] <= summary['prefetches_issued']
+
+
+@pytest.mark.parametrize('prefetcher,misses', [
+    (None, 64),
+    (NextLinePrefetcher(), 32),
+    (NextLinePrefetcher(degree=3), 16),
+    (NextLinePrefetcher(tagged=True), 1),
+    (StreamBufferPrefetcher(depth=4), 1),
+])
+def test_sequential_scan(prefetcher, misses):
+    summary = scan(prefetcher)
+    assert summary['cache_misses'] == misses
+    if prefetcher is not None:
+        check_counters(summary)
+        assert summary['prefetches_useful'] == 64 - misses
+
+
+def test_stride_prefetcher_follows_each_allocation():
+    plain = scan(None, step=8, arrays=2)
+    summary = scan(StridePrefetcher(degree=2), step=8, arrays=2)
+    check_counters(summary)
+    assert plain['cache_misses'] == 64
+    # Two misses to learn the stride of each allocation and one to start prefetching
+    assert summary['cache_misses'] == 2 * 3
+    assert summary['prefetches_unused'] == 0
+
+
+def mostly_hot(prefetcher):
+    cs = Simulator(memory_size=2**14, cache_size=32, block_size=4, prefetcher=prefetcher)
+    A = cs.allocate(1024, default_val=0, through_cache=False)
+    rng = np.random.default_rng(0)
+    hot = rng.integers(0, 32, 3000)
+    far = rng.integers(0, 1024, 3000)
+    for i in np.where(rng.random(3000) < 0.8, hot, far).tolist():
+        cs.read(A, i)
+    return cs
+
+
+def test_useless_prefetches_pollute():
+    cs = mostly_hot(NextLinePrefetcher(degree=4))
+    summary = cs.get_access_summary()
+    check_counters(summary)
+    assert summary['prefetches_unused'] > 0
+    assert summary['prefetches_polluting'] > 0
+    cs.reset_stats()
+    assert cs.cpu.get_counters()['prefetches_issued'] == 0
+
+
+@pytest.mark.parametrize('prefetcher', [NextLinePrefetcher(degree=4), StridePrefetcher(confidence=1),
+                                        StreamBufferPrefetcher(depth=4)])
+def test_every_prefetch_is_used_unused_or_still_pending(prefetcher):
+    summary = mostly_hot(prefetcher).get_access_summary()
+    assert summary['prefetches_unused'] > 0
+    assert summary['prefetches_issued'] == (summary['prefetches_useful'] + summary['prefetches_unused']
+                                            + len(prefetcher._pending))
@@ -0,0 +1,68 @@
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.replay import replay, replay_many
+
+
+def live(flush, **kwargs):
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, record_trace=True, **kwargs)
+    A = cs.allocate(16, 16, default_val=0, through_cache=False)
+    for i in range(16):
+        for j in range(16):
+            cs.write(A, j, i, value=cs.read(A, i, j) + 1)
+    if flush:
+        cs.flush()
+    return cs
+
+
+@pytest.mark.parametrize('flush', [False, True])
+@pytest.mark.parametrize('write_pol', ['WT', 'WB'])
+@pytest.mark.parametrize('replace_pol', ['LRU', 'FIFO'])
+def test_replay_matches_live_run(flush, write_pol, replace_pol):
+    kwargs = dict(write_pol=write_pol, mapping_pol=2, replace_pol=replace_pol)
+    cs = live(flush, **kwargs)
+    assert replay(cs.trace, cache_size=64, block_size=4, flush=flush, **kwargs) == cs.get_access_summary()
+
+
+def test_opt_replay_reports_flush_separately():
+    trace = live(False).trace
+    kwargs = dict(cache_size=64, block_size=4, mapping_pol=2, write_pol='WB', replace_pol='OPT')
+    summary, flushed = replay(trace, **kwargs), replay(trace, flush=True, **kwargs)
+    assert summary['blocks_flushed'] == 0 < flushed['blocks_flushed']
+    del summary['blocks_flushed'], flushed['blocks_flushed']
+    assert summary == flushed
+
+
+def test_flush_is_reported_separately():
+    cs = live(False, write_pol='WB', mapping_pol=2)
+    written_back = cs.get_access_summary()['blocks_written_back']
+    dirty = cs.cache.dirty_blocks()
+    cs.flush()
+    summary = cs.get_access_summary()
+    assert summary['blocks_written_back'] == written_back
+    assert summary['blocks_flushed'] == len(dirty) > 0
+    assert cs.cache.dirty_blocks() == []
+
+
+def record_run(**kwargs):
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, record_trace=True, **kwargs)
+    A = cs.allocate(16, 16, default_val=0)
+    for i in range(16):
+        for j in range(16):
+            cs.write(A, j, i, value=cs.read(A, i, j) + 1)
+    return cs
+
+
+def test_trace_records_every_access():
+    cs = record_run()
+    assert len(cs.trace) == cs.get_access_summary()['total_access']
+    addresses, ops = cs.trace.as_numpy()
+    assert (ops == Trace.READ).sum() == 16 * 16
+    assert addresses.max() < 16 * 16
+
+
+def test_replay_many():
+    trace = record_run().trace
+    configs = [dict(cache_size=64, block_size=4), dict(cache_size=256, block_size=8, mapping_pol=4)]
+    assert replay_many(trace, configs) == [replay(trace, **config) for config in configs]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.shards import Shards, mean_absolute_error, shards_miss_curve
+from simple_cache_sim.stack_distance import lru_miss_curve
+
+SIZES = [256, 1024, 4096, 16384, 65536]
+
+
+def addresses(n=100000, seed=0):
+    rng = np.random.default_rng(seed)
+    # A hot set of 2000 blocks of 4 words and random accesses over 20000
+    blocks = np.where(rng.random(n) < 0.6, rng.integers(0, 2000, n), rng.integers(0, 20000, n))
+    return (blocks * 4 + rng.integers(0, 4, n)).tolist()
+
+
+def exact_ratios(stream):
+    return {c: m / len(stream) for c, m in lru_miss_curve(stream, 4, SIZES).items()}
+
+
+def test_full_sample_is_exact():
+    stream = addresses(20000)
+    summary = shards_miss_curve(stream, 4, SIZES, rate=1.0)
+    exact = lru_miss_curve(stream, 4, SIZES)
+    assert {c: round(s['misses']) for c, s in summary.items()} == exact
+
+
+@pytest.mark.parametrize('rate,max_blocks', [(0.5, None), (1.0, 4096)])
+def test_sampled_curve_is_close(rate, max_blocks):
+    stream = addresses()
+    sampler = Shards(4, rate=rate, max_blocks=max_blocks)
+    sampler.update(stream)
+    assert max_blocks is None or len(sampler.sample.stack) <= max_blocks
+    estimate = sampler.miss_ratio_curve(SIZES)
+    assert mean_absolute_error(estimate, exact_ratios(stream)) < 0.02
+    errors = sampler.error(SIZES)
+    assert all(e >= 0 for e in errors.values())
+
+
+def test_vectorized_and_scalar_updates_agree():
+    stream = addresses(20000)
+    whole, parts, scalar = Shards(4, rate=0.2), Shards(4, rate=0.2), Shards(4, rate=0.2)
+    whole.update(stream)
+    for i in range(0, len(stream), 3000):
+        parts.update(stream[i:i + 3000])
+    for address in stream:
+        scalar.access(address)
+    assert whole.summary(SIZES) == parts.summary(SIZES) == scalar.summary(SIZES)
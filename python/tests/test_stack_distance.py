@@ -0,0 +1,40 @@
+import numpy as np
+
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.replay import replay
+from simple_cache_sim.stack_distance import StackDistance, lru_miss_curve, stack_distance_histogram
+
+
+def random_trace(n=6000, seed=0):
+    rng = np.random.default_rng(seed)
+    trace = Trace()
+    addresses = np.where(rng.random(n) < 0.7, rng.integers(0, 300, n), rng.integers(0, 4096, n))
+    for address in addresses.tolist():
+        trace.append(address, Trace.READ)
+    return trace
+
+
+def test_stack_distances():
+    sd = StackDistance(capacity=2)  # Small so that it compacts
+    distances = [sd.access(block) for block in [1, 2, 3, 1, 1, 3, 2, 4, 1]]
+    assert distances == [0, 0, 0, 3, 1, 2, 3, 0, 4]
+    assert len(sd) == 4 and 4 in sd
+    sd.forget(4)
+    assert 4 not in sd
+    assert sd.access(1) == 1
+
+
+def test_histogram():
+    hist, cold = stack_distance_histogram([0, 4, 8, 0, 1, 9], block_size=4)
+    assert cold == 3
+    assert hist.tolist() == [0, 1, 1, 1]  # Blocks 0 1 2 0 0 2
+
+
+def test_miss_curve_matches_fully_associative_lru_replays():
+    trace = random_trace()
+    sizes = [8, 64, 256, 1024, 4096]
+    curve = lru_miss_curve(trace, 8, sizes)
+    for size in sizes:
+        summary = replay(trace, cache_size=size, block_size=8, mapping_pol=None, replace_pol="LRU")
+        assert curve[size] == summary['cache_misses']
+    assert list(curve.values()) == sorted(curve.values(), reverse=True)
@@ -0,0 +1,81 @@
+import csv
+
+import pytest
+
+from simple_cache_sim.sweep import expand_grid, read_results, run_sweep
+
+
+def square(point):
+    if point['n'] == 3:
+        raise ValueError('bad point')
+    return {'square': point['n'] ** 2, 'runtime': 0}
+
+
+def header(path):
+    with open(path, newline='') as f:
+        return next(csv.reader(f))
+
+
+def test_expand_grid():
+    assert expand_grid({'n': [1, 2], 'm': ['a']}) == [{'n': 1, 'm': 'a'}, {'n': 2, 'm': 'a'}]
+    assert expand_grid([{'n': 1}]) == [{'n': 1}]
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_failing_point_gets_an_error_row(tmp_path, processes):
+    out = tmp_path / 'results.csv'
+    rows = run_sweep({'n': [1, 2, 3, 4]}, square, str(out), processes=processes, verbose=False)
+    assert len(rows) == 4
+    results = {row['n']: row for row in read_results(str(out))}
+    assert header(out) == ['n', 'square', 'runtime', 'error']
+    assert results['3']['error'] == 'ValueError: bad point'
+    assert results['3']['square'] == ''
+    assert results['4'] == {'n': '4', 'square': '16', 'runtime': '0', 'error': ''}
+
+
+def test_error_rows_before_the_first_result_keep_the_result_columns(tmp_path):
+    out = tmp_path / 'results.csv'
+    run_sweep({'n': [3, 1]}, square, str(out), processes=1, verbose=False)
+    assert header(out) == ['n', 'square', 'runtime', 'error']
+    assert [row['error'] for row in read_results(str(out))] == ['ValueError: bad point', '']
+
+
+def test_resume_skips_done_points_and_retries_failed_ones(tmp_path):
+    out = tmp_path / 'results.csv'
+    run_sweep({'n': [1, 3]}, square, str(out), processes=1, verbose=False)
+    rows = run_sweep({'n': [1, 2, 3]}, square, str(out), processes=1, verbose=False)
+    assert sorted(row['n'] for row in rows) == [2, 3]
+    assert len(read_results(str(out))) == 4
+
+
+def test_resume_on_a_header_only_file_writes_no_second_header(tmp_path):
+    out = tmp_path / 'results.csv'
+    out.write_text('n,square,runtime,error\r\n')
+    run_sweep({'n': [1, 2]}, square, str(out), processes=1, verbose=False)
+    lines = out.read_text().splitlines()
+    assert lines.count('n,square,runtime,error') == 1
+    assert len(read_results(str(out))) == 2
+
+
+def double(point):
+    return {'double': 2 * point['n'], 'runtime': 0}
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_every_point_gets_a_row(tmp_path, processes):
+    out = tmp_path / 'results.csv'
+    rows = run_sweep({'n': [1, 2, 3], 'm': ['a']}, double, str(out), processes=processes, verbose=False)
+    assert len(rows) == 3
+    results = sorted(read_results(str(out)), key=lambda row: row['n'])
+    assert [(row['n'], row['m'], row['double']) for row in results] == [('1', 'a', '2'), ('2', 'a', '4'), ('3', 'a', '6')]
+
+
+def test_resume_skips_done_points(tmp_path):
+    out = tmp_path / 'results.csv'
+    run_sweep({'n': [1, 2]}, double, str(out), processes=1, verbose=False)
+    rows = run_sweep({'n': [1, 2, 3]}, double, str(out), processes=1, verbose=False)
+    assert [row['n'] for row in rows] == [3]
+    assert len(read_results(str(out))) == 3
+    rows = run_sweep({'n': [1, 2]}, double, str(out), processes=1, resume=False, verbose=False)
+    assert len(rows) == 2
+    assert len(read_results(str(out))) == 2
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.telemetry import FIELDS, Telemetry
+
+
+def run(telemetry=None, n=1000):
+    # Every access of the scan misses
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, telemetry=telemetry)
+    A = cs.allocate(4096, default_val=0, through_cache=False)
+    for i in range(n):
+        cs.read(A, 4 * i)
+    return cs
+
+
+def test_samples_every_period():
+    telemetry = Telemetry(every=100)
+    cs = run(telemetry)
+    data = telemetry.samples()
+    assert data['total_access'].tolist() == list(range(100, 1001, 100))
+    assert (data['hit_rate'] == 0).all() and (data['window_hit_rate'] == 0).all()
+    assert data['cache_size'].tolist() == [64] * 10
+    assert data['occupancy'].tolist() == [16] * 10
+    assert cs.get_access_summary() == run().get_access_summary()
+
+
+def test_window_hit_rate():
+    telemetry = Telemetry(every=100)
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, telemetry=telemetry)
+    A = cs.allocate(4096, default_val=0, through_cache=False)
+    for i in range(400):
+        cs.read(A, i)  # One miss every 4 reads
+    for i in range(200):
+        cs.read(A, 400 + 4 * i)  # Only misses
+    telemetry.sample()
+    data = telemetry.samples()
+    assert data['total_access'].tolist() == [100, 200, 300, 400, 500, 600, 600]
+    assert data['window_hit_rate'][:4].tolist() == [0.75] * 4
+    assert data['window_hit_rate'][4:6].tolist() == [0, 0]
+    assert np.isnan(data['window_hit_rate'][6])
+    assert data['hit_rate'][-1] == cs.get_access_summary()['hit_rate']
+
+
+def test_phases_that_only_hit_are_sampled():
+    telemetry = Telemetry(every=100)
+    cs = Simulator(memory_size=2**14, cache_size=64, block_size=4, telemetry=telemetry)
+    A = cs.allocate(16, default_val=0, through_cache=False)
+    for i in range(1000):
+        cs.read(A, i % 16)  # 4 misses, then only hits
+    data = telemetry.samples()
+    assert data['total_access'].tolist() == list(range(100, 1001, 100))
+    assert data['window_hit_rate'].tolist() == [0.96] + [1.0] * 9
+
+
+def test_ring_buffer_keeps_the_latest_samples(tmp_path):
+    telemetry = Telemetry(every=50, capacity=4)
+    run(telemetry)
+    data = telemetry.samples()
+    assert len(telemetry) == 4
+    assert data['total_access'].tolist() == [850, 900, 950, 1000]
+    assert np.isnan(data['window_hit_rate'][0])
+
+    telemetry.save(str(tmp_path / 'telemetry.npz'))
+    saved = np.load(str(tmp_path / 'telemetry.npz'))
+    assert saved['total_access'].tolist() == [850, 900, 950, 1000]
+    telemetry.to_csv(str(tmp_path / 'telemetry.csv'))
+    lines = (tmp_path / 'telemetry.csv').read_text().splitlines()
+    assert lines[0].split(',')[:len(FIELDS)] == list(FIELDS)
+    assert len(lines) == 5
+
+
+def test_reset_restarts_the_samples():
+    telemetry = Telemetry(every=100)
+    cs = run(telemetry, n=250)
+    cs.reset_stats()
+    assert len(telemetry) == 0
+    A = cs._handles[0]
+    for i in range(250):
+        cs.read(A, 4 * i)
+    assert telemetry.samples()['total_access'].tolist() == [100, 200]
+
+
+def test_invalid_period():
+    with pytest.raises(ValueError):
+        Telemetry(every=0)
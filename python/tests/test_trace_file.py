@@ -0,0 +1,169 @@
+import os
+
+import numpy as np
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+from simple_cache_sim.Trace import Trace
+from simple_cache_sim.trace_file import TraceReader, TraceWriter, write_trace
+from simple_cache_sim.replay import replay
+
+
+def make_trace(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    trace = Trace()
+    for address, op in zip(rng.integers(0, 1 << 20, n).tolist(), (rng.random(n) < 0.3).tolist()):
+        trace.append(address, int(op))
+    return trace
+
+
+def run(cs, start, stop):
+    A = cs.allocate(64, default_val=0, through_cache=False)
+    for i in range(start, stop):
+        cs.write(A, (i * 7) % 64, value=cs.read(A, i % 64) + 1)
+
+
+@pytest.mark.parametrize('compresslevel', [0, 6])
+def test_round_trip(tmp_path, compresslevel):
+    trace = make_trace()
+    path = str(tmp_path / 't.sct')
+    write_trace(trace, path, chunk_size=1000, compresslevel=compresslevel)
+    reader = TraceReader(path)
+    assert len(reader) == len(trace)
+    assert list(reader) == list(trace)
+    addresses, ops = reader.as_numpy()
+    assert np.array_equal(addresses, trace.as_numpy()[0])
+    assert np.array_equal(ops, trace.as_numpy()[1])
+    assert reader.max_address() == trace.max_address()
+
+
+def test_extend_fills_whole_chunks(tmp_path):
+    trace = make_trace()
+    addresses, ops = trace.as_numpy()
+    path = str(tmp_path / 't.sct')
+    with TraceWriter(path, chunk_size=700) as writer:
+        for address, op in list(trace)[:3]:
+            writer.append(address, op)
+        writer.extend(addresses[3:2000], ops[3:2000])
+        writer.extend(addresses[2000:].tolist(), ops[2000:].tolist())
+        assert [count for _, _, count, _ in writer.index] == [700] * 7
+        with pytest.raises(ValueError):
+            writer.extend(addresses[:2], ops[:1])
+    assert list(TraceReader(path)) == list(trace)
+
+
+def test_window_and_missing_index(tmp_path):
+    trace = make_trace()
+    path = str(tmp_path / 't.sct')
+    writer = TraceWriter(path, chunk_size=700)
+    writer.extend(*trace.as_numpy())
+    writer._flush()  # Not closed: no index, the chunks are scanned
+    writer._file.flush()
+    reader = TraceReader(path)
+    assert list(reader) == list(trace)
+    assert list(reader.window(1234, 3456)) == list(trace)[1234:3456]
+    assert list(reader.window(10, 2000).window(5, 50)) == list(trace)[15:60]
+
+
+def test_replay_from_file_matches_in_memory(tmp_path):
+    trace = make_trace(3000)
+    path = str(tmp_path / 't.sct')
+    write_trace(trace, path, chunk_size=512)
+    kwargs = dict(cache_size=256, block_size=4, mapping_pol=4)
+    assert replay(TraceReader(path), **kwargs) == replay(trace, **kwargs)
+
+
+def test_streamed_trace_matches_recorded(tmp_path):
+    path = str(tmp_path / 'run.sct')
+    streamed = Simulator(memory_size=4096, cache_size=16, block_size=4, trace_path=path)
+    recorded = Simulator(memory_size=4096, cache_size=16, block_size=4, record_trace=True)
+    run(streamed, 0, 500)
+    run(recorded, 0, 500)
+    streamed.trace.close()
+    assert list(TraceReader(path)) == list(recorded.trace)
+
+
+def test_loading_a_checkpoint_leaves_the_trace_alone(tmp_path):
+    path = str(tmp_path / 'run.sct')
+    ckpt = str(tmp_path / 'half.ckpt')
+    cs = Simulator(memory_size=4096, cache_size=16, block_size=4, trace_path=path)
+    run(cs, 0, 300)
+    cs.save(ckpt)
+    run(cs, 300, 600)
+    cs.trace.close()
+    size = os.path.getsize(path)
+    full = list(TraceReader(path))
+
+    Simulator.load(ckpt)
+    Simulator.load(ckpt)
+    assert os.path.getsize(path) == size
+    assert list(TraceReader(path)) == full
+
+
+def test_branches_resume_into_their_own_files(tmp_path):
+    path = str(tmp_path / 'run.sct')
+    ckpt = str(tmp_path / 'half.ckpt')
+    cs = Simulator(memory_size=4096, cache_size=16, block_size=4, trace_path=path)
+    run(cs, 0, 300)
+    cs.save(ckpt)
+    run(cs, 300, 600)
+    cs.trace.close()
+    full = list(TraceReader(path))
+
+    for name in ['a.sct', 'b.sct']:
+        branch = Simulator.load(ckpt, trace_path=str(tmp_path / name))
+        run(branch, 300, 600)
+        branch.trace.close()
+    assert list(TraceReader(str(tmp_path / 'a.sct'))) == full
+    assert list(TraceReader(str(tmp_path / 'b.sct'))) == full
+    assert list(TraceReader(path)) == full
+
+
+def test_resume_in_place_truncates(tmp_path):
+    path = str(tmp_path / 'run.sct')
+    ckpt = str(tmp_path / 'half.ckpt')
+    cs = Simulator(memory_size=4096, cache_size=16, block_size=4, trace_path=path, record_trace=False)
+    run(cs, 0, 300)
+    cs.save(ckpt)
+    run(cs, 300, 400)  # Lost in a crash, never closed
+    cs.trace._flush()
+    cs.trace._file.flush()
+
+    resumed = Simulator.load(ckpt, trace_path=path)
+    run(resumed, 300, 600)
+    resumed.trace.close()
+    reference = Simulator(memory_size=4096, cache_size=16, block_size=4, record_trace=True)
+    run(reference, 0, 300)
+    run(reference, 300, 600)
+    assert list(TraceReader(path)) == list(reference.trace)
+
+
+def test_checkpoint_after_close_resumes_before_the_index(tmp_path):
+    path = str(tmp_path / 'run.sct')
+    ckpt = str(tmp_path / 'done.ckpt')
+    cs = Simulator(memory_size=4096, cache_size=16, block_size=4, trace_path=path)
+    run(cs, 0, 300)
+    cs.trace.close()
+    cs.save(ckpt)
+    first = list(TraceReader(path))
+
+    resumed = Simulator.load(ckpt, trace_path=str(tmp_path / 'more.sct'))
+    run(resumed, 300, 600)
+    resumed.trace.close()
+    reference = Simulator(memory_size=4096, cache_size=16, block_size=4, record_trace=True)
+    run(reference, 0, 300)
+    run(reference, 300, 600)
+    assert list(TraceReader(str(tmp_path / 'more.sct'))) == list(reference.trace)
+    assert list(TraceReader(path)) == first
+
+
+def test_detached_writer_refuses_to_write(tmp_path):
+    path = str(tmp_path / 'run.sct')
+    ckpt = str(tmp_path / 'ckpt')
+    cs = Simulator(memory_size=4096, cache_size=16, block_size=4, trace_path=path)
+    run(cs, 0, 10)
+    cs.save(ckpt)
+    branch = Simulator.load(ckpt)
+    run(branch, 10, 20)
+    with pytest.raises(ValueError):
+        branch.trace.close()
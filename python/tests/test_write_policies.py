@@ -0,0 +1,56 @@
+import pytest
+
+from simple_cache_sim.Simulator import Simulator
+
+
+def stream(write_pol, write_allocate, engine="dict"):
+    # Write a 256 word array twice then read it, through an 8 block cache
+    cs = Simulator(memory_size=2**12, cache_size=32, block_size=4, mapping_pol=2, write_pol=write_pol,
+                   write_allocate=write_allocate, cache_engine=engine)
+    A = cs.allocate(256, default_val=0, through_cache=False)
+    for value in range(2):
+        for i in range(256):
+            cs.write(A, i, value=value + i)
+    assert [cs.read(A, i) for i in range(256)] == [1 + i for i in range(256)]
+    return cs
+
+
+@pytest.mark.parametrize('engine', ['dict', 'array'])
+def test_write_through(engine):
+    summary = stream("WT", True, engine).get_access_summary()
+    assert summary['words_written'] == 512
+    assert summary['blocks_written_back'] == 0
+    assert summary['blocks_read'] == summary['cache_misses'] == 3 * 64
+
+
+@pytest.mark.parametrize('engine', ['dict', 'array'])
+def test_write_back(engine):
+    cs = stream("WB", True, engine)
+    summary = cs.get_access_summary()
+    assert summary['words_written'] == 0
+    # Both write passes dirty every block, and each dirty block is evicted by the next pass
+    assert summary['blocks_written_back'] == 2 * 64
+    cs.flush()
+    assert cs.get_access_summary()['blocks_flushed'] == 0
+    assert cs.cache.dirty_blocks() == []
+
+
+def test_write_back_flush_counts_dirty_blocks():
+    cs = Simulator(memory_size=2**12, cache_size=32, block_size=4, write_pol="WB")
+    A = cs.allocate(16, default_val=0, through_cache=False)
+    for i in range(0, 16, 2):
+        cs.write(A, i, value=i)
+    cs.flush()
+    summary = cs.get_access_summary()
+    assert summary['blocks_written_back'] == 0
+    assert summary['blocks_flushed'] == 4
+
+
+@pytest.mark.parametrize('write_pol', ['WT', 'WB'])
+def test_no_write_allocate(write_pol):
+    summary = stream(write_pol, False).get_access_summary()
+    # Writes miss and go straight to memory, only the read pass loads blocks
+    assert summary['cache_misses'] == 512 + 64
+    assert summary['blocks_read'] == 64
+    assert summary['words_written'] == 512
+    assert summary['blocks_written_back'] == 0